@@ -0,0 +1,177 @@
+"""
+Chorus32 Archive Benchmark
+
+Compares the compact archive (chorus32_archive) with a plain binary dump
+of the same traces: per node, float64 timestamps and uint16 RSSI, raw and
+zlib-compressed. A synthetic heat is recorded into a RaceCapture the way
+the plugin does: devices push every 10 ms with a slightly drifting clock,
+reads arrive every 25-35 ms, timestamps come from DeviceTimebase, cycles
+are occasionally dropped and every node sees a pass every 30 seconds.
+
+Runs without RotorHazard or gevent: the archive modules are imported
+from a bare interface_chorus32 package, so the plugin __init__ never runs.
+
+Usage (from the repository root):
+
+    python benchmarks/bench_archive.py --devices 2 --nodes 4 --seconds 150
+"""
+
+import argparse
+import array
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+import types
+import zlib
+
+PLUGIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'custom_plugins', 'interface_chorus32')
+INTERVAL_S = 0.01
+PASS_PERIOD_S = 30.0
+DRIFT_PPM = 40.0  # Per device, so each device's cadence differs
+DROP_CHANCE = 0.002  # Per read
+
+
+def _import_archive():
+    """Import the archive modules without running the plugin __init__"""
+    if 'interface_chorus32' not in sys.modules:
+        package = types.ModuleType('interface_chorus32')
+        package.__path__ = [os.path.abspath(PLUGIN_DIR)]
+        sys.modules['interface_chorus32'] = package
+    from interface_chorus32 import chorus32_archive, chorus32_capture
+    from interface_chorus32.chorus32_core.chorus32_timesync import DeviceTimebase
+    return chorus32_archive, chorus32_capture, DeviceTimebase
+
+
+def record_heat(capture_module, DeviceTimebase, path, devices, nodes, seconds):
+    """Write a synthetic heat to a capture file"""
+    rng = random.Random(1)
+    capture = capture_module.RaceCapture.create(path)
+    timebases = [DeviceTimebase(f"bench {device_idx}") for device_idx in range(devices)]
+    for timebase in timebases:
+        timebase.reset_cadence(INTERVAL_S)
+    levels = [[rng.randint(90, 130) for _ in range(nodes)] for _ in range(devices)]
+    cycles = [0] * devices
+    start = now = 1000.0
+    while now < start + seconds:
+        now += 0.025 + rng.random() * 0.01
+        for device_idx, timebase in enumerate(timebases):
+            due = int((now - start) * (1 + DRIFT_PPM * 1e-6 * (device_idx + 1)) / INTERVAL_S)
+            if rng.random() < DROP_CHANCE:
+                cycles[device_idx] += 3
+            read_cycles = []
+            node_idxs = []
+            rssis = []
+            while cycles[device_idx] < due:
+                cycles[device_idx] += 1
+                for node_idx in range(nodes):
+                    phase = (cycles[device_idx] * INTERVAL_S + node_idx * 7) % PASS_PERIOD_S
+                    bump = 220 * math.exp(-((phase - PASS_PERIOD_S / 2) / 0.4) ** 2)
+                    level = levels[device_idx]
+                    level[node_idx] += (110 - level[node_idx]) * 0.05 + rng.gauss(0, 2)
+                    read_cycles.append(cycles[device_idx])
+                    node_idxs.append(node_idx)
+                    rssis.append(int(level[node_idx] + bump))
+            if read_cycles:
+                capture.append_batch(timebase.sample_times(read_cycles, now), device_idx, node_idxs, rssis)
+    capture.close()
+
+
+def best_of(runs, fn):
+    best = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive size and speed against a plain binary dump")
+    parser.add_argument('--devices', type=int, default=2)
+    parser.add_argument('--nodes', type=int, default=4, help="Nodes per device")
+    parser.add_argument('--seconds', type=float, default=150.0, help="Heat length")
+    parser.add_argument('--runs', type=int, default=3, help="Timed runs; the best is reported")
+    args = parser.parse_args()
+
+    archive_module, capture_module, DeviceTimebase = _import_archive()
+    with tempfile.TemporaryDirectory() as directory:
+        capture_path = os.path.join(directory, 'heat.c32r')
+        archive_path = os.path.join(directory, 'heat.c32a')
+        record_heat(capture_module, DeviceTimebase, capture_path, args.devices, args.nodes, args.seconds)
+        capture = capture_module.RaceCapture.load(capture_path)
+        samples = capture.sample_count
+        keys = [(device_idx, node_idx) for device_idx in range(args.devices) for node_idx in range(args.nodes)]
+        traces = {key: capture.read(*key) for key in keys}
+
+        def write_archive():
+            writer = archive_module.ArchiveWriter(archive_path)
+            archive_module.archive_capture(writer, capture, interval_ms=round(INTERVAL_S * 1000))
+            writer.close()
+
+        def read_archive():
+            reader = archive_module.ArchiveReader(archive_path)
+            for key in keys:
+                reader.read_node(0, *key)
+            reader.close()
+
+        def write_dump():
+            return b''.join(
+                array.array('d', traces[key][0]).tobytes() + array.array('H', traces[key][3]).tobytes()
+                for key in keys
+            )
+
+        def read_dump(data):
+            offset = 0
+            for key in keys:
+                count = len(traces[key][0])
+                timestamps = array.array('d')
+                timestamps.frombytes(data[offset:offset + count * 8])
+                offset += count * 8
+                rssis = array.array('H')
+                rssis.frombytes(data[offset:offset + count * 2])
+                offset += count * 2
+
+        archive_write_s = best_of(args.runs, write_archive)
+        archive_read_s = best_of(args.runs, read_archive)
+        dump = write_dump()
+        dump_write_s = best_of(args.runs, write_dump)
+        dump_read_s = best_of(args.runs, lambda: read_dump(dump))
+        compressed = zlib.compress(dump, 6)
+        zlib_write_s = best_of(args.runs, lambda: zlib.compress(write_dump(), 6))
+        zlib_read_s = best_of(args.runs, lambda: read_dump(zlib.decompress(compressed)))
+
+        # The archive must give back every sample: RSSI exact, timestamps within the stored resolution
+        reader = archive_module.ArchiveReader(archive_path)
+        worst_s = 0.0
+        for key in keys:
+            timestamps, rssis = reader.read_node(0, *key)
+            assert rssis == list(traces[key][3]), key
+            worst_s = max(worst_s, max(abs(a - b) for a, b in zip(timestamps, traces[key][0])))
+        reader.close()
+        archive_bytes = os.path.getsize(archive_path)
+        capture_bytes = os.path.getsize(capture_path)
+        capture.close()
+
+    print(f"{samples} samples: {args.devices} devices x {args.nodes} nodes, {args.seconds:.0f}s at "
+          f"{INTERVAL_S * 1000:.0f} ms; worst archived timestamp error {worst_s * 1e6:.1f} us")
+    print(f"{'format':<14s} {'bytes':>10s} {'B/sample':>9s} {'vs dump':>8s} {'write M/s':>10s} {'read M/s':>9s}")
+    rows = [
+        ('capture file', capture_bytes, None, None),
+        ('plain dump', len(dump), dump_write_s, dump_read_s),
+        ('zlib-6 dump', len(compressed), zlib_write_s, zlib_read_s),
+        ('archive', archive_bytes, archive_write_s, archive_read_s),
+    ]
+    for name, size, write_s, read_s in rows:
+        print(
+            f"{name:<14s} {size:10d} {size / samples:9.2f} {len(dump) / size:7.1f}x "
+            + (f"{samples / write_s / 1e6:10.2f} " if write_s else f"{'-':>10s} ")
+            + (f"{samples / read_s / 1e6:9.2f}" if read_s else f"{'-':>9s}")
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+"""
+Chorus32 Crossing Engine Benchmark
+
+Compares crossing detection cost per sample:
+
+- per-sample: the logic the engine replaced, updating attributes on a
+  node object for each sample
+- process_batch: the struct-of-arrays engine over one read chunk of
+  interleaved samples from all receivers
+- process_node_run: a long single-node run (re-evaluating a stored race),
+  in pure Python and, when installed, with NumPy
+
+Every mode must find the same crossings as the per-sample logic; the
+script stops with an assertion error if one does not.
+
+Runs without RotorHazard or gevent: the core package is imported from a
+bare interface_chorus32 package, so the plugin __init__ never runs.
+
+Usage (from the repository root):
+
+    python benchmarks/bench_crossing.py --nodes 8 --seconds 180
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import types
+
+PLUGIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'custom_plugins', 'interface_chorus32')
+INTERVAL_S = 0.01
+CHUNK_CYCLES = 3  # Push cycles per read chunk (30 ms of samples at 10 ms)
+ENTER_AT_LEVEL = 200
+EXIT_AT_LEVEL = 160
+
+
+def _import_crossing():
+    """Import the crossing engine without running the plugin __init__"""
+    if 'interface_chorus32' not in sys.modules:
+        package = types.ModuleType('interface_chorus32')
+        package.__path__ = [os.path.abspath(PLUGIN_DIR)]
+        sys.modules['interface_chorus32'] = package
+    from interface_chorus32.chorus32_core import chorus32_crossing
+    return chorus32_crossing
+
+
+class PerSampleNode:
+    """Node state updated one sample at a time, as before the engine"""
+    def __init__(self):
+        self.enter_at_level = ENTER_AT_LEVEL
+        self.exit_at_level = EXIT_AT_LEVEL
+        self.current_rssi = 0
+        self.node_peak_rssi = 0
+        self.node_nadir_rssi = 9999
+        self.crossing_flag = False
+        self.pass_peak_rssi = 0
+        self.pass_nadir_rssi = 9999
+        self.enter_at_timestamp = 0.0
+        self.exit_at_timestamp = 0.0
+
+
+def per_sample(nodes, node_ids, rssis, timestamps, passes):
+    for index, rssi, timestamp in zip(node_ids, rssis, timestamps):
+        node = nodes[index]
+        node.current_rssi = rssi
+        if rssi > node.node_peak_rssi:
+            node.node_peak_rssi = rssi
+        if rssi < node.node_nadir_rssi:
+            node.node_nadir_rssi = rssi
+        was_crossing = node.crossing_flag
+        if not was_crossing:
+            is_crossing = rssi >= node.enter_at_level
+        else:
+            is_crossing = rssi >= node.exit_at_level
+        if is_crossing != was_crossing:
+            if is_crossing:
+                node.crossing_flag = True
+                node.pass_peak_rssi = rssi
+                node.pass_nadir_rssi = rssi
+                node.enter_at_timestamp = timestamp
+            else:
+                node.crossing_flag = False
+                node.exit_at_timestamp = timestamp
+                passes.append((index, timestamp, node.pass_peak_rssi))
+                node.pass_peak_rssi = 0
+                node.pass_nadir_rssi = 9999
+        elif is_crossing:
+            if rssi > node.pass_peak_rssi:
+                node.pass_peak_rssi = rssi
+            if rssi < node.pass_nadir_rssi:
+                node.pass_nadir_rssi = rssi
+
+
+def make_traces(nodes, cycles):
+    """Noisy floor with a pass on every node every few seconds"""
+    rng = random.Random(1)
+    traces = []
+    for index in range(nodes):
+        trace = [rng.randint(50, 120) for _ in range(cycles)]
+        for start in range(rng.randint(0, 300), cycles, rng.randint(300, 600)):
+            for offset in range(min(30, cycles - start)):
+                trace[start + offset] = 300 - abs(offset - 15) * 8 + rng.randint(-20, 20)
+        traces.append(trace)
+    return traces
+
+
+def best_of(runs, fn):
+    best = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-sample crossing logic against the crossing engine")
+    parser.add_argument('--nodes', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=180.0, help="Trace length at 10 ms per sample")
+    parser.add_argument('--runs', type=int, default=5, help="Timed runs; the best is reported")
+    args = parser.parse_args()
+
+    crossing = _import_crossing()
+    cycles = int(args.seconds / INTERVAL_S)
+    traces = make_traces(args.nodes, cycles)
+    timestamps = [cycle * INTERVAL_S for cycle in range(cycles)]
+    chunks = []
+    for start in range(0, cycles, CHUNK_CYCLES):
+        chunk_cycles = range(start, min(start + CHUNK_CYCLES, cycles))
+        chunks.append((
+            [index for _cycle in chunk_cycles for index in range(args.nodes)],
+            [traces[index][cycle] for cycle in chunk_cycles for index in range(args.nodes)],
+            [timestamps[cycle] for cycle in chunk_cycles for _index in range(args.nodes)],
+        ))
+    samples = cycles * args.nodes
+
+    def run_per_sample():
+        nodes = [PerSampleNode() for _ in range(args.nodes)]
+        passes = []
+        for node_ids, rssis, chunk_times in chunks:
+            per_sample(nodes, node_ids, rssis, chunk_times, passes)
+        return sorted(passes)
+
+    def new_engine():
+        engine = crossing.CrossingEngine(args.nodes)
+        for index in range(args.nodes):
+            engine.set_levels(index, ENTER_AT_LEVEL, EXIT_AT_LEVEL)
+        return engine
+
+    def passes_of(events):
+        return [(index, timestamp, peak) for _pos, kind, index, timestamp, peak in events
+                if kind == crossing.CROSSING_EXIT]
+
+    def run_batch():
+        engine = new_engine()
+        passes = []
+        for node_ids, rssis, chunk_times in chunks:
+            passes += passes_of(engine.process_batch(node_ids, rssis, chunk_times))
+        return sorted(passes)
+
+    def run_node_runs():
+        engine = new_engine()
+        passes = []
+        for index in range(args.nodes):
+            passes += passes_of(engine.process_node_run(index, traces[index], timestamps))
+        return sorted(passes)
+
+    baseline_s, expected = best_of(args.runs, run_per_sample)
+    rows = [('per-sample (before)', baseline_s)]
+
+    batch_s, passes = best_of(args.runs, run_batch)
+    assert passes == expected, "process_batch differs from the per-sample logic"
+    rows.append((f'process_batch ({CHUNK_CYCLES * args.nodes}/chunk)', batch_s))
+
+    numpy = crossing.numpy
+    crossing.numpy = None
+    run_s, passes = best_of(args.runs, run_node_runs)
+    crossing.numpy = numpy
+    assert passes == expected, "process_node_run (pure Python) differs from the per-sample logic"
+    rows.append(('process_node_run', run_s))
+    if numpy is not None:
+        run_s, passes = best_of(args.runs, run_node_runs)
+        assert passes == expected, "process_node_run (NumPy) differs from the per-sample logic"
+        rows.append(('process_node_run NumPy', run_s))
+
+    print(f"{samples} samples: {args.nodes} nodes x {args.seconds:.0f}s at {INTERVAL_S * 1000:.0f} ms, "
+          f"{len(expected)} passes, all modes identical")
+    print(f"{'mode':<28s} {'ns/sample':>10s} {'speedup':>8s}")
+    for name, elapsed in rows:
+        print(f"{name:<28s} {elapsed / samples * 1e9:10.0f} {baseline_s / elapsed:7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Chorus32 Encoder Benchmark
+
+Compares the str encoder (Chorus32Encoder, whose lines the plugin used to
+encode to bytes on every write) with the bytes encoder
+(Chorus32BytesEncoder): single commands, and a batch of band, channel and
+push interval setpoints for every receiver written as one buffer, with
+and without '*' collapsing. Every batch is checked to decode to the same
+lines before it is timed.
+
+Runs without RotorHazard or gevent: the protocol module is imported from
+a bare interface_chorus32 package, so the plugin __init__ never runs.
+
+Usage (from the repository root):
+
+    python benchmarks/bench_encoder.py --nodes 8
+"""
+
+import argparse
+import os
+import sys
+import timeit
+import types
+
+PLUGIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'custom_plugins', 'interface_chorus32')
+
+
+def _import_protocol():
+    """Import the protocol module without running the plugin __init__"""
+    if 'interface_chorus32' not in sys.modules:
+        package = types.ModuleType('interface_chorus32')
+        package.__path__ = [os.path.abspath(PLUGIN_DIR)]
+        sys.modules['interface_chorus32'] = package
+    from interface_chorus32.chorus32_core import chorus32_protocol
+    return chorus32_protocol
+
+
+def best_us(fn, runs, number):
+    """Best time per call over several runs, in microseconds"""
+    return min(timeit.repeat(fn, repeat=runs, number=number)) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="str encoder against the bytes encoder")
+    parser.add_argument('--nodes', type=int, default=8, help="Receivers on the device")
+    parser.add_argument('--runs', type=int, default=5, help="Timed runs; the best is reported")
+    parser.add_argument('--number', type=int, default=20000, help="Calls per run")
+    args = parser.parse_args()
+
+    protocol = _import_protocol()
+    Commands = protocol.Chorus32Commands
+    Encoder = protocol.Chorus32Encoder
+    BytesEncoder = protocol.Chorus32BytesEncoder
+    nodes = range(args.nodes)
+
+    commands = (
+        [(node, Commands.BAND, 0) for node in nodes]
+        + [(node, Commands.CHANNEL, node) for node in nodes]
+        + [(node, Commands.RSSI_MON_INTERVAL, 10) for node in nodes]
+    )
+    str_methods = {
+        Commands.BAND: Encoder.encode_set_band,
+        Commands.CHANNEL: Encoder.encode_set_channel,
+        Commands.RSSI_MON_INTERVAL: Encoder.encode_set_rssi_interval,
+    }
+
+    def str_batch():
+        return ''.join([str_methods[command](node, value) for node, command, value in commands]).encode('utf-8')
+
+    def bytes_batch():
+        return BytesEncoder.encode_batch(commands)
+
+    def bytes_batch_collapsed():
+        return BytesEncoder.encode_batch(commands, args.nodes)
+
+    assert bytes_batch() == str_batch()
+    collapsed = bytes_batch_collapsed()
+    expected = [
+        Encoder.encode_set_band('*', 0).encode('ascii'),
+        *(Encoder.encode_set_channel(node, node).encode('ascii') for node in nodes),
+        Encoder.encode_set_rssi_interval('*', 10).encode('ascii'),
+    ]
+    assert collapsed == b''.join(expected) or args.nodes < 2
+
+    rows = [
+        ('single R3I000A', 'str + encode', lambda: Encoder.encode_set_rssi_interval(3, 10).encode('utf-8'), None),
+        ('single R3I000A', 'bytes', lambda: BytesEncoder.encode(3, Commands.RSSI_MON_INTERVAL, 10), None),
+        ('single R3B1', 'str + encode', lambda: Encoder.encode_set_band(3, 1).encode('utf-8'), None),
+        ('single R3B1', 'bytes', lambda: BytesEncoder.encode(3, Commands.BAND, 1), None),
+        (f'{len(commands)} commands', 'str + join + encode', str_batch, str_batch()),
+        (f'{len(commands)} commands', 'bytes batch', bytes_batch, bytes_batch()),
+        (f'{len(commands)} commands', "bytes batch, '*'", bytes_batch_collapsed, collapsed),
+    ]
+    print(f"{'case':<16s} {'encoder':<22s} {'us/call':>8s} {'bytes':>6s}")
+    for case, name, fn, output in rows:
+        number = args.number if output is None else max(1, args.number // 10)
+        size = len(fn()) if output is None else len(output)
+        print(f"{case:<16s} {name:<22s} {best_us(fn, args.runs, number):8.2f} {size:6d}")
+
+
+if __name__ == '__main__':
+    main()
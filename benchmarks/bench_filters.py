@@ -0,0 +1,99 @@
+"""
+Chorus32 RSSI Filter Benchmark
+
+Measures the per-sample cost of each RSSI filter the way the plugin runs
+them: one call per read chunk of interleaved samples from all receivers
+of a device. The median filter is also timed at longer windows, since its
+cost grows with the window.
+
+Runs without RotorHazard or gevent: the core package is imported from a
+bare interface_chorus32 package, so the plugin __init__ never runs.
+
+Usage (from the repository root):
+
+    python benchmarks/bench_filters.py --nodes 8 --seconds 60
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import types
+
+PLUGIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'custom_plugins', 'interface_chorus32')
+INTERVAL_S = 0.01
+CHUNK_CYCLES = 3  # Push cycles per read chunk (30 ms of samples at 10 ms)
+
+
+def _import_filters():
+    """Import the filter module without running the plugin __init__"""
+    if 'interface_chorus32' not in sys.modules:
+        package = types.ModuleType('interface_chorus32')
+        package.__path__ = [os.path.abspath(PLUGIN_DIR)]
+        sys.modules['interface_chorus32'] = package
+    from interface_chorus32.chorus32_core import chorus32_filters
+    return chorus32_filters
+
+
+def make_chunks(nodes, cycles):
+    """Read chunks of interleaved noisy RSSI with a pass every few seconds"""
+    rng = random.Random(1)
+    chunks = []
+    for start in range(0, cycles, CHUNK_CYCLES):
+        node_ids = []
+        rssis = []
+        for cycle in range(start, min(start + CHUNK_CYCLES, cycles)):
+            for index in range(nodes):
+                level = 300 if (cycle + index * 37) % 400 < 30 else 90
+                node_ids.append(index)
+                rssis.append(level + rng.randint(-25, 25))
+        chunks.append((node_ids, rssis))
+    return chunks
+
+
+def best_of(runs, fn):
+    best = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-sample cost of the RSSI filters")
+    parser.add_argument('--nodes', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=60.0, help="Stream length at 10 ms per sample")
+    parser.add_argument('--runs', type=int, default=5, help="Timed runs; the best is reported")
+    args = parser.parse_args()
+
+    filters = _import_filters()
+    cycles = int(args.seconds / INTERVAL_S)
+    chunks = make_chunks(args.nodes, cycles)
+    samples = sum(len(node_ids) for node_ids, _rssis in chunks)
+
+    cases = [
+        (filters.FILTER_LABELS[filters.FILTER_NONE], lambda: filters.PassthroughFilter(args.nodes)),
+        (filters.FILTER_LABELS[filters.FILTER_EMA], lambda: filters.EmaFilter(args.nodes)),
+        (filters.FILTER_LABELS[filters.FILTER_ONE_EURO], lambda: filters.OneEuroFilter(args.nodes, INTERVAL_S)),
+    ] + [
+        (f"{filters.FILTER_LABELS[filters.FILTER_MEDIAN]} ({window})",
+         lambda window=window: filters.MedianFilter(args.nodes, window=window))
+        for window in (filters.DEFAULT_MEDIAN_WINDOW, 15, 101)
+    ]
+
+    print(f"{samples} samples: {args.nodes} nodes x {args.seconds:.0f}s at {INTERVAL_S * 1000:.0f} ms, "
+          f"{CHUNK_CYCLES * args.nodes} samples per call")
+    print(f"{'filter':<30s} {'ns/sample':>10s}")
+    for name, make in cases:
+        def run():
+            rssi_filter = make()
+            for node_ids, rssis in chunks:
+                rssi_filter.process(node_ids, rssis)
+        print(f"{name:<30s} {best_of(args.runs, run) / samples * 1e9:10.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+"""
+Chorus32 Ingest Worker Benchmark
+
+Measures the CPU time the main (RotorHazard) process spends on the RSSI
+stream with and without the ingest worker. A synthetic stream of
+8-receiver devices (10 ms push, a pass on every receiver every few
+seconds) is replayed in real time:
+
+- inline: the main process runs the interface's _update (reads, framing,
+  _process_lines, crossings, estimators) itself
+- worker: the ingest worker process does all of that; the main process
+  only runs Chorus32IngestWorker.poll
+
+Runs without RotorHazard or gevent: when they are not installed, the
+few names the plugin imports from them are replaced by minimal stand-ins
+before the plugin is loaded. Requires a platform with fork.
+
+Usage (from the repository root):
+
+    python benchmarks/bench_ingest_worker.py --devices 1 2 4 8 --seconds 10
+"""
+
+import argparse
+import os
+import sys
+import time
+import types
+
+PLUGINS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'custom_plugins')
+RECEIVERS = 8
+PASS_PERIOD_S = 4.0
+PASS_WIDTH_S = 0.3
+FLOOR_RSSI = 60
+PASS_RSSI = 300
+
+
+def _install_stand_ins():
+    """Register minimal RotorHazard and gevent modules that are not installed"""
+    def missing(name):
+        try:
+            __import__(name)
+            return False
+        except ImportError:
+            return True
+
+    if missing('gevent'):
+        gevent = types.ModuleType('gevent')
+        gevent.sleep = time.sleep
+        gevent_pool = types.ModuleType('gevent.pool')
+        gevent_pool.Pool = None  # Only used by device discovery
+        gevent.pool = gevent_pool
+        sys.modules['gevent'] = gevent
+        sys.modules['gevent.pool'] = gevent_pool
+
+    if missing('eventmanager'):
+        eventmanager = types.ModuleType('eventmanager')
+        eventmanager.Evt = type('Evt', (), {})
+        sys.modules['eventmanager'] = eventmanager
+
+    if missing('RHUI'):
+        rhui = types.ModuleType('RHUI')
+        for name in ('UIField', 'UIFieldType', 'UIFieldSelectOption'):
+            setattr(rhui, name, type(name, (), {}))
+        sys.modules['RHUI'] = rhui
+
+    if missing('BaseHardwareInterface'):
+        base = types.ModuleType('BaseHardwareInterface')
+
+        class BaseHardwareInterface:
+            LAP_SOURCE_REALTIME = 0
+
+            def __init__(self):
+                self.pass_record_callback = None
+
+            def log(self, message):
+                pass
+        base.BaseHardwareInterface = BaseHardwareInterface
+        sys.modules['BaseHardwareInterface'] = base
+
+    if missing('Node'):
+        node_module = types.ModuleType('Node')
+
+        class Node:
+            def __init__(self):
+                self.index = -1
+                self.frequency = 0
+                self.current_rssi = 0
+                self.crossing_flag = False
+                self.enter_at_level = 0
+                self.exit_at_level = 0
+                self.node_peak_rssi = 0
+                self.node_nadir_rssi = 0
+                self.pass_peak_rssi = 0
+                self.pass_nadir_rssi = 0
+                self.enter_at_timestamp = 0
+                self.exit_at_timestamp = 0
+        node_module.Node = Node
+        sys.modules['Node'] = node_module
+
+    if missing('Database'):
+        database = types.ModuleType('Database')
+        database.LapSource = type('LapSource', (), {'REALTIME': 0})
+        sys.modules['Database'] = database
+
+
+class SyntheticStream:
+    """Device stream pushing 8 receivers of RSSI in real time
+
+    Answers the receiver count and time queries the interface sends. The
+    device clock runs from connect; the push starts at the first read (as
+    once RSSI push is enabled), so device setup does not leave a backlog.
+    One cycle's bytes are precomputed per RSSI phase, so reads cost a join.
+    """
+    def __init__(self, device_index, interval_s):
+        self.interval_s = interval_s
+        self.started_at = time.monotonic()
+        self.cycles = None
+        self.pending = []
+        cycles_per_period = int(PASS_PERIOD_S / interval_s)
+        pass_cycles = max(1, int(PASS_WIDTH_S / interval_s))
+        self.period = []
+        for cycle in range(cycles_per_period):
+            lines = []
+            for receiver in range(RECEIVERS):
+                # Receivers and devices pass at staggered times
+                phase = (cycle + (receiver + device_index * RECEIVERS) * cycles_per_period // 11) % cycles_per_period
+                rssi = PASS_RSSI if phase < pass_cycles else FLOOR_RSSI + (cycle * 7 + receiver) % 9 - 4
+                lines.append(f"S{receiver}r{rssi:04X}\n")
+            self.period.append("".join(lines).encode())
+
+    def write(self, data):
+        for line in data.decode().split('\n'):
+            if line.startswith('N'):
+                self.pending.append(f"N{RECEIVERS:X}\n".encode())
+            elif line.startswith('R') and line[2:3] == 't':
+                device_ms = int((time.monotonic() - self.started_at) * 1000)
+                self.pending.append(f"S0t{device_ms:08X}\n".encode())
+
+    def read(self, max_size):
+        target = int((time.monotonic() - self.started_at) / self.interval_s)
+        if self.cycles is None:
+            self.cycles = target
+        period = self.period
+        chunks = self.pending
+        self.pending = []
+        while self.cycles < target and len(chunks) * len(period[0]) < max_size:
+            chunks.append(period[self.cycles % len(period)])
+            self.cycles += 1
+        return b"".join(chunks)
+
+    def close(self):
+        pass
+
+
+def build_interface(plugin, device_count, interval_ms):
+    devices = []
+    for dev_idx in range(device_count):
+        device = plugin.Chorus32Device(f'socket://bench-{dev_idx}:9000/', f'Bench {dev_idx + 1}')
+        device.rssi_interval_ms = interval_ms
+        device.set_receiver_count(RECEIVERS)
+        device._create_stream = lambda dev_idx=dev_idx: SyntheticStream(dev_idx, interval_ms / 1000.0)
+        devices.append(device)
+    interface = plugin.Chorus32Interface(devices=devices)
+    for device in devices:
+        for node in device.nodes:
+            node.enter_at_level = 200
+            node.exit_at_level = 150
+    laps = []
+    interface.pass_record_callback = lambda node, timestamp, source, peak=None: laps.append(timestamp)
+    return interface, laps
+
+
+def run_inline(plugin, device_count, seconds, interval_ms):
+    interface, laps = build_interface(plugin, device_count, interval_ms)
+    for device in interface.devices:
+        device.connect()
+        interface._setup_device(device)
+    deadline = time.monotonic() + seconds
+    cpu_start = time.process_time()
+    while time.monotonic() < deadline:
+        interface._update()
+        time.sleep(plugin.READ_POLL_RATE)
+    cpu_s = time.process_time() - cpu_start
+    for device in interface.devices:
+        device.close_callback = lambda: None
+        device.close()
+    return cpu_s, len(laps)
+
+
+def run_worker(plugin, device_count, seconds, interval_ms):
+    interface, laps = build_interface(plugin, device_count, interval_ms)
+    worker = plugin.Chorus32IngestWorker(interface, plugin.READ_POLL_RATE)
+    interface.worker = worker
+    if not worker.start(plugin.CONNECT_TIMEOUT_S):
+        raise RuntimeError("Ingest worker did not connect the synthetic devices")
+    # The worker sets the devices up after forking; start timing once every receiver streams
+    rows = [dev_idx * plugin.chorus32.MAX_RECEIVERS + local_idx for dev_idx, local_idx in interface._node_locations]
+    warmup_deadline = time.monotonic() + 10
+    while not all(worker.latest_rssi.heads[row] for row in rows) and time.monotonic() < warmup_deadline:
+        worker.poll()
+        time.sleep(plugin.READ_POLL_RATE)
+    del laps[:]
+    deadline = time.monotonic() + seconds
+    cpu_start = time.process_time()
+    try:
+        while time.monotonic() < deadline:
+            worker.poll()
+            time.sleep(plugin.READ_POLL_RATE)
+        cpu_s = time.process_time() - cpu_start
+    finally:
+        for device in interface.devices:
+            device.close_callback = lambda: None
+        worker.stop()
+    return cpu_s, len(laps)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Main-process CPU of inline vs ingest worker RSSI handling")
+    parser.add_argument('--devices', type=int, nargs='+', default=[1, 2, 4, 8], help="Device counts to run")
+    parser.add_argument('--seconds', type=float, default=10.0, help="Stream time per run")
+    parser.add_argument('--interval-ms', type=int, default=10, help="RSSI push interval")
+    args = parser.parse_args()
+
+    _install_stand_ins()
+    sys.path.insert(0, os.path.abspath(PLUGINS_DIR))
+    import interface_chorus32 as plugin
+
+    samples_per_s = RECEIVERS * 1000 / args.interval_ms
+    print(f"{args.seconds:.0f}s per run, {RECEIVERS} receivers per device at {args.interval_ms} ms; "
+          "main-process CPU time as a share of one core")
+    print(f"{'devices':>7s} {'samples/s':>10s} {'inline':>8s} {'worker':>8s} {'relief':>7s} {'laps in/wk':>11s}")
+    for device_count in args.devices:
+        inline_s, inline_laps = run_inline(plugin, device_count, args.seconds, args.interval_ms)
+        worker_s, worker_laps = run_worker(plugin, device_count, args.seconds, args.interval_ms)
+        print(
+            f"{device_count:7d} {samples_per_s * device_count:10.0f} {inline_s / args.seconds * 100:7.1f}% "
+            f"{worker_s / args.seconds * 100:7.1f}% {inline_s / max(worker_s, 1e-9):6.1f}x "
+            f"{inline_laps:5d}/{worker_laps:<5d}"
+        )
+
+
+if __name__ == '__main__':
+    main()
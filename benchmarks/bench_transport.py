@@ -0,0 +1,172 @@
+"""
+Chorus32 Transport Benchmark
+
+Measures command-to-echo latency and burst recovery over loopback TCP,
+with and without the Low Latency transport profile, against a simulated
+Chorus32 device:
+
+- the simulator optionally pushes RSSI for 6 receivers every 10 ms and
+  answers each time request ('R0t') with an 'S0t' reply
+- each round writes a command batch and then a time request, the way the
+  command scheduler and time sync do, and times the 't' reply
+- burst recovery: with the push on, the simulator stalls for a few
+  seconds (a WiFi hiccup) and then delivers everything at once; the
+  backlog is drained the way the plugin polls (READ_CHUNK_SIZE or the
+  profile's read size, up to MAX_DRAIN_READS reads per poll)
+
+Without the profile and with the push off, Nagle's algorithm holds the
+time request until the batch before it is acknowledged, and the
+simulator's kernel delays that ACK (about 40 ms on Linux).
+
+Runs without RotorHazard or gevent: the transport module is imported
+from a bare interface_chorus32 package, so the plugin __init__ never runs.
+
+Usage (from the repository root):
+
+    python benchmarks/bench_transport.py --rounds 150 --stall 3
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+import types
+
+PLUGIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'custom_plugins', 'interface_chorus32')
+RECEIVERS = 6
+PUSH_INTERVAL_S = 0.01
+READ_CHUNK_SIZE = 512  # As in the plugin
+MAX_DRAIN_READS = 8  # As in the plugin
+CONNECT_TIMEOUT_S = 2.0
+
+
+def _import_transport():
+    """Import the transport module without running the plugin __init__"""
+    if 'interface_chorus32' not in sys.modules:
+        package = types.ModuleType('interface_chorus32')
+        package.__path__ = [os.path.abspath(PLUGIN_DIR)]
+        sys.modules['interface_chorus32'] = package
+    from interface_chorus32 import chorus32_transport
+    return chorus32_transport
+
+
+class SimulatedDevice(threading.Thread):
+    """Loopback Chorus32 stand-in: RSSI push, time replies and stalls"""
+    def __init__(self, push):
+        super().__init__(daemon=True)
+        self.server = socket.socket()
+        self.server.bind(('127.0.0.1', 0))
+        self.server.listen(1)
+        self.port = self.server.getsockname()[1]
+        self.push = push
+        self.stall_until = 0.0
+        self.started = time.monotonic()
+
+    def run(self):
+        conn, _address = self.server.accept()
+        conn.setblocking(False)
+        buffer = b''
+        pending = []
+        next_push = time.monotonic()
+        while True:
+            now = time.monotonic()
+            try:
+                data = conn.recv(4096)
+                if not data:
+                    return
+                buffer += data
+            except BlockingIOError:
+                pass
+            except OSError:
+                return
+            *lines, buffer = buffer.split(b'\n')
+            for line in lines:
+                if line.endswith(b't'):
+                    pending.append(b"S0t%08X\n" % int((now - self.started) * 1000))
+            if self.push:
+                while next_push <= now:
+                    pending.append(b''.join(b"S%Xr%04X\n" % (receiver, 100) for receiver in range(RECEIVERS)))
+                    next_push += PUSH_INTERVAL_S
+            if pending and now >= self.stall_until:
+                out = b''.join(pending)
+                pending = []
+                conn.setblocking(True)
+                try:
+                    conn.sendall(out)
+                except OSError:
+                    return
+                conn.setblocking(False)
+            time.sleep(0.0005)
+
+
+def run(transport, profile, push, rounds, stall_s):
+    """Echo latencies in ms, plus (bytes, reads, polls, ms) of the burst drain with the push on"""
+    device = SimulatedDevice(push)
+    device.start()
+    stream = transport.SocketStream.connect(('127.0.0.1', device.port), CONNECT_TIMEOUT_S, profile)
+    read_size = (profile.read_size if profile else 0) or READ_CHUNK_SIZE
+    latencies = []
+    for _round in range(rounds):
+        stream.write(b"R0I000A\nR1I000A\n")
+        started = time.monotonic()
+        stream.write(b"R0t\n")
+        received = b''
+        while b'S0t' not in received:
+            received += stream.read(read_size)
+        latencies.append((time.monotonic() - started) * 1000)
+        time.sleep(0.02)
+
+    burst = None
+    if push:
+        while len(stream.read(read_size)) == read_size:
+            pass  # Start the stall with nothing left over
+        device.stall_until = time.monotonic() + stall_s
+        time.sleep(stall_s + 0.05)
+        started = time.monotonic()
+        total = reads = polls = 0
+        draining = True
+        while draining:
+            polls += 1
+            for _read in range(MAX_DRAIN_READS):
+                chunk = stream.read(read_size)
+                total += len(chunk)
+                reads += 1
+                if len(chunk) < read_size:
+                    draining = False
+                    break
+        burst = total, reads, polls, (time.monotonic() - started) * 1000
+    stream.close()
+    return latencies, burst
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Echo latency and burst recovery with and without the transport profile")
+    parser.add_argument('--rounds', type=int, default=150)
+    parser.add_argument('--stall', type=float, default=3.0, help="Seconds the simulated device stalls before a burst")
+    args = parser.parse_args()
+
+    transport = _import_transport()
+    profiles = (
+        ('default', None),
+        ('low latency', transport.TRANSPORT_PROFILES[transport.PROFILE_LOW_LATENCY]),
+    )
+    print(f"{'push':<5s} {'profile':<12s} {'median ms':>10s} {'p95 ms':>8s} {'max ms':>8s}   burst after a {args.stall:.0f}s stall")
+    for push in (False, True):
+        for name, profile in profiles:
+            latencies, burst = run(transport, profile, push, args.rounds, args.stall)
+            latencies.sort()
+            line = (
+                f"{'on' if push else 'off':<5s} {name:<12s} {statistics.median(latencies):10.2f} "
+                f"{latencies[int(len(latencies) * 0.95)]:8.2f} {latencies[-1]:8.2f}"
+            )
+            if burst:
+                total, reads, polls, elapsed_ms = burst
+                line += f"   {total} B in {reads} reads, {polls} polls, {elapsed_ms:.1f} ms"
+            print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,7 @@
 """Chorus32 Provider Plugin for RotorHazard"""
 
 import logging
-import socket
+import os
 import time
 import gevent
 import json
@@ -11,7 +11,34 @@ try:
 except ImportError:
     serial = None
 
-from . import chorus32_protocol as chorus32
+try:
+    from flask import Blueprint, Response, jsonify, request
+except ImportError:
+    Blueprint = None
+
+from .chorus32_core import chorus32_protocol as chorus32
+from .chorus32_calibration import LevelEstimator
+from .chorus32_quality import GateQuality
+from .chorus32_capture import RaceCapture, apply_retention, CAPTURE_SUFFIX, \
+    DEFAULT_MAX_CAPTURES, DEFAULT_MAX_CAPTURE_BYTES
+from .chorus32_archive import archive_captures, ARCHIVE_SUFFIX
+from .chorus32_core.chorus32_filters import create_rssi_filter, FILTER_NONE, FILTER_LABELS
+from .chorus32_core.chorus32_crossing import CrossingEngine, CROSSING_ENTER, reevaluate_passes, diff_passes
+from .chorus32_snapshot import PassSnapshotPool, format_pass_snapshot, DEFAULT_POOL_SIZE
+from .chorus32_overload import OverloadMonitor, OVERLOAD_AGE_S
+from .chorus32_relay import StreamRelay, DEFAULT_RELAY_HOST
+from .chorus32_transport import SocketStream, TRANSPORT_PROFILES, PROFILE_DEFAULT
+from .chorus32_discovery import discover_devices, subnet_candidates, serial_candidates, DEFAULT_SCAN_SUBNET
+from .chorus32_core.chorus32_session import DeviceSession
+from .chorus32_core.chorus32_timesync import DeviceTimebase
+from .chorus32_core.chorus32_stream import SEGMENT_RSSI
+from .chorus32_voltage import VoltageMonitor
+from .chorus32_survey import SpectrumSurvey, parse_survey_range, SURVEY_SAMPLES_PER_STEP, \
+    DEFAULT_SURVEY_MIN_MHZ, DEFAULT_SURVEY_MAX_MHZ, DEFAULT_SURVEY_STEP_MHZ
+from .chorus32_profiler import HotPathProfiler, format_report, summarize_report, \
+    DEFAULT_PROFILE_WINDOW_S, MAX_PROFILE_WINDOW_S
+from .chorus32_scheduler import CommandScheduler, PRIORITY_SETPOINT, PRIORITY_SYNC, PRIORITY_POLL
+from .chorus32_worker import Chorus32IngestWorker
 
 from eventmanager import Evt
 from RHUI import UIField, UIFieldType, UIFieldSelectOption
@@ -26,10 +53,25 @@ SOCKET_SCHEME = 'socket://'
 FILE_SCHEME = 'file:'
 CONNECT_TIMEOUT_S = 5
 READ_TIMEOUT_S = 0.25
+READ_CHUNK_SIZE = 512  # Default bytes per read; transport profiles may read more
+MAX_DRAIN_READS = 8  # Reads per poll while the device keeps returning full chunks
 WRITE_CHILL_TIME_S = 0.01
 READ_POLL_RATE = 0.05  # 20Hz
 DEFAULT_RSSI_INTERVAL_MS = 10  # 10ms RSSI push interval
 DEFAULT_CHORUS32_PORT = 9000
+DEFAULT_RECEIVER_COUNT = 6  # Nodes per device until its receiver count is known
+AUTO_CALIBRATE_INTERVAL_S = 5.0  # How often suggested levels are applied when enabled
+PASS_MATCH_TOLERANCE_S = 0.25  # Recorded and re-evaluated passes closer than this are the same lap
+BACKLOG_PROBE_INTERVAL_S = 1.0  # Time requests used to measure sample age
+TIME_SYNC_JITTER_S = 0.1
+CONFIG_CHECK_INTERVAL_S = 30.0  # Receiver count re-read to verify the device configuration
+DEFAULT_VOLTAGE_INTERVAL_S = 30  # Voltage poll interval (0 = off)
+RACE_POLL_BACKOFF = 4  # Poll periods are stretched this much while racing
+SHED_MARGIN = 50  # Samples this far below enter_at_level may be shed when overloaded
+SHED_DECIMATION = 4  # Keep 1 of every N sheddable samples
+PROFILE_REPORT_URL = '/chorus32/profile-report'
+PASS_SNAPSHOT_URL = '/chorus32/pass-snapshot'  # ?seat=<1-based seat>&lap=<pass number, 0 = first>
+PROFILE_WORKER_TIMEOUT_S = 5.0  # Wait this long after a profiling window for the ingest worker's report
 
 
 def serial_url(port):
@@ -47,52 +89,94 @@ def socket_url(ip, port=DEFAULT_CHORUS32_PORT):
     return f"socket://{ip}:{port}/"
 
 
-class SocketStream:
-    """Socket stream wrapper for network connections"""
-    def __init__(self, sock):
-        self.socket = sock
-
-    def write(self, data):
-        self.socket.sendall(data)
-
-    def read(self, max_size):
-        return self.socket.recv(max_size)
-
-    def close(self):
-        self.socket.close()
-
-
 class Chorus32Node(Node):
-    """Represents a single Chorus32 receiver node (1 of 6 per device)"""
+    """Represents a single Chorus32 receiver node"""
     def __init__(self, device, local_index):
         super().__init__()
-        self.local_index = local_index  # 0-5
+        self.local_index = local_index  # Receiver index on the device
         self.device = device
         self.is_configured = False
         self.band_idx = None
         self.channel_idx = None
         self.is_active = True  # Chorus32-specific: per-node enable/disable
+        self.level_estimator = LevelEstimator()
+        self.gate_quality = GateQuality()
+        self.pass_uncertainty_s = None  # Timing uncertainty of the last pass
 
 
 class Chorus32Device:
-    """Manages a single Chorus32 device with 6 nodes"""
+    """Manages a single Chorus32 device
+
+    Adapts a core DeviceSession (decoding, clock sync, push set-up) to a
+    gevent-friendly blocking connection, a command scheduler and
+    RotorHazard nodes. Nodes can be created up front from an expected receiver count, so the
+    seats exist while the device is offline; the count the device reports
+    ('N') then grows or shrinks the node list.
+    """
     def __init__(self, addr, device_name_str):
         self.name = device_name_str
         self.addr = addr
-        self.stream_buffer = ""  # String buffer for ASCII protocol
         self.io_stream = None
         self.connected = False
         self.nodes = []
 
-        # Time synchronization
-        self._time_offset = 0  # device_ms - server_ms
-        self._last_time_sync = 0
+        # Line framing, RSSI batching and clock sync onto the server timebase;
+        # the decoder's node count and offset are set by the interface
+        self.session = DeviceSession(device_name_str, DEFAULT_RSSI_INTERVAL_MS)
+
+        # Backlog tracking
+        self.overload = OverloadMonitor(device_name_str)
+        self.last_sample_age_s = None
+
+        # Setpoint changes and periodic polls; time replies queue behind RSSI
+        # data, so their age also shows the backlog
+        now = time.monotonic()
+        self.scheduler = CommandScheduler(device_name_str)
+        self.scheduler.add_job(
+            'time_sync', BACKLOG_PROBE_INTERVAL_S, self._time_sync_command, now,
+            priority=PRIORITY_SYNC, jitter_s=TIME_SYNC_JITTER_S, on_sent=self._time_sync_sent
+        )
+        self.scheduler.add_job(
+            'receivers', CONFIG_CHECK_INTERVAL_S, chorus32.Chorus32Encoder.encode_get_num_receivers,
+            now + CONFIG_CHECK_INTERVAL_S, priority=PRIORITY_POLL, jitter_s=1.0
+        )
+
+        # Supply voltage telemetry
+        self.voltage = VoltageMonitor(device_name_str)
+        self.voltage_interval_s = 0
+        self.set_voltage_interval(DEFAULT_VOLTAGE_INTERVAL_S)
 
         # Configuration
-        self.rssi_interval_ms = DEFAULT_RSSI_INTERVAL_MS
+        self.transport_profile = PROFILE_DEFAULT  # Socket tuning, applied on connect
+        self.read_size = READ_CHUNK_SIZE
+
+        # RSSI filter applied ahead of crossing detection
+        self.rssi_filter_name = FILTER_NONE
+        self.rssi_filter = create_rssi_filter(FILTER_NONE, 0, 0)
+
+        self._last_write_timestamp = 0
+
+    def set_receiver_count(self, count, reported=True):
+        """Create or drop nodes to match the device's receiver count
 
-        # Create 6 nodes (not 8 like LapRF!)
-        for index in range(6):
+        Existing nodes keep their settings.
+
+        Args:
+            count: Receiver count from the 'N' reply, or the expected count
+            reported: False when pre-sizing before the device has replied
+
+        Returns:
+            True if the node list changed
+        """
+        if reported:
+            self.session.set_receivers(count)
+            # '*' commands reach every receiver, so only collapse when all are nodes
+            self.scheduler.node_count = count if 0 < count <= chorus32.MAX_RECEIVERS else 0
+        count = max(0, min(count, chorus32.MAX_RECEIVERS))
+        if count == len(self.nodes):
+            return False
+        del self.nodes[count:]
+        for index in range(len(self.nodes), count):
             node = Chorus32Node(self, index)
             node.api_valid_flag = True
             node.node_peak_rssi = 0
@@ -100,23 +184,60 @@ class Chorus32Device:
             node.enter_at_level = 999
             node.exit_at_level = 999
             self.nodes.append(node)
+        self.set_rssi_filter(self.rssi_filter_name)
+        return True
 
-        self._last_write_timestamp = 0
+    @property
+    def timebase(self):
+        return self.session.timebase
+
+    @timebase.setter
+    def timebase(self, timebase):
+        self.session.timebase = timebase
+
+    @property
+    def decoder(self):
+        return self.session.decoder
+
+    @property
+    def reported_receivers(self):
+        """Receiver count from the device's last 'N' reply, or None"""
+        return self.session.receivers
+
+    @property
+    def rssi_interval_ms(self):
+        return self.session.rssi_interval_ms
+
+    @rssi_interval_ms.setter
+    def rssi_interval_ms(self, interval_ms):
+        self.session.set_rssi_interval(interval_ms)
 
     @property
     def is_configured(self):
         """Check if all nodes are configured"""
+        if not self.nodes:
+            return False
         for node in self.nodes:
             if not node.is_configured:
                 return False
         return True
 
+    def set_rssi_filter(self, name):
+        """Select the RSSI filter, resetting its state
+
+        Args:
+            name: Filter name (see chorus32_filters)
+        """
+        self.rssi_filter_name = name
+        self.rssi_filter = create_rssi_filter(name, len(self.nodes), self.rssi_interval_ms / 1000.0)
+
     def connect(self):
         """Connect to Chorus32 device"""
         if not self.connected:
             try:
                 self.io_stream = self._create_stream()
                 self.connected = True
+                self.session.reset()
                 return True
             except Exception as e:
                 logger.warning(f"Unable to connect to Chorus32 at {self.name}: {e}")
@@ -126,6 +247,7 @@ class Chorus32Device:
 
     def _create_stream(self):
         """Create I/O stream for serial or socket connection"""
+        self.read_size = READ_CHUNK_SIZE
         if self.addr.startswith(SERIAL_SCHEME):
             port = self.addr[len(SERIAL_SCHEME):]
             if serial is None:
@@ -145,7 +267,11 @@ class Chorus32Device:
                 host_port = (host_port[0], DEFAULT_CHORUS32_PORT)
             else:
                 host_port = (host_port[0], int(host_port[1]))
-            io_stream = SocketStream(socket.create_connection(host_port, timeout=CONNECT_TIMEOUT_S))
+            profile = TRANSPORT_PROFILES.get(self.transport_profile)
+            io_stream = SocketStream.connect(host_port, CONNECT_TIMEOUT_S, profile)
+            self.read_size = (profile.read_size if profile else 0) or READ_CHUNK_SIZE
+            if io_stream.options:
+                logger.info(f"Chorus32 {self.name} {profile.label} transport: {', '.join(io_stream.options)}")
         else:
             raise ValueError(f"Unsupported address: {self.addr}")
         return io_stream
@@ -162,14 +288,20 @@ class Chorus32Device:
             if isinstance(data, str):
                 data = data.encode('utf-8')
 
-            self.io_stream.write(data)
+            try:
+                self.io_stream.write(data)
+            except OSError as e:
+                # Includes dead links reported by the transport's user timeout
+                logger.warning(f"Chorus32 device {self.name} write failed: {e}")
+                self.close()
+                return
             self._last_write_timestamp = time.monotonic()
 
     def read(self):
         """Read ASCII data from device"""
         if self.connected:
             try:
-                data = self.io_stream.read(512)
+                data = self.io_stream.read(self.read_size)
                 if data:
                     return data.decode('utf-8', errors='ignore')
                 return ""
@@ -185,23 +317,67 @@ class Chorus32Device:
             self.io_stream.close()
             self.io_stream = None
         self.connected = False
+        # Queued commands were meant for the closed connection; periodic jobs stay registered
+        self.scheduler.clear()
         self.close_callback()
 
     def request_time_sync(self):
-        """Request device time for synchronization"""
-        # Request time from node 0
-        self.write(chorus32.Chorus32Encoder.encode_get_time(0))
+        """Request device time for synchronization
+
+        Only one request is outstanding at a time, so each reply pairs with
+        the send time of its own request.
+        """
+        command = self.session.time_request(time.monotonic())
+        if command is None:
+            return
+        self.write(chorus32.Chorus32BytesEncoder.encode(*command))
+        self.session.time_request_sent(time.monotonic())
+
+    def set_voltage_interval(self, interval_s):
+        """Set how often the supply voltage is polled
+
+        Args:
+            interval_s: Seconds between polls (0 = off)
+        """
+        self.voltage_interval_s = interval_s
+        if interval_s > 0:
+            self.scheduler.add_job(
+                'voltage', interval_s, lambda: (0, chorus32.Chorus32Commands.GET_VOLTAGE, None),
+                time.monotonic(), priority=PRIORITY_POLL, jitter_s=interval_s * 0.1
+            )
+        else:
+            self.scheduler.remove_job('voltage')
+
+    def _time_sync_command(self):
+        """Scheduled time request, skipped while one is outstanding"""
+        return self.session.time_request(time.monotonic())
+
+    def _time_sync_sent(self):
+        self.session.time_request_sent(time.monotonic())
 
     def calc_time_offset(self, device_time_ms):
-        """Calculate offset between device and server time
+        """Feed a time reply into the device's clock sync
 
         Args:
             device_time_ms: Device time in milliseconds
         """
-        server_time_ms = time.monotonic() * 1000
-        self._time_offset = device_time_ms - server_time_ms
-        self._last_time_sync = time.monotonic()
-        logger.debug(f"Chorus32 {self.name} time offset: {self._time_offset:.1f}ms")
+        if self.session.time_reply(device_time_ms, time.monotonic()):
+            status = self.timebase.status()
+            logger.debug(
+                f"Chorus32 {self.name} time offset: {status['offset_ms']:.1f}ms, "
+                f"drift {status['drift_ppm']:.1f}ppm, RTT {status['rtt_ms']:.1f}ms"
+            )
+
+    def sample_age(self, device_time_ms):
+        """Age of a device timestamp relative to the last time sync
+
+        Args:
+            device_time_ms: Device time in milliseconds
+
+        Returns:
+            Age in seconds, or None before the first sync
+        """
+        return self.session.sample_age(device_time_ms, time.monotonic())
 
     def server_timestamp_from_device(self, device_time_ms):
         """Convert device time to server timestamp
@@ -212,7 +388,7 @@ class Chorus32Device:
         Returns:
             Server timestamp in seconds
         """
-        return (device_time_ms - self._time_offset) / 1000.0
+        return self.timebase.to_server(device_time_ms)
 
     def sync_callback(self):
         """Called when time sync completes"""
@@ -222,6 +398,14 @@ class Chorus32Device:
         """Called when device disconnects"""
         pass
 
+    def receivers_callback(self):
+        """Called when the device's nodes are created or change"""
+        pass
+
+    def voltage_callback(self, alert):
+        """Called with the message of a newly raised voltage alert"""
+        pass
+
 
 class Chorus32Interface(BaseHardwareInterface):
     """Hardware interface for Chorus32 timing system"""
@@ -231,15 +415,89 @@ class Chorus32Interface(BaseHardwareInterface):
         self.update_loop_enabled = False
         self.update_thread = None
         self.devices = kwargs.get('devices', [])
+        self.use_worker = kwargs.get('use_worker', False)
+        self.worker = None
+        self.race_active = False
+        self.auto_calibrate = kwargs.get('auto_calibrate', False)
+        self._last_auto_calibrate = 0
+        self.crossing_engine = CrossingEngine()
+        self.snapshots = PassSnapshotPool(pool_size=kwargs.get('snapshot_pool_size', DEFAULT_POOL_SIZE))
+        self.capture = None
+        self.capture_path = None  # Capture being recorded, here or in the ingest worker
+        self.relay = None
+        relay_port = kwargs.get('relay_port', 0)
+        if relay_port:
+            self.relay = StreamRelay(
+                len(self.devices),
+                relay_port,
+                host=kwargs.get('relay_host', DEFAULT_RELAY_HOST)
+            )
+        self._nodes = []
+        self._node_locations = []
+        self._device_offsets = {}
+        self._device_indices = {}
+        self._estimator_adds = []
+        self._quality_adds = []
+        self.survey = None  # SpectrumSurvey while an RF survey runs
+        self._worker_survey = False  # An RF survey is running in the ingest worker
+        self._survey_restore = []
+        self._survey_filters = {}
+        self.survey_results = []
+        self.survey_status = None
+        self.profiler = None  # HotPathProfiler while a profiling window runs
+        self.profile_label = "RotorHazard process"
+        self._profile_reports = []
+        self._profile_waiting = False  # Waiting for the ingest worker's report
+        self._index_nodes()
+
+    def _index_nodes(self, changed_device=None):
+        """Build the global node index and size per-node state
+
+        Called whenever a device's receiver count changes. Nodes of other
+        devices keep their crossing state, sample history and snapshots
+        under their new global indices; the changed device's nodes start
+        over.
+
+        Args:
+            changed_device: Chorus32Device whose receiver count changed
+        """
+        old_indices = {id(node): index for index, node in enumerate(self._nodes)}
+        sources = []
+        nodes = []
+        locations = []
+        self._device_offsets = {}
+        self._device_indices = {}
+        for dev_idx, device in enumerate(self.devices):
+            self._device_offsets[id(device)] = len(nodes)
+            self._device_indices[id(device)] = dev_idx
+            device.decoder.offset = len(nodes)
+            device.decoder.node_count = len(device.nodes)
+            for local_idx, node in enumerate(device.nodes):
+                nodes.append(node)
+                locations.append((dev_idx, local_idx))
+                sources.append(None if device is changed_device else old_indices.get(id(node)))
+        self._nodes = nodes
+        self._node_locations = locations
+
+        self.crossing_engine.remap(sources)
+        self.snapshots.remap(sources)
+        self._bind_node_stats()
+
+        # Survey receivers are tracked by global index
+        if self.survey is not None and any(
+                index >= len(sources) or sources[index] != index for index in self.survey.receivers):
+            logger.warning("Chorus32 RF survey stopped: receivers changed")
+            self._finish_survey(time.monotonic(), aborted=True)
+
+    def _bind_node_stats(self):
+        """Cache the per-sample estimator and gate quality adds by global index"""
+        self._estimator_adds = [node.level_estimator.add for node in self._nodes]
+        self._quality_adds = [node.gate_quality.add for node in self._nodes]
 
     @property
     def nodes(self):
-        """Get all nodes from all devices"""
-        all_nodes = []
-        for device in self.devices:
-            for node in device.nodes:
-                all_nodes.append(node)
-        return all_nodes
+        """All nodes from all devices, in global index order"""
+        return self._nodes
 
     @nodes.setter
     def nodes(self, value):
@@ -259,24 +517,68 @@ class Chorus32Interface(BaseHardwareInterface):
             device: Chorus32Device instance
         """
         try:
-            # Get number of receivers
+            # Get number of receivers; nodes are created when the reply arrives
             device.write(chorus32.Chorus32Encoder.encode_get_num_receivers())
-            gevent.sleep(0.1)
-
-            # Query each node's configuration
-            for node_idx in range(6):
-                # These will be echoed back by the device
-                # Note: Not all Chorus32 firmware versions support all get commands
-                pass
-
-            gevent.sleep(0.2)
+            gevent.sleep(0.3)
             logger.info(f"Configured Chorus32 device {device.name}")
         except Exception as e:
             logger.warning(f"Failed to configure Chorus32 device {device.name}: {e}")
 
+    def _setup_device(self, device):
+        """Query configuration, enable RSSI push and request time sync
+
+        Args:
+            device: Connected Chorus32Device instance
+        """
+        self.configure_device(device)
+
+        # Nodes already known from an earlier connection; new ones are
+        # enabled when the receiver count arrives
+        self._enable_rssi_push(device)
+
+        # Request time sync
+        device.request_time_sync()
+
+    def _enable_rssi_push(self, device, first_node=0):
+        """Enable RSSI push on a device's active nodes
+
+        Args:
+            device: Connected Chorus32Device instance
+            first_node: Local index of the first node to enable
+        """
+        receivers = [
+            node_idx for node_idx in range(first_node, len(device.nodes)) if device.nodes[node_idx].is_active
+        ]
+        for command in device.session.push_commands(receivers):
+            self._submit(device, command)
+
+    def _submit(self, device, command, priority=PRIORITY_SETPOINT):
+        """Queue a command on the scheduler of the process that owns the connection
+
+        Args:
+            device: Chorus32Device instance
+            command: (node, command, value) tuple
+            priority: Scheduler priority
+        """
+        if self.worker:
+            self.worker.send(('submit', self._device_indices[id(device)], command, priority))
+        else:
+            device.scheduler.submit(command, time.monotonic(), priority)
+
     def start(self):
         """Start the interface"""
         if self.update_thread is None:
+            if self.use_worker:
+                # Worker process owns the connections and sets up the devices
+                self.worker = Chorus32IngestWorker(self, READ_POLL_RATE)
+                # The worker reads the devices, so it also runs the relay
+                if self.worker.start(CONNECT_TIMEOUT_S):
+                    self.update_thread = gevent.spawn(self.update_loop)
+                    return True
+                self.worker.stop()
+                self.worker = None
+                return False
+
             # Connect all devices
             for device in self.devices:
                 device.connect()
@@ -288,25 +590,14 @@ class Chorus32Interface(BaseHardwareInterface):
                     break
 
             if any_device_connected:
+                if self.relay:
+                    self.relay.start()
                 self.update_thread = gevent.spawn(self.update_loop)
 
                 # Configure devices and enable RSSI push
                 for device in self.devices:
                     if device.connected:
-                        self.configure_device(device)
-
-                        # Enable RSSI push for all active nodes
-                        for node_idx, node in enumerate(device.nodes):
-                            if node.is_active:
-                                device.write(
-                                    chorus32.Chorus32Encoder.encode_set_rssi_interval(
-                                        node_idx,
-                                        device.rssi_interval_ms
-                                    )
-                                )
-
-                        # Request time sync
-                        device.request_time_sync()
+                        self._setup_device(device)
 
                 return True
             return False
@@ -323,38 +614,218 @@ class Chorus32Interface(BaseHardwareInterface):
         self.update_loop_enabled = True
         try:
             while self.update_loop_enabled:
-                self._update()
+                if self.worker:
+                    self.worker.poll()
+                else:
+                    self._update()
+                    if self.relay:
+                        self.relay.poll()
+                if self.survey is not None:
+                    self._service_survey()
+                if self.profiler is not None:
+                    self._service_profile()
+                if self.auto_calibrate and not self.race_active:
+                    now = time.monotonic()
+                    if now - self._last_auto_calibrate >= AUTO_CALIBRATE_INTERVAL_S:
+                        self._last_auto_calibrate = now
+                        self.apply_suggested_levels()
                 gevent.sleep(READ_POLL_RATE)
         except KeyboardInterrupt:
             logger.info("Update thread terminated by keyboard interrupt")
             raise
         self.log('Chorus32 background thread ended')
         self.update_thread = None
+        if self.profiler is not None:
+            # Put the original functions back; the window's report is dropped
+            self.profiler.stop(time.monotonic(), self.profile_label)
+            self.profiler = None
         for device in self.devices:
             device.close()
+        if self.relay:
+            self.relay.stop()
+        if self.worker:
+            self.worker.stop()
+            self.worker = None
 
     def _update(self):
         """Read and process messages from all devices"""
+        now = time.monotonic()
         for device in self.devices:
             if not device.connected:
                 continue
 
+            # Setpoints first; time sync and polls wait out crossings on this device
+            offset = self._device_offsets[id(device)]
+            crossing = any(self.crossing_engine.crossing_flag[offset:offset + len(device.nodes)])
+            device.scheduler.service(now, crossing, device.write)
+
+            # Drain the connection while reads keep coming back full
+            data = ""
+            pending_bytes = 0
             try:
-                data = device.read()
+                for _read in range(MAX_DRAIN_READS):
+                    chunk = device.read()
+                    data += chunk
+                    if len(chunk) < device.read_size:
+                        break
+                else:
+                    pending_bytes = device.read_size
             except TimeoutError:
                 self.handle_timeout(device)
                 data = None
+            # Everything read so far had arrived by now
+            received = time.monotonic()
 
+            backlog_bytes = len(device.decoder.buffer) + pending_bytes
+            lines = None
             if data:
-                # Append to buffer
-                device.stream_buffer += data
+                backlog_bytes += len(data)
+                lines = device.session.split(data)
+
+            sample_age_s = device.last_sample_age_s
+            device.last_sample_age_s = None
+            overloaded = device.overload.observe(now, backlog_bytes, sample_age_s)
+
+            if lines:
+                if self.relay:
+                    self.relay.publish(self._device_indices[id(device)], lines)
+                self._process_lines(device, lines, received, overloaded)
+
+    def _process_lines(self, device, lines, received, overloaded):
+        """Run a device's complete lines through decoding and crossing detection
+
+        Args:
+            device: Chorus32Device instance
+            lines: Complete lines from the device's decoder
+            received: Server time the lines had arrived by
+            overloaded: Shed load and skip UI-only updates
+        """
+        keep = None
+        shed_count = 0
+
+        if overloaded:
+            # Decimate samples far below enter_at_level on nodes that are not
+            # crossing. A node keeps every sample for the rest of the chunk once
+            # one comes near its threshold, so no crossing can be lost.
+            nodes = device.nodes
+            hot_nodes = set()
+            shed_phase = 0
+
+            def keep(index, receiver, rssi):
+                nonlocal shed_phase, shed_count
+                if index in hot_nodes:
+                    return True
+                # A receiver count reply mid-chunk replaces the engine
+                if self.crossing_engine.crossing_flag[index] or rssi >= nodes[receiver].enter_at_level - SHED_MARGIN:
+                    hot_nodes.add(index)
+                    return True
+                shed_phase += 1
+                if shed_phase % SHED_DECIMATION:
+                    shed_count += 1
+                    return False
+                return True
+
+        for segment in device.session.feed(lines, received, keep, device.rssi_filter):
+            if segment[0] == SEGMENT_RSSI:
+                _kind, node_ids, rssis, timestamps = segment
+                self._process_rssi_batch(device, node_ids, rssis, timestamps, update_ui=not overloaded)
+            else:
+                self._process_message(device, segment[1])
+        if shed_count:
+            device.overload.shed(shed_count)
+
+    def _process_rssi_batch(self, device, node_ids, rssis, timestamps=None, update_ui=True):
+        """Run crossing detection over RSSI samples from one device
+
+        Args:
+            device: Chorus32Device instance
+            node_ids: Global node index per sample
+            rssis: RSSI value per sample, after the device's RSSI filter
+            timestamps: Server timestamp per sample (defaults to now)
+            update_ui: Mirror RSSI and peak values onto the nodes; crossing
+                state is always mirrored
 
-                # Process complete lines (newline-terminated)
-                while '\n' in device.stream_buffer:
-                    line, device.stream_buffer = device.stream_buffer.split('\n', 1)
-                    message = chorus32.Chorus32Decoder.parse_message(line)
-                    if message:
-                        self._process_message(device, message)
+        Returns:
+            Crossing events from the crossing engine
+        """
+        engine = self.crossing_engine
+        offset = self._device_offsets[id(device)]
+        nodes = device.nodes
+
+        # Crossing detection using RotorHazard's enter_at/exit_at levels,
+        # which RotorHazard may change on the nodes at any time
+        for local_idx, node in enumerate(nodes):
+            engine.set_levels(offset + local_idx, node.enter_at_level, node.exit_at_level)
+
+        if timestamps is None:
+            timestamps = [time.monotonic()] * len(node_ids)
+        events = engine.process_batch(node_ids, rssis, timestamps)
+        uncertainty_s = device.timebase.pass_uncertainty_s() if events else None
+
+        if self.survey is not None:
+            self.survey.add_batch(node_ids, rssis, timestamps)
+
+        self.snapshots.add_batch(node_ids, rssis, timestamps, events, self._engine_levels, uncertainty_s)
+
+        capture = self.capture
+        if capture is not None:
+            capture.append_batch(
+                timestamps,
+                self._device_indices[id(device)],
+                [index - offset for index in node_ids],
+                rssis
+            )
+
+        for _position, kind, index, event_time, peak in events:
+            node = nodes[index - offset]
+            if kind == CROSSING_ENTER:
+                node.crossing_flag = True
+                node.pass_peak_rssi = peak
+                node.pass_nadir_rssi = peak
+                node.enter_at_timestamp = event_time
+                logger.debug(f"Node {node.local_index} entering crossing, RSSI={peak}, enter_at={node.enter_at_level}")
+            else:
+                # Exiting crossing - trigger lap
+                # RotorHazard handles minimum lap time globally
+                node.crossing_flag = False
+                node.exit_at_timestamp = event_time
+                node.pass_peak_rssi = peak
+                node.pass_uncertainty_s = uncertainty_s
+                self._capture_pass(node, event_time, peak)
+
+                # Record the lap with peak RSSI for marshalling
+                if callable(self.pass_record_callback):
+                    self.pass_record_callback(
+                        node,
+                        event_time,
+                        BaseHardwareInterface.LAP_SOURCE_REALTIME,
+                        peak=peak
+                    )
+                    logger.info(
+                        f"Lap detected: Node {node.local_index}, Peak RSSI={peak}, exit_at={node.exit_at_level}, "
+                        f"uncertainty={uncertainty_s * 1000:.1f}ms"
+                    )
+
+        if not update_ui:
+            return events
+
+        estimator_adds = self._estimator_adds
+        quality_adds = self._quality_adds
+        for index, rssi, timestamp in zip(node_ids, rssis, timestamps):
+            estimator_adds[index](rssi)
+            quality_adds[index](rssi, timestamp)
+
+        # Mirror engine state back onto the nodes for the UI
+        for local_idx, node in enumerate(nodes):
+            index = offset + local_idx
+            node.current_rssi = engine.current_rssi[index]
+            node.node_peak_rssi = engine.node_peak_rssi[index]
+            node.node_nadir_rssi = engine.node_nadir_rssi[index]
+            node.crossing_flag = bool(engine.crossing_flag[index])
+            node.pass_peak_rssi = engine.pass_peak_rssi[index]
+            node.pass_nadir_rssi = engine.pass_nadir_rssi[index]
+
+        return events
 
     def _process_message(self, device, message):
         """Process a single parsed message
@@ -371,99 +842,285 @@ class Chorus32Interface(BaseHardwareInterface):
 
         elif cmd == chorus32.Chorus32Commands.GET_RSSI:  # 'r' - RSSI value
             rssi = chorus32.Chorus32Decoder.decode_hex_value(message.data, 4)
-            if rssi is not None and message.node is not None:
-                node = device.nodes[message.node]
-                old_rssi = node.current_rssi
-                node.current_rssi = rssi
-
-                # Track overall peak/nadir for session
-                if rssi > node.node_peak_rssi:
-                    node.node_peak_rssi = rssi
-                if rssi < node.node_nadir_rssi:
-                    node.node_nadir_rssi = rssi
-
-                # Crossing detection using RotorHazard's enter_at/exit_at levels
-                # Use enter_at_level to detect entering a crossing
-                # Use exit_at_level to detect exiting a crossing
-                current_time = time.monotonic()
-                was_crossing = node.crossing_flag
-
-                # Determine if currently in crossing based on enter/exit levels
-                if not was_crossing:
-                    # Not currently crossing - check if RSSI crosses enter_at_level
-                    is_crossing = rssi >= node.enter_at_level
-                else:
-                    # Currently crossing - check if RSSI drops below exit_at_level
-                    is_crossing = rssi >= node.exit_at_level
-
-                if is_crossing != was_crossing:
-                    if is_crossing:
-                        # Entering crossing
-                        node.crossing_flag = True
-                        node.pass_peak_rssi = rssi
-                        node.pass_nadir_rssi = rssi
-                        node.enter_at_timestamp = current_time
-                        logger.debug(f"Node {message.node} entering crossing, RSSI={rssi}, enter_at={node.enter_at_level}")
-                    else:
-                        # Exiting crossing - trigger lap
-                        # RotorHazard handles minimum lap time globally
-                        node.crossing_flag = False
-                        node.exit_at_timestamp = current_time
-
-                        # Record the lap with peak RSSI for marshalling
-                        if callable(self.pass_record_callback):
-                            self.pass_record_callback(
-                                node,
-                                current_time,
-                                BaseHardwareInterface.LAP_SOURCE_REALTIME,
-                                peak=node.pass_peak_rssi
-                            )
-                            logger.info(f"Lap detected: Node {message.node}, Peak RSSI={node.pass_peak_rssi}, exit_at={node.exit_at_level}")
-
-                        # Reset peak/nadir for next crossing
-                        node.pass_peak_rssi = 0
-                        node.pass_nadir_rssi = 9999
-                elif is_crossing:
-                    # Currently in crossing - track peak/nadir
-                    if rssi > node.pass_peak_rssi:
-                        node.pass_peak_rssi = rssi
-                    if rssi < node.pass_nadir_rssi:
-                        node.pass_nadir_rssi = rssi
+            if rssi is not None and message.node is not None and message.node < len(device.nodes):
+                offset = self._device_offsets[id(device)]
+                node_ids = [offset + message.node]
+                self._process_rssi_batch(device, node_ids, device.rssi_filter.process(node_ids, [rssi], offset))
 
         elif cmd == chorus32.Chorus32Commands.BAND:  # 'B' - Band
             band = chorus32.Chorus32Decoder.decode_hex_value(message.data, 1)
-            if band is not None and message.node is not None:
+            if band is not None and message.node is not None and message.node < len(device.nodes):
                 node = device.nodes[message.node]
                 node.band_idx = band
 
         elif cmd == chorus32.Chorus32Commands.CHANNEL:  # 'C' - Channel
             channel = chorus32.Chorus32Decoder.decode_hex_value(message.data, 1)
-            if channel is not None and message.node is not None:
+            if channel is not None and message.node is not None and message.node < len(device.nodes):
                 node = device.nodes[message.node]
                 node.channel_idx = channel
 
         elif cmd == chorus32.Chorus32Commands.FREQUENCY:  # 'F' - Frequency
             freq = chorus32.Chorus32Decoder.decode_hex_value(message.data, 4)
-            if freq is not None and message.node is not None:
+            if freq is not None and message.node is not None and message.node < len(device.nodes):
                 node = device.nodes[message.node]
                 node.frequency = freq
+                if self.survey is not None:
+                    self.survey.frequency_echo(
+                        self._device_offsets[id(device)] + message.node, freq, time.monotonic()
+                    )
 
         elif cmd == chorus32.Chorus32Commands.GET_TIME:  # 't' - Time
             device_time = chorus32.Chorus32Decoder.decode_hex_value(message.data, 8)
             if device_time is not None:
-                device.calc_time_offset(device_time)
+                sample_age_s = device.sample_age(device_time)
+                device.last_sample_age_s = sample_age_s
+                # A reply stuck behind a backlog would skew the offset
+                if sample_age_s is None or sample_age_s < OVERLOAD_AGE_S:
+                    device.calc_time_offset(device_time)
 
         elif cmd == chorus32.Chorus32Commands.NUM_RECEIVERS:  # 'N' - Number of receivers
             if message.data:
                 num_receivers = int(message.data)
-                logger.info(f"Chorus32 device {device.name} has {num_receivers} receivers")
+                known_nodes = len(device.nodes)
+                first_reply = device.reported_receivers is None
+                changed = device.set_receiver_count(num_receivers)
+                # Periodic configuration checks repeat the reply; only the first and changes are logged
+                if changed or first_reply:
+                    logger.info(f"Chorus32 device {device.name} has {num_receivers} receivers")
+                    if num_receivers > chorus32.MAX_RECEIVERS:
+                        logger.warning(
+                            f"Chorus32 device {device.name}: only the first {chorus32.MAX_RECEIVERS} receivers are used"
+                        )
+                if changed:
+                    self._index_nodes(device)
+                    # With an ingest worker, the worker owns the connection
+                    if not self.worker:
+                        self._enable_rssi_push(device, known_nodes)
+                if changed or first_reply:
+                    device.receivers_callback()
+
+        elif cmd == chorus32.Chorus32Commands.GET_VOLTAGE:  # 'v' - Supply voltage
+            raw = chorus32.Chorus32Decoder.decode_hex_value(message.data, 4)
+            if raw is not None:
+                for alert in device.voltage.add(time.monotonic(), raw):
+                    device.voltage_callback(alert)
 
         elif cmd == chorus32.Chorus32Commands.PILOT_ACTIVE:  # 'A' - Active status
             active = chorus32.Chorus32Decoder.decode_hex_value(message.data, 1)
-            if active is not None and message.node is not None:
+            if active is not None and message.node is not None and message.node < len(device.nodes):
                 node = device.nodes[message.node]
                 node.is_active = (active == 1)
 
+    def start_capture(self, path):
+        """Start recording RSSI samples to a capture file
+
+        Args:
+            path: Capture file path
+        """
+        self.stop_capture()
+        if self.worker:
+            # The worker sees every sample, so it writes the file
+            self.worker.send(('capture', path))
+            self.capture_path = path
+            return
+        try:
+            capture = RaceCapture.create(path)
+        except OSError as e:
+            logger.warning(f"Unable to start Chorus32 RSSI capture {path}: {e}")
+            return
+        for dev_idx, device in enumerate(self.devices):
+            for node in device.nodes:
+                capture.set_levels(dev_idx, node.local_index, node.enter_at_level, node.exit_at_level)
+        self.capture = capture
+        self.capture_path = path
+        logger.info(f"Chorus32 RSSI capture started: {path}")
+
+    def stop_capture(self):
+        """Stop recording and close the capture file
+
+        Returns:
+            Path of the closed capture, or None
+        """
+        if self.worker:
+            path = self.capture_path
+            if path is not None:
+                self.worker.send(('capture', None))
+                self.capture_path = None
+            return path
+        capture = self.capture
+        if capture is None:
+            return None
+        self.capture = None
+        self.capture_path = None
+        capture.close()
+        logger.info(f"Chorus32 RSSI capture saved: {capture.path} ({capture.sample_count} samples)")
+        return capture.path
+
+    def _capture_pass(self, node, timestamp, peak):
+        """Record a live pass in the current capture"""
+        if self.capture is not None:
+            self.capture.record_pass(
+                timestamp,
+                self._device_indices[id(node.device)],
+                node.local_index,
+                peak
+            )
+
+    def _engine_levels(self, node_index):
+        """Enter/exit levels the crossing engine is using for a node"""
+        engine = self.crossing_engine
+        return engine.enter_at_level[node_index], engine.exit_at_level[node_index]
+
+    def get_pass_snapshot(self, node_index, timestamp):
+        """Get the RSSI window captured around a pass
+
+        Args:
+            node_index: Global node index
+            timestamp: Pass timestamp as passed to pass_record_callback
+
+        Returns:
+            Dict with timestamps, rssi, enter_at_level, exit_at_level, peak
+            and uncertainty, or None if not available
+        """
+        return self.snapshots.get(node_index, timestamp)
+
+    def get_lap_snapshot(self, node_index, lap):
+        """Get the RSSI window of a node's pass by its number in the race
+
+        Args:
+            node_index: Global node index
+            lap: Pass number since snapshots were last cleared (0 = first pass)
+
+        Returns:
+            Dict as for get_pass_snapshot plus the pass timestamp, or None
+            if there is no such pass or its snapshot was evicted
+        """
+        keys = sorted(self.snapshots.keys(node_index), key=lambda key: key[1])
+        if not 0 <= lap < len(keys):
+            return None
+        snapshot = self.snapshots.get(*keys[lap])
+        snapshot['pass_timestamp'] = keys[lap][1]
+        return snapshot
+
+    def lap_snapshot_count(self, node_index):
+        """Number of passes with a snapshot for a node since the last clear"""
+        return len(self.snapshots.keys(node_index))
+
+    def clear_pass_snapshots(self):
+        """Drop all pass snapshots, e.g. when the race's laps are cleared"""
+        self.snapshots.clear()
+        if self.worker:
+            self.worker.send(('clear_snapshots',))
+
+    def timing_status(self):
+        """Clock sync state of each device on the server timebase
+
+        Returns:
+            List of dicts with name, offset_ms, drift_ppm, rtt_ms and
+            error_ms (None until the device has synced)
+        """
+        status = []
+        for device in self.devices:
+            device_status = device.timebase.status()
+            device_status['name'] = device.name
+            status.append(device_status)
+        return status
+
+    def voltage_status(self):
+        """Supply voltage of each device
+
+        Returns:
+            List of dicts with name plus VoltageMonitor.status() fields
+        """
+        status = []
+        for device in self.devices:
+            device_status = device.voltage.status()
+            device_status['name'] = device.name
+            status.append(device_status)
+        return status
+
+    def gate_quality_status(self):
+        """Gate quality of each node
+
+        Returns:
+            List of dicts with name and nodes, a list of
+            GateQuality.status() dicts with local_index and frequency added
+        """
+        status = []
+        for device in self.devices:
+            nodes = []
+            for node in device.nodes:
+                node_status = node.gate_quality.status()
+                node_status['local_index'] = node.local_index
+                node_status['frequency'] = node.frequency
+                nodes.append(node_status)
+            status.append({'name': device.name, 'nodes': nodes})
+        return status
+
+    def scheduler_status(self):
+        """Command scheduler diagnostics of each device
+
+        Returns:
+            List of dicts with name plus CommandScheduler.status() fields
+            (omitted for devices the ingest worker has not reported yet)
+        """
+        status = []
+        for dev_idx, device in enumerate(self.devices):
+            if self.worker:
+                device_status = self.worker.scheduler_status.get(dev_idx)
+                if device_status is None:
+                    continue
+                device_status = dict(device_status)
+            else:
+                device_status = device.scheduler.status()
+            device_status['name'] = device.name
+            status.append(device_status)
+        return status
+
+    def _node_location(self, node_index):
+        """Map a global node index to (device index, local index)"""
+        if not 0 <= node_index < len(self._node_locations):
+            raise IndexError(f"No Chorus32 node {node_index}")
+        return self._node_locations[node_index]
+
+    def reevaluate_passes(self, capture_path, levels, tolerance_s=PASS_MATCH_TOLERANCE_S):
+        """Re-run crossing detection over a stored race with new levels
+
+        Args:
+            capture_path: Capture file recorded for the race
+            levels: {global node index: (enter_at_level, exit_at_level)}
+            tolerance_s: Max time difference for a pass to count as unchanged
+
+        Returns:
+            {global node index: {'passes', 'recorded', 'matched', 'removed', 'added'}}
+            where passes are the recomputed (timestamp, peak) passes,
+            recorded the passes detected live, and matched/removed/added
+            the diff between the two
+        """
+        capture = RaceCapture.load(capture_path)
+        try:
+            results = {}
+            for node_index, (enter_at_level, exit_at_level) in levels.items():
+                dev_idx, local_idx = self._node_location(node_index)
+                timestamps, rssis = capture.read_node(dev_idx, local_idx)
+                passes = reevaluate_passes(timestamps, rssis, enter_at_level, exit_at_level)
+                recorded = [
+                    (timestamp, peak)
+                    for timestamp, pass_dev_idx, pass_local_idx, peak in capture.passes
+                    if pass_dev_idx == dev_idx and pass_local_idx == local_idx
+                ]
+                matched, removed, added = diff_passes(recorded, passes, tolerance_s)
+                results[node_index] = {
+                    'passes': passes,
+                    'recorded': recorded,
+                    'matched': matched,
+                    'removed': removed,
+                    'added': added,
+                }
+            return results
+        finally:
+            capture.close()
+
     def handle_timeout(self, device):
         """Handle device timeout"""
         logger.warning(f"Chorus32 device {device.name} timeout")
@@ -477,11 +1134,8 @@ class Chorus32Interface(BaseHardwareInterface):
             band: Band index or letter (R, A, B, E, F, D)
             channel: Channel index (0-7)
         """
-        # Find device and local node index
-        device_idx = node_index // 6
-        local_idx = node_index % 6
-
-        if device_idx < len(self.devices):
+        if 0 <= node_index < len(self._node_locations):
+            device_idx, local_idx = self._node_locations[node_index]
             device = self.devices[device_idx]
             node = device.nodes[local_idx]
 
@@ -491,9 +1145,16 @@ class Chorus32Interface(BaseHardwareInterface):
             else:
                 band_idx = band
 
-            device.write(chorus32.Chorus32Encoder.encode_set_band(local_idx, band_idx))
-            device.write(chorus32.Chorus32Encoder.encode_set_channel(local_idx, channel))
+            self._submit(device, (local_idx, chorus32.Chorus32Commands.BAND, band_idx))
+            self._submit(device, (local_idx, chorus32.Chorus32Commands.CHANNEL, channel))
 
+            # Floor and peaks are per channel, and a crossing in progress was on the old one
+            if (band_idx, channel) != (node.band_idx, node.channel_idx):
+                node.gate_quality.reset()
+                self.crossing_engine.reset_node(node_index)
+                if self.worker:
+                    row = device_idx * chorus32.MAX_RECEIVERS + local_idx
+                    self.worker.send(('reset_node', row))
             node.is_configured = False
 
     def set_rssi_interval(self, device_idx, interval_ms):
@@ -505,40 +1166,244 @@ class Chorus32Interface(BaseHardwareInterface):
         """
         if device_idx < len(self.devices):
             device = self.devices[device_idx]
+            # Filters and the push cadence fit depend on the sample period
             device.rssi_interval_ms = interval_ms
+            device.set_rssi_filter(device.rssi_filter_name)
+            if self.worker:
+                self.worker.send(('interval', device_idx, interval_ms))
 
             # Update all active nodes
             for node_idx, node in enumerate(device.nodes):
                 if node.is_active:
-                    device.write(
-                        chorus32.Chorus32Encoder.encode_set_rssi_interval(node_idx, interval_ms)
-                    )
+                    self._submit(device, (node_idx, chorus32.Chorus32Commands.RSSI_MON_INTERVAL, interval_ms))
+
+    def set_rssi_filter(self, device_idx, name):
+        """Select the RSSI filter for a device
+
+        Args:
+            device_idx: Device index
+            name: Filter name (see chorus32_filters)
+        """
+        if device_idx < len(self.devices):
+            self.devices[device_idx].set_rssi_filter(name)
+            if self.worker:
+                self.worker.send(('filter', device_idx, name))
 
     def set_node_active(self, device_idx, node_index, active):
         """Set node active/inactive
 
         Args:
             device_idx: Device index
-            node_index: Local node index (0-5)
+            node_index: Local node index
             active: True to activate, False to deactivate
         """
-        if device_idx < len(self.devices):
+        if device_idx < len(self.devices) and node_index < len(self.devices[device_idx].nodes):
             device = self.devices[device_idx]
             node = device.nodes[node_index]
 
-            device.write(chorus32.Chorus32Encoder.encode_set_pilot_active(node_index, active))
+            self._submit(device, (node_index, chorus32.Chorus32Commands.PILOT_ACTIVE, active))
             node.is_active = active
 
             # Enable/disable RSSI push accordingly
-            if active:
-                device.write(
-                    chorus32.Chorus32Encoder.encode_set_rssi_interval(
-                        node_index,
-                        device.rssi_interval_ms
-                    )
-                )
+            interval_ms = device.rssi_interval_ms if active else 0
+            self._submit(device, (node_index, chorus32.Chorus32Commands.RSSI_MON_INTERVAL, interval_ms))
+
+    def start_survey(self, min_mhz=DEFAULT_SURVEY_MIN_MHZ, max_mhz=DEFAULT_SURVEY_MAX_MHZ,
+                     step_mhz=DEFAULT_SURVEY_STEP_MHZ, samples_per_step=SURVEY_SAMPLES_PER_STEP):
+        """Start an RF survey on every active receiver of every connected device
+
+        Receivers are retuned with 'F' while the survey runs. Their band and
+        channel (or frequency) and the devices' RSSI filters are restored
+        when it ends; results arrive through survey_callback.
+
+        Returns:
+            None once started, otherwise the reason it cannot start
+        """
+        if self.survey_running:
+            return "An RF survey is already running"
+        if self.race_active:
+            return "Cannot run an RF survey during a race"
+        node_indices = [
+            index for index, node in enumerate(self._nodes) if node.device.connected and node.is_active
+        ]
+        if not node_indices:
+            return "No connected, active receivers to survey with"
+        if self.worker:
+            # The worker sees every sample, so it runs the survey
+            self.worker.send(('survey', min_mhz, max_mhz, step_mhz, samples_per_step))
+            self._worker_survey = True
+            return None
+
+        self._survey_restore = [
+            (self._nodes[index], self._nodes[index].band_idx, self._nodes[index].channel_idx,
+             self._nodes[index].frequency)
+            for index in node_indices
+        ]
+        # Filters would smear RSSI from one frequency into the next
+        self._survey_filters = {}
+        for dev_idx, device in enumerate(self.devices):
+            if device.connected and device.rssi_filter_name != FILTER_NONE:
+                self._survey_filters[dev_idx] = device.rssi_filter_name
+                self.set_rssi_filter(dev_idx, FILTER_NONE)
+
+        self.survey = SpectrumSurvey(node_indices, range(min_mhz, max_mhz + 1, step_mhz), samples_per_step)
+        self._send_survey_commands(self.survey.start(time.monotonic()))
+        logger.info(
+            f"Chorus32 RF survey of {min_mhz}-{max_mhz} MHz in {step_mhz} MHz steps "
+            f"on {len(node_indices)} receivers"
+        )
+        return None
+
+    def stop_survey(self):
+        """Stop a running survey early, keeping what was measured"""
+        if self._worker_survey:
+            self.worker.send(('survey_stop',))
+        elif self.survey is not None:
+            self._finish_survey(time.monotonic(), aborted=True)
+
+    @property
+    def survey_running(self):
+        """An RF survey is running, in this process or in the ingest worker"""
+        return self.survey is not None or self._worker_survey
+
+    def _worker_survey_finished(self, results, status, error=None):
+        """Publish a survey the ingest worker ran"""
+        self._worker_survey = False
+        if error:
+            logger.warning(f"Chorus32 RF survey did not start in the ingest worker: {error}")
+            return
+        self.survey_results = results
+        self.survey_status = status
+        self.survey_callback(results, status)
+
+    def _service_survey(self):
+        now = time.monotonic()
+        self._send_survey_commands(self.survey.service(now))
+        if self.survey.done:
+            self._finish_survey(now)
+
+    def _send_survey_commands(self, commands):
+        for node_index, frequency in commands:
+            dev_idx, local_idx = self._node_locations[node_index]
+            self._submit(self.devices[dev_idx], (local_idx, chorus32.Chorus32Commands.FREQUENCY, frequency))
+
+    def _finish_survey(self, now, aborted=False):
+        """Restore receivers and filters and publish the results"""
+        survey = self.survey
+        self.survey = None
+        if aborted:
+            survey.abort(now)
+
+        # One batch per device; it queues behind any survey step still pending
+        for node, band_idx, channel_idx, frequency in self._survey_restore:
+            device = node.device
+            if not device.connected or node not in device.nodes:
+                continue
+            if band_idx is not None and channel_idx is not None:
+                self._submit(device, (node.local_index, chorus32.Chorus32Commands.BAND, band_idx))
+                self._submit(device, (node.local_index, chorus32.Chorus32Commands.CHANNEL, channel_idx))
+            elif frequency:
+                self._submit(device, (node.local_index, chorus32.Chorus32Commands.FREQUENCY, frequency))
             else:
-                device.write(chorus32.Chorus32Encoder.encode_set_rssi_interval(node_index, 0))
+                logger.warning(f"Chorus32 {device.name} node {node.local_index} had no known frequency to restore")
+            node.frequency = frequency
+            # Survey samples are not from the race frequency
+            node.level_estimator.reset()
+            node.gate_quality.reset()
+        self._survey_restore = []
+        for dev_idx, name in self._survey_filters.items():
+            self.set_rssi_filter(dev_idx, name)
+        self._survey_filters = {}
+
+        self.survey_results = survey.results()
+        self.survey_status = survey.status()
+        status = self.survey_status
+        logger.info(
+            f"Chorus32 RF survey {'stopped' if aborted else 'finished'}: {status['measured']}/"
+            f"{status['frequencies']} frequencies in {status['duration_s']:.1f}s"
+            + (f", skipped {status['skipped']}" if status['skipped'] else "")
+        )
+        self.survey_callback(self.survey_results, status)
+
+    def survey_callback(self, results, status):
+        """Called with the results and status when an RF survey ends"""
+        pass
+
+    def start_profile(self, window_s=DEFAULT_PROFILE_WINDOW_S, use_cprofile=False, use_tracemalloc=False):
+        """Time the hot path stages for a window
+
+        With an ingest worker, the worker profiles its own stages as well.
+        profile_callback() gets the reports when the window ends.
+
+        Args:
+            window_s: Window length in seconds
+            use_cprofile: Also run cProfile for the window
+            use_tracemalloc: Also trace allocations for the window
+
+        Returns:
+            Error message, or None if profiling started
+        """
+        if self.profiler is not None:
+            return "Profiling is already running"
+        window_s = min(max(window_s, 1), MAX_PROFILE_WINDOW_S)
+        profiler = HotPathProfiler(window_s, use_cprofile=use_cprofile, use_tracemalloc=use_tracemalloc)
+        profiler.wrap(self, '_update', 'interface._update')
+        profiler.wrap(self, '_process_rssi_batch', 'interface._process_rssi_batch')
+        profiler.wrap(self, '_process_message', 'interface._process_message')
+        profiler.wrap(self.crossing_engine, 'process_batch', 'crossing.process_batch')
+        profiler.wrap(self.snapshots, 'add_batch', 'snapshots.add_batch')
+        profiler.wrap(self.capture, 'append_batch', 'capture.append_batch')
+        profiler.wrap(self.relay, 'poll', 'relay.poll')
+        profiler.wrap(self.worker, 'poll', 'worker.poll')
+        profiler.wrap(chorus32.Chorus32Decoder, 'parse_message', 'Chorus32Decoder.parse_message')
+        # On the class: the ingest worker pickles timebases to the main process
+        profiler.wrap(DeviceTimebase, 'sample_times', 'timebase.sample_times')
+        for device in self.devices:
+            profiler.wrap(device, 'read', 'device.read')
+            profiler.wrap(device.scheduler, 'service', 'scheduler.service')
+            profiler.wrap(device.decoder, 'split', 'decoder.split')
+            profiler.wrap(device.decoder, 'decode', 'decoder.decode', iterator=True)
+            profiler.wrap(device.rssi_filter, 'process', 'filter.process')
+        profiler.start(time.monotonic())
+        self.profiler = profiler
+        self._profile_reports = []
+        self._profile_waiting = False
+        if self.worker:
+            self.worker.send(('profile', window_s, use_cprofile, use_tracemalloc))
+            self._profile_waiting = True
+        logger.info(f"Chorus32 profiling started for {window_s}s")
+        return None
+
+    def stop_profile(self):
+        """End the profiling window early; the reports still go to profile_callback"""
+        if self.profiler is not None:
+            self.profiler.window_s = 0
+            if self.worker:
+                self.worker.send(('profile_stop',))
+
+    def add_profile_report(self, report):
+        """Add the ingest worker's report to the current profile"""
+        self._profile_reports.append(report)
+        self._profile_waiting = False
+
+    def _service_profile(self):
+        profiler = self.profiler
+        now = time.monotonic()
+        if profiler.finished_at is None:
+            if not profiler.expired(now):
+                return
+            self._profile_reports.insert(0, profiler.stop(now, self.profile_label))
+        if self._profile_waiting:
+            if now - profiler.finished_at < PROFILE_WORKER_TIMEOUT_S:
+                return
+            logger.warning("Chorus32 ingest worker did not send its profile")
+        self.profiler = None
+        logger.info("Chorus32 profiling finished")
+        self.profile_callback(self._profile_reports)
+
+    def profile_callback(self, reports):
+        """Called with the report per process when a profiling window ends"""
+        pass
 
     def set_state(self, state):
         """Set race state
@@ -550,14 +1415,64 @@ class Chorus32Interface(BaseHardwareInterface):
         # We detect laps on RotorHazard side from RSSI values
         # Chorus32 just continuously pushes RSSI data
         # This gives us full RSSI history for marshalling
-        pass
+        self.race_active = bool(state)
+
+        # Background polls back off so they never compete with race traffic
+        now = time.monotonic()
+        for device in self.devices:
+            device.scheduler.set_poll_backoff(RACE_POLL_BACKOFF if self.race_active else 1, now)
+        if self.worker:
+            self.worker.send(('race', self.race_active))
+        if self.race_active and self.survey is not None:
+            logger.warning("Chorus32 RF survey stopped: race starting")
+            self._finish_survey(now, aborted=True)
 
-    # Stub methods required by BaseHardwareInterface
     def set_enter_at_level(self, node_index, level):
-        pass
+        """Set enter-at level (used by RotorHazard-side crossing detection)"""
+        dev_idx, local_idx = self._node_location(node_index)
+        self.devices[dev_idx].nodes[local_idx].enter_at_level = level
 
     def set_exit_at_level(self, node_index, level):
-        pass
+        """Set exit-at level (used by RotorHazard-side crossing detection)"""
+        dev_idx, local_idx = self._node_location(node_index)
+        self.devices[dev_idx].nodes[local_idx].exit_at_level = level
+
+    def suggested_levels(self):
+        """Levels suggested by each node's streaming estimator
+
+        Returns:
+            {global node index: (enter_at_level, exit_at_level)} for nodes
+            with enough data
+        """
+        suggestions = {}
+        for node_index, node in enumerate(self.nodes):
+            suggestion = node.level_estimator.suggestion()
+            if suggestion is not None:
+                suggestions[node_index] = suggestion
+        return suggestions
+
+    def apply_suggested_levels(self):
+        """Apply suggested levels to nodes that are not mid-crossing
+
+        Returns:
+            {global node index: (enter_at_level, exit_at_level)} applied
+        """
+        applied = {}
+        nodes = self.nodes
+        for node_index, (enter_at_level, exit_at_level) in self.suggested_levels().items():
+            node = nodes[node_index]
+            if node.crossing_flag:
+                continue
+            if (node.enter_at_level, node.exit_at_level) == (enter_at_level, exit_at_level):
+                continue
+            self.set_enter_at_level(node_index, enter_at_level)
+            self.set_exit_at_level(node_index, exit_at_level)
+            applied[node_index] = (enter_at_level, exit_at_level)
+        if applied:
+            logger.info(f"Chorus32 applied suggested levels: {applied}")
+        return applied
+
+    # Stub methods required by BaseHardwareInterface
 
     def force_end_crossing(self, node_index):
         pass
@@ -569,8 +1484,20 @@ class Chorus32Provider:
     def __init__(self, rhapi):
         self._rhapi = rhapi
         self.startup_device_total = 0
+        self.use_worker = False
+        self.auto_calibrate = False
+        self.snapshot_pool_size = DEFAULT_POOL_SIZE
+        self.relay_port = 0
+        self.relay_host = DEFAULT_RELAY_HOST
+        self.transport_profile = PROFILE_DEFAULT
+        self.voltage_interval_s = DEFAULT_VOLTAGE_INTERVAL_S
+        self.voltage_low_v = 0.0
         self.devices = []
         self.interface = None
+        self.scan_results = []
+        self._scan_greenlet = None
+        self._archive_greenlet = None
+        self.profile_report = None  # (file name, text) of the latest profile
 
         # Register events
         rhapi.events.on(Evt.STARTUP, self.startup)
@@ -599,6 +1526,258 @@ class Chorus32Provider:
             panel='provider_chorus32'
         )
 
+        # Register expected receiver count, used until a device has reported its own
+        rhapi.fields.register_option(
+            field=UIField(
+                name='receivers_per_device',
+                label="Receivers per Device",
+                field_type=UIFieldType.BASIC_INT,
+                value=DEFAULT_RECEIVER_COUNT,
+                desc="Nodes created for a device that has never reported its receiver count (requires restart)",
+                persistent_section="Chorus32",
+                persistent_restart=True
+            ),
+            panel='provider_chorus32'
+        )
+
+        # Register ingest worker option
+        rhapi.fields.register_option(
+            field=UIField(
+                name='worker_process',
+                label="Ingest Worker Process",
+                field_type=UIFieldType.CHECKBOX,
+                desc="Read devices and detect crossings in a separate process (requires restart)",
+                persistent_section="Chorus32",
+                persistent_restart=True
+            ),
+            panel='provider_chorus32'
+        )
+
+        # Register pass snapshot pool size
+        rhapi.fields.register_option(
+            field=UIField(
+                name='snapshot_pool_size',
+                label="Pass Snapshots Kept",
+                field_type=UIFieldType.BASIC_INT,
+                value=DEFAULT_POOL_SIZE,
+                desc="Number of per-lap RSSI snapshots kept in memory for marshalling (requires restart)",
+                persistent_section="Chorus32",
+                persistent_restart=True
+            ),
+            panel='provider_chorus32'
+        )
+
+        # Register voltage telemetry options
+        rhapi.fields.register_option(
+            field=UIField(
+                name='voltage_interval',
+                label="Voltage Poll Interval (s)",
+                field_type=UIFieldType.BASIC_INT,
+                value=DEFAULT_VOLTAGE_INTERVAL_S,
+                desc=f"Seconds between supply voltage readings, {RACE_POLL_BACKOFF}x longer during races (0 = off, requires restart)",
+                persistent_section="Chorus32",
+                persistent_restart=True
+            ),
+            panel='provider_chorus32'
+        )
+        rhapi.fields.register_option(
+            field=UIField(
+                name='voltage_low',
+                label="Low Voltage Alert (V)",
+                field_type=UIFieldType.NUMBER,
+                value=0,
+                desc="Alert when a device's supply drops below this (0 = 3.5V per LiPo cell, cell count guessed from the first reading; requires restart)",
+                persistent_section="Chorus32",
+                persistent_restart=True
+            ),
+            panel='provider_chorus32'
+        )
+
+        # Register stream relay options
+        rhapi.fields.register_option(
+            field=UIField(
+                name='relay_port',
+                label="Stream Relay Port",
+                field_type=UIFieldType.BASIC_INT,
+                value=0,
+                desc="Republish device streams to local TCP/WebSocket clients; device N uses this port + N - 1 (0 = off, requires restart)",
+                persistent_section="Chorus32",
+                persistent_restart=True
+            ),
+            panel='provider_chorus32'
+        )
+        rhapi.fields.register_option(
+            field=UIField(
+                name='relay_host',
+                label="Stream Relay Address",
+                field_type=UIFieldType.TEXT,
+                value=DEFAULT_RELAY_HOST,
+                desc="Address the stream relay listens on; 0.0.0.0 allows other machines (requires restart)",
+                persistent_section="Chorus32",
+                persistent_restart=True
+            ),
+            panel='provider_chorus32'
+        )
+
+        # Register socket transport profile
+        rhapi.fields.register_option(
+            field=UIField(
+                name='transport_profile',
+                label="Network Transport Profile",
+                field_type=UIFieldType.SELECT,
+                options=[UIFieldSelectOption(name, profile.label) for name, profile in TRANSPORT_PROFILES.items()],
+                value=PROFILE_DEFAULT,
+                desc="Low Latency: no Nagle delay, larger receive buffer, dead links detected in seconds (requires restart)",
+                persistent_section="Chorus32",
+                persistent_restart=True
+            ),
+            panel='provider_chorus32'
+        )
+
+        # Register device scan subnet
+        rhapi.fields.register_option(
+            field=UIField(
+                name='scan_subnet',
+                label="Device Scan Subnet",
+                field_type=UIFieldType.TEXT,
+                value=DEFAULT_SCAN_SUBNET,
+                desc=f"Networks searched by Scan for Devices on port {DEFAULT_CHORUS32_PORT}, comma-separated (ESP32 USB serial ports are always searched)",
+                persistent_section="Chorus32"
+            ),
+            panel='provider_chorus32'
+        )
+        rhapi.fields.register_option(
+            field=UIField(
+                name='scan_all_serial',
+                label="Scan All Serial Ports",
+                field_type=UIFieldType.CHECKBOX,
+                desc="Also probe serial ports that are not CP210x, CH340 or FTDI USB bridges (e.g. a Chorus32 behind another adapter)",
+                persistent_section="Chorus32"
+            ),
+            panel='provider_chorus32'
+        )
+
+        # Register RF survey panel and range
+        rhapi.ui.register_panel('provider_chorus32_survey', 'Chorus32 RF Survey', 'settings')
+        rhapi.fields.register_option(
+            field=UIField(
+                name='survey_range',
+                label="Survey Range (MHz)",
+                field_type=UIFieldType.TEXT,
+                value=f"{DEFAULT_SURVEY_MIN_MHZ}-{DEFAULT_SURVEY_MAX_MHZ}:{DEFAULT_SURVEY_STEP_MHZ}",
+                desc="min-max or min-max:step; every active receiver of every connected device takes part",
+                persistent_section="Chorus32"
+            ),
+            panel='provider_chorus32_survey'
+        )
+
+        # Register profiling panel and options
+        rhapi.ui.register_panel('provider_chorus32_profile', 'Chorus32 Profiling', 'settings')
+        rhapi.fields.register_option(
+            field=UIField(
+                name='profile_window',
+                label="Profiling Window (s)",
+                field_type=UIFieldType.BASIC_INT,
+                value=DEFAULT_PROFILE_WINDOW_S,
+                desc=f"How long Start Profiling times the read, decode and crossing stages (max {MAX_PROFILE_WINDOW_S})",
+                persistent_section="Chorus32"
+            ),
+            panel='provider_chorus32_profile'
+        )
+        rhapi.fields.register_option(
+            field=UIField(
+                name='profile_cprofile',
+                label="Include cProfile",
+                field_type=UIFieldType.CHECKBOX,
+                desc="Also profile every function call for the window (slows the server while it runs)",
+                persistent_section="Chorus32"
+            ),
+            panel='provider_chorus32_profile'
+        )
+        rhapi.fields.register_option(
+            field=UIField(
+                name='profile_tracemalloc',
+                label="Include Allocation Sites",
+                field_type=UIFieldType.CHECKBOX,
+                desc="Also trace memory allocations for the window with tracemalloc (slows the server while it runs)",
+                persistent_section="Chorus32"
+            ),
+            panel='provider_chorus32_profile'
+        )
+
+        # Register pass snapshot panel: look up the RSSI window of a lap for marshalling
+        rhapi.ui.register_panel('provider_chorus32_snapshots', 'Chorus32 Pass Snapshots', 'settings')
+        rhapi.fields.register_option(
+            field=UIField(
+                name='snapshot_seat',
+                label="Seat",
+                field_type=UIFieldType.BASIC_INT,
+                value=1,
+                desc="Seat (node) number, starting at 1",
+                persistent_section="Chorus32"
+            ),
+            panel='provider_chorus32_snapshots'
+        )
+        rhapi.fields.register_option(
+            field=UIField(
+                name='snapshot_lap',
+                label="Pass",
+                field_type=UIFieldType.BASIC_INT,
+                value=0,
+                desc="Pass number in the current race (0 = first gate crossing, as lap 0 in RotorHazard)",
+                persistent_section="Chorus32"
+            ),
+            panel='provider_chorus32_snapshots'
+        )
+
+        self.profile_download = False
+        self.snapshot_download = False
+        if Blueprint is not None:
+            blueprint = Blueprint('chorus32', __name__)
+            blueprint.add_url_rule(PROFILE_REPORT_URL, 'profile_report', self.download_profile_report)
+            blueprint.add_url_rule(PASS_SNAPSHOT_URL, 'pass_snapshot', self.download_pass_snapshot)
+            rhapi.ui.blueprint_add(blueprint)
+            self.profile_download = True
+            self.snapshot_download = True
+
+        # Register RSSI capture retention options
+        rhapi.fields.register_option(
+            field=UIField(
+                name='capture_max_races',
+                label="RSSI Capture: Races Kept",
+                field_type=UIFieldType.BASIC_INT,
+                value=DEFAULT_MAX_CAPTURES,
+                desc="Number of per-race RSSI capture files to keep (0 = unlimited)",
+                persistent_section="Chorus32"
+            ),
+            panel='provider_chorus32'
+        )
+        rhapi.fields.register_option(
+            field=UIField(
+                name='capture_max_mb',
+                label="RSSI Capture: Disk Limit (MB)",
+                field_type=UIFieldType.BASIC_INT,
+                value=DEFAULT_MAX_CAPTURE_BYTES // (1024 * 1024),
+                desc="Total disk space for RSSI capture files and capture archives (0 = unlimited)",
+                persistent_section="Chorus32"
+            ),
+            panel='provider_chorus32'
+        )
+
+        # Register auto-calibration toggle
+        rhapi.fields.register_function_binding(
+            field=UIField(
+                name='chorus32_auto_calibrate',
+                label="Auto-Apply Suggested Levels",
+                field_type=UIFieldType.CHECKBOX,
+                desc="Apply enter/exit levels estimated from the RSSI stream while no race is running"
+            ),
+            getter_fn=self.get_auto_calibrate,
+            setter_fn=self.set_auto_calibrate,
+            args=None,
+            panel='provider_chorus32'
+        )
+
         self.process_config()
         self.init_vars()
         self.init_interface()
@@ -618,8 +1797,29 @@ class Chorus32Provider:
         if device_count is None:
             device_count = 1
         self.startup_device_total = device_count
+        self.use_worker = bool(self._rhapi.config.get('Chorus32', 'worker_process', as_bool=True))
+        self.auto_calibrate = bool(self._rhapi.config.get('Chorus32', 'auto_calibrate', as_bool=True))
+        snapshot_pool_size = self._rhapi.config.get('Chorus32', 'snapshot_pool_size', as_int=True)
+        self.snapshot_pool_size = snapshot_pool_size if snapshot_pool_size else DEFAULT_POOL_SIZE
+        relay_port = self._rhapi.config.get('Chorus32', 'relay_port', as_int=True)
+        self.relay_port = relay_port if relay_port and relay_port > 0 else 0
+        self.relay_host = self._rhapi.config.get('Chorus32', 'relay_host') or DEFAULT_RELAY_HOST
+        transport_profile = self._rhapi.config.get('Chorus32', 'transport_profile')
+        self.transport_profile = transport_profile if transport_profile in TRANSPORT_PROFILES else PROFILE_DEFAULT
+        voltage_interval_s = self._rhapi.config.get('Chorus32', 'voltage_interval', as_int=True)
+        self.voltage_interval_s = DEFAULT_VOLTAGE_INTERVAL_S if voltage_interval_s is None else max(voltage_interval_s, 0)
+        try:
+            self.voltage_low_v = max(float(self._rhapi.config.get('Chorus32', 'voltage_low') or 0), 0.0)
+        except (TypeError, ValueError):
+            self.voltage_low_v = 0.0
+
+        receivers_per_device = self._rhapi.config.get('Chorus32', 'receivers_per_device', as_int=True)
+        if receivers_per_device is None:
+            receivers_per_device = DEFAULT_RECEIVER_COUNT
 
         addresses = self.load_addresses()
+        rssi_filters = self.load_rssi_filters()
+        receiver_counts = self.load_receiver_counts()
 
         # Create devices
         self.devices = []
@@ -629,6 +1829,18 @@ class Chorus32Provider:
             device = Chorus32Device(addr, f"Chorus32 {idx + 1}")
             device.sync_callback = self.sync_callback
             device.close_callback = self.close_callback
+            device.receivers_callback = self.receivers_callback(idx)
+            device.voltage_callback = self.voltage_callback(idx)
+            device.voltage.low_v = self.voltage_low_v
+            device.set_voltage_interval(self.voltage_interval_s)
+            device.transport_profile = self.transport_profile
+            if idx < len(rssi_filters):
+                device.set_rssi_filter(rssi_filters[idx])
+            # Seats exist from startup; the device's 'N' reply corrects the count
+            receiver_count = receiver_counts[idx] if idx < len(receiver_counts) else None
+            device.set_receiver_count(
+                receiver_count if isinstance(receiver_count, int) else receivers_per_device, reported=False
+            )
             self.devices.append(device)
 
     def load_addresses(self):
@@ -646,6 +1858,40 @@ class Chorus32Provider:
         addresses = [device.addr for device in self.devices]
         self._rhapi.config.set_item('Chorus32', 'address', json.dumps(addresses))
 
+    def load_rssi_filters(self):
+        """Load per-device RSSI filter names from config"""
+        filters_json = self._rhapi.config.get_item('Chorus32', 'rssi_filter')
+        if filters_json:
+            try:
+                return json.loads(filters_json)
+            except ValueError:
+                pass
+        return []
+
+    def save_rssi_filters(self):
+        """Save per-device RSSI filter names to config"""
+        filters = [device.rssi_filter_name for device in self.devices]
+        self._rhapi.config.set_item('Chorus32', 'rssi_filter', json.dumps(filters))
+
+    def load_receiver_counts(self):
+        """Load the last reported receiver count of each device from config"""
+        counts_json = self._rhapi.config.get_item('Chorus32', 'receiver_count')
+        if counts_json:
+            try:
+                return json.loads(counts_json)
+            except ValueError:
+                pass
+        return []
+
+    def save_receiver_counts(self):
+        """Save per-device receiver counts to config"""
+        counts = self.load_receiver_counts()[:len(self.devices)]
+        counts.extend([None] * (len(self.devices) - len(counts)))
+        for idx, device in enumerate(self.devices):
+            if device.reported_receivers is not None:
+                counts[idx] = len(device.nodes)
+        self._rhapi.config.set_item('Chorus32', 'receiver_count', json.dumps(counts))
+
     def _normalize_addr(self, addr):
         """Normalize address to URL format"""
         if not addr:
@@ -666,13 +1912,23 @@ class Chorus32Provider:
     def init_vars(self):
         """Initialize internal variables"""
         # Arrays for UI field values
-        self.thresholds = [[0] * 6 for _ in range(len(self.devices))]
+        self.thresholds = [[] for _ in range(len(self.devices))]
         self.min_laps = [0] * len(self.devices)
         self.rssi_intervals = [DEFAULT_RSSI_INTERVAL_MS] * len(self.devices)
+        self.node_ui_counts = [0] * len(self.devices)  # Nodes with registered UI fields
 
     def init_interface(self):
         """Initialize the hardware interface"""
-        self.interface = Chorus32Interface(devices=self.devices)
+        self.interface = Chorus32Interface(
+            devices=self.devices,
+            use_worker=self.use_worker,
+            auto_calibrate=self.auto_calibrate,
+            snapshot_pool_size=self.snapshot_pool_size,
+            relay_port=self.relay_port,
+            relay_host=self.relay_host
+        )
+        self.interface.survey_callback = self.survey_finished
+        self.interface.profile_callback = self.profile_finished
 
     def register_device_ui(self, dev_idx):
         """Register UI fields for a device"""
@@ -715,9 +1971,37 @@ class Chorus32Provider:
             panel=f'provider_chorus32_detail_{dev_idx}'
         )
 
-        # Per-node active fields (6 nodes)
+        # RSSI filter field
+        self._rhapi.fields.register_function_binding(
+            field=UIField(
+                name=f'chorus32_rssi_filter_{dev_idx}',
+                label="RSSI Filter",
+                field_type=UIFieldType.SELECT,
+                options=[UIFieldSelectOption(name, label) for name, label in FILTER_LABELS.items()],
+                value=FILTER_NONE,
+                desc="Smoothing applied to RSSI before crossing detection"
+            ),
+            getter_fn=self.get_rssi_filter,
+            setter_fn=self.set_rssi_filter,
+            args={'device': dev_idx},
+            panel=f'provider_chorus32_detail_{dev_idx}'
+        )
+
+        self._rhapi.ui.register_markdown(
+            f'provider_chorus32_detail_{dev_idx}', f'chorus32-quality-{dev_idx}', "No gate quality data yet."
+        )
+
+        self.register_node_ui(dev_idx)
+
+    def register_node_ui(self, dev_idx):
+        """Register per-node UI fields for the device's nodes
+
+        Nodes are pre-sized at startup and follow the receiver count the
+        device reports, so this runs again whenever the count changes.
+        """
         # Note: Thresholds are managed by RotorHazard's calibration system (enter_at/exit_at levels)
-        for node_idx in range(6):
+        node_count = len(self.devices[dev_idx].nodes)
+        for node_idx in range(self.node_ui_counts[dev_idx], node_count):
             # Active checkbox
             self._rhapi.fields.register_function_binding(
                 field=UIField(
@@ -731,6 +2015,7 @@ class Chorus32Provider:
                 args={'device': dev_idx, 'index': node_idx},
                 panel=f'provider_chorus32_detail_{dev_idx}'
             )
+        self.node_ui_counts[dev_idx] = max(self.node_ui_counts[dev_idx], node_count)
 
     def register_combined_controls(self):
         """Register combined control fields"""
@@ -755,15 +2040,33 @@ class Chorus32Provider:
         if self.interface:
             self.interface.set_rssi_interval(args['device'], int(value))
 
+    def get_rssi_filter(self, args):
+        return self.devices[args['device']].rssi_filter_name
+
+    def set_rssi_filter(self, value, args):
+        if self.interface:
+            self.interface.set_rssi_filter(args['device'], value)
+            self.save_rssi_filters()
+
     def get_node_active(self, args):
         device = self.devices[args['device']]
-        node = device.nodes[args['index']]
-        return node.is_active
+        if args['index'] >= len(device.nodes):
+            return False
+        return device.nodes[args['index']].is_active
 
     def set_node_active(self, value, args):
         if self.interface:
             self.interface.set_node_active(args['device'], args['index'], bool(value))
 
+    def get_auto_calibrate(self, args):
+        return self.interface.auto_calibrate if self.interface else self.auto_calibrate
+
+    def set_auto_calibrate(self, value, args):
+        self.auto_calibrate = bool(value)
+        if self.interface:
+            self.interface.auto_calibrate = self.auto_calibrate
+        self._rhapi.config.set_item('Chorus32', 'auto_calibrate', self.auto_calibrate)
+
     # Event handlers
     def startup(self, args):
         """Register UI buttons on startup"""
@@ -779,26 +2082,191 @@ class Chorus32Provider:
             label="Disconnect",
             function=self.ui_disable
         )
+        self._rhapi.ui.register_quickbutton(
+            panel='provider_chorus32',
+            name="chorus32-btn-suggest-levels",
+            label="Suggest Levels",
+            function=self.ui_suggest_levels
+        )
+        self._rhapi.ui.register_quickbutton(
+            panel='provider_chorus32',
+            name="chorus32-btn-apply-levels",
+            label="Apply Suggested Levels",
+            function=self.ui_apply_levels
+        )
+        self._rhapi.ui.register_quickbutton(
+            panel='provider_chorus32',
+            name="chorus32-btn-timing-status",
+            label="Timing Sync Status",
+            function=self.ui_timing_status
+        )
+        self._rhapi.ui.register_quickbutton(
+            panel='provider_chorus32',
+            name="chorus32-btn-scheduler-status",
+            label="Command Scheduler Status",
+            function=self.ui_scheduler_status
+        )
+        self._rhapi.ui.register_quickbutton(
+            panel='provider_chorus32',
+            name="chorus32-btn-voltage-status",
+            label="Voltage Status",
+            function=self.ui_voltage_status
+        )
+        self._rhapi.ui.register_quickbutton(
+            panel='provider_chorus32',
+            name="chorus32-btn-gate-quality",
+            label="Gate Quality",
+            function=self.ui_gate_quality
+        )
+        self._rhapi.ui.register_quickbutton(
+            panel='provider_chorus32',
+            name="chorus32-btn-archive",
+            label="Archive RSSI Captures",
+            function=self.ui_archive_captures
+        )
+        self._rhapi.ui.register_quickbutton(
+            panel='provider_chorus32',
+            name="chorus32-btn-scan",
+            label="Scan for Devices",
+            function=self.ui_scan
+        )
+        self._rhapi.ui.register_quickbutton(
+            panel='provider_chorus32',
+            name="chorus32-btn-use-scan",
+            label="Use Scan Results",
+            function=self.ui_use_scan_results
+        )
+        self._rhapi.ui.register_quickbutton(
+            panel='provider_chorus32_survey',
+            name="chorus32-btn-survey",
+            label="Run RF Survey",
+            function=self.ui_survey
+        )
+        self._rhapi.ui.register_quickbutton(
+            panel='provider_chorus32_survey',
+            name="chorus32-btn-survey-stop",
+            label="Stop RF Survey",
+            function=self.ui_stop_survey
+        )
+        self._rhapi.ui.register_markdown(
+            'provider_chorus32_survey', 'chorus32-survey-results', "No survey results yet."
+        )
+        self._rhapi.ui.register_quickbutton(
+            panel='provider_chorus32_profile',
+            name="chorus32-btn-profile",
+            label="Start Profiling",
+            function=self.ui_profile
+        )
+        self._rhapi.ui.register_quickbutton(
+            panel='provider_chorus32_profile',
+            name="chorus32-btn-profile-stop",
+            label="Stop Profiling",
+            function=self.ui_stop_profile
+        )
+        self._rhapi.ui.register_markdown(
+            'provider_chorus32_profile', 'chorus32-profile-results', "No profile yet."
+        )
+        self._rhapi.ui.register_quickbutton(
+            panel='provider_chorus32_snapshots',
+            name="chorus32-btn-snapshot",
+            label="Show Pass Snapshot",
+            function=self.ui_pass_snapshot
+        )
+        self._rhapi.ui.register_markdown(
+            'provider_chorus32_snapshots', 'chorus32-snapshot-results', "No pass selected."
+        )
 
     def shutdown(self, args):
         """Stop interface on shutdown"""
         if self.interface:
             self.interface.stop()
+            self.interface.stop_capture()
 
     def race_stage(self, args):
         """Start race"""
         if self.interface:
             self.interface.set_state(1)  # Racing
+            self.start_capture(args)
+            flagged = self.update_gate_quality()
+            if flagged:
+                self._rhapi.ui.message_alert("Chorus32 gate quality too low to time reliably: " + "; ".join(flagged))
 
     def race_stop(self, args):
         """Stop race"""
         if self.interface:
             self.interface.set_state(0)  # Stopped
+            self.interface.stop_capture()
+
+    def capture_dir(self):
+        """Directory holding per-race RSSI capture files"""
+        data_dir = getattr(self._rhapi.server, 'data_dir', None) or os.getcwd()
+        return os.path.join(data_dir, 'chorus32_captures')
+
+    def start_capture(self, args):
+        """Open a new RSSI capture file for the staged race"""
+        directory = self.capture_dir()
+        try:
+            os.makedirs(directory, exist_ok=True)
+        except OSError as e:
+            logger.warning(f"Unable to create Chorus32 capture directory {directory}: {e}")
+            return
+
+        max_races = self._rhapi.config.get('Chorus32', 'capture_max_races', as_int=True)
+        max_mb = self._rhapi.config.get('Chorus32', 'capture_max_mb', as_int=True)
+        apply_retention(
+            directory,
+            DEFAULT_MAX_CAPTURES if max_races is None else max_races,
+            DEFAULT_MAX_CAPTURE_BYTES if max_mb is None else max_mb * 1024 * 1024,
+            archive_suffixes=(ARCHIVE_SUFFIX,)
+        )
+
+        heat_id = args.get('heat_id') if args else None
+        name = time.strftime('race_%Y%m%d_%H%M%S')
+        if heat_id is not None:
+            name += f'_heat{heat_id}'
+        self.interface.start_capture(os.path.join(directory, name + CAPTURE_SUFFIX))
+
+    def ui_archive_captures(self, args):
+        """Archive RSSI Captures button handler"""
+        if self._archive_greenlet is not None:
+            self._rhapi.ui.message_notify("Chorus32 capture archive already being written")
+            return
+        directory = self.capture_dir()
+        if not os.path.isdir(directory):
+            self._rhapi.ui.message_notify("No Chorus32 RSSI captures to archive")
+            return
+        path = os.path.join(directory, time.strftime('archive_%Y%m%d_%H%M%S') + ARCHIVE_SUFFIX)
+        # A capture still being written is left for the next archive
+        recording = self.interface.capture_path if self.interface else None
+        exclude = (recording,) if recording is not None else ()
+        self._rhapi.ui.message_notify("Writing Chorus32 RSSI capture archive...")
+        self._archive_greenlet = gevent.spawn(self._run_archive, directory, path, exclude)
+
+    def _run_archive(self, directory, path, exclude):
+        try:
+            # Encoding is CPU bound; a native thread keeps the event loop (and timing) running
+            heats, samples, source_bytes, archive_bytes = gevent.get_hub().threadpool.apply(
+                archive_captures, (directory, path, exclude)
+            )
+        except (OSError, ValueError) as e:
+            logger.warning(f"Unable to write Chorus32 capture archive {path}: {e}")
+            self._rhapi.ui.message_alert(f"Unable to write RSSI capture archive: {e}")
+            return
+        finally:
+            self._archive_greenlet = None
+        logger.info(f"Chorus32 capture archive {path}: {heats} races, {samples} samples, "
+                    f"{source_bytes} -> {archive_bytes} bytes")
+        self._rhapi.ui.message_notify(
+            f"Archived {heats} races ({samples} samples) to {os.path.basename(path)}: "
+            f"{archive_bytes / 1048576:.1f} MB from {source_bytes / 1048576:.1f} MB of captures"
+        )
 
     def laps_clear(self, args):
         """Clear laps"""
         if self.interface:
             self.interface.set_state(0)  # Stopped
+            # Pass numbers start over with the next race
+            self.interface.clear_pass_snapshots()
 
     def ui_enable(self, args):
         """Connect button handler"""
@@ -815,6 +2283,327 @@ class Chorus32Provider:
             self.interface.stop()
             self._rhapi.ui.message_notify("Chorus32 devices disconnected")
 
+    def ui_suggest_levels(self, args):
+        """Suggest Levels button handler"""
+        if self.interface:
+            suggestions = self.interface.suggested_levels()
+            if suggestions:
+                text = ", ".join(
+                    f"Node {node_index + 1}: {enter_at_level}/{exit_at_level}"
+                    for node_index, (enter_at_level, exit_at_level) in sorted(suggestions.items())
+                )
+                self._rhapi.ui.message_notify(f"Suggested enter/exit levels: {text}")
+            else:
+                self._rhapi.ui.message_notify("Not enough RSSI data yet - fly a few practice laps")
+
+    def ui_apply_levels(self, args):
+        """Apply Suggested Levels button handler"""
+        if self.interface:
+            applied = self.interface.apply_suggested_levels()
+            self._rhapi.ui.message_notify(f"Applied suggested levels to {len(applied)} nodes")
+
+    def ui_timing_status(self, args):
+        """Timing Sync Status button handler"""
+        if self.interface:
+            parts = []
+            for status in self.interface.timing_status():
+                if status['error_ms'] is None:
+                    parts.append(f"{status['name']}: not synced yet")
+                else:
+                    parts.append(
+                        f"{status['name']}: ±{status['error_ms']:.1f}ms "
+                        f"(RTT {status['rtt_ms']:.1f}ms, drift {status['drift_ppm']:.0f}ppm)"
+                    )
+            self._rhapi.ui.message_notify("Timing sync: " + ", ".join(parts))
+
+    def ui_voltage_status(self, args):
+        """Voltage Status button handler"""
+        if self.interface:
+            parts = []
+            for status in self.interface.voltage_status():
+                if status['volts'] is None:
+                    parts.append(f"{status['name']}: no reading yet")
+                    continue
+                text = (
+                    f"{status['name']}: {status['volts']:.1f}V "
+                    f"(range {status['min_volts']:.1f}-{status['max_volts']:.1f}V)"
+                )
+                if status['alerts']:
+                    text += " " + ", ".join(status['alerts']).upper()
+                parts.append(text)
+            self._rhapi.ui.message_notify("Voltage: " + ", ".join(parts))
+
+    def update_gate_quality(self):
+        """Show per-node gate quality in the device panels
+
+        Returns:
+            List of descriptions of flagged nodes
+        """
+        flagged = []
+        for dev_idx, device_status in enumerate(self.interface.gate_quality_status()):
+            lines = ["| Node | MHz | Floor | Peaks | Crossing | Passes | Score | |", "|---|---|---|---|---|---|---|---|"]
+            for status in device_status['nodes']:
+                if status['floor_mean'] is None:
+                    lines.append(f"| {status['local_index'] + 1} | {status['frequency'] or ''} | | | | 0 | | no data |")
+                    continue
+                peaks = crossing = score = ""
+                if status['peak_mean'] is not None:
+                    peaks = f"{status['peak_mean']:.0f} ± {status['peak_std']:.0f}"
+                    crossing = f"{status['crossing_ms']:.0f}ms / {status['crossing_samples']:.1f}"
+                if status['score'] is not None:
+                    score = f"{status['score']:.1f}"
+                rating = f"**{status['rating']}**" if status['flagged'] else status['rating']
+                if status['reasons']:
+                    rating += ": " + ", ".join(status['reasons'])
+                lines.append(
+                    f"| {status['local_index'] + 1} | {status['frequency'] or ''} "
+                    f"| {status['floor_mean']:.0f} ± {status['floor_std']:.1f} | {peaks} | {crossing} "
+                    f"| {status['passes']} | {score} | {rating} |"
+                )
+                if status['flagged']:
+                    flagged.append(f"{device_status['name']} node {status['local_index'] + 1} ({', '.join(status['reasons'])})")
+            self._rhapi.ui.register_markdown(
+                f'provider_chorus32_detail_{dev_idx}', f'chorus32-quality-{dev_idx}', "\n".join(lines)
+            )
+        self._rhapi.ui.broadcast_ui('settings')
+        return flagged
+
+    def ui_gate_quality(self, args):
+        """Gate Quality button handler"""
+        if self.interface:
+            flagged = self.update_gate_quality()
+            if flagged:
+                self._rhapi.ui.message_alert("Chorus32 gate quality too low to time reliably: " + "; ".join(flagged))
+            else:
+                self._rhapi.ui.message_notify("Chorus32 gate quality updated in the device panels; no nodes flagged")
+
+    def ui_scheduler_status(self, args):
+        """Command Scheduler Status button handler"""
+        if self.interface:
+            parts = []
+            for status in self.interface.scheduler_status():
+                lag = ", ".join(
+                    f"{name} {status['lag_ms'][name]:.0f}/{status['max_lag_ms'][name]:.0f}ms"
+                    for name in status['lag_ms']
+                )
+                parts.append(
+                    f"{status['name']}: lag avg/max {lag}, {status['deferrals']} crossing deferrals, "
+                    f"{status['throttled']} throttled, {status['pending']} queued"
+                )
+            self._rhapi.ui.message_notify("Command scheduler: " + ("; ".join(parts) or "no data yet"))
+
+    def ui_scan(self, args):
+        """Scan for Devices button handler"""
+        if self._scan_greenlet is not None:
+            self._rhapi.ui.message_notify("Chorus32 scan already running")
+            return
+        subnet = self._rhapi.config.get('Chorus32', 'scan_subnet') or DEFAULT_SCAN_SUBNET
+        try:
+            candidates = subnet_candidates(subnet, DEFAULT_CHORUS32_PORT)
+        except ValueError as e:
+            self._rhapi.ui.message_alert(f"Invalid scan subnet: {e}")
+            return
+        # Ports RotorHazard's own node interfaces hold open must not be written to
+        candidates += serial_candidates(
+            exclude=self._rotorhazard_serial_ports(),
+            all_ports=bool(self._rhapi.config.get('Chorus32', 'scan_all_serial', as_bool=True))
+        )
+
+        # Connected devices already answer on their address; probing them would disturb the stream
+        in_use = {device.addr for device in self.devices if device.connected}
+        candidates = [
+            (kind, address) for kind, address in candidates
+            if self._normalize_addr(address) not in in_use
+        ]
+        self._rhapi.ui.message_notify(f"Scanning {len(candidates)} addresses for Chorus32 devices...")
+        self._scan_greenlet = gevent.spawn(self._run_scan, candidates)
+
+    def _rotorhazard_serial_ports(self):
+        """Serial ports configured for RotorHazard's own node interfaces"""
+        ports = self._rhapi.config.get('GENERAL', 'SERIAL_PORTS') or []
+        if isinstance(ports, str):
+            try:
+                ports = json.loads(ports)
+            except ValueError:
+                ports = [ports]
+        return [port for port in ports if isinstance(port, str)]
+
+    def _run_scan(self, candidates):
+        try:
+            self.scan_results = discover_devices(candidates)
+        finally:
+            self._scan_greenlet = None
+        if not self.scan_results:
+            self._rhapi.ui.message_notify("No Chorus32 devices found")
+            return
+        text = ", ".join(
+            f"{found.address} ({found.receivers} receivers, {found.latency_ms:.0f}ms"
+            + (f", API {found.api_version}" if found.api_version is not None else "") + ")"
+            for found in self.scan_results
+        )
+        self._rhapi.ui.message_notify(
+            f"Found {len(self.scan_results)} Chorus32 devices: {text}. "
+            "Press Use Scan Results to fill in device addresses."
+        )
+
+    def ui_use_scan_results(self, args):
+        """Use Scan Results button handler
+
+        Connected devices and devices whose address was found keep their
+        address; the other devices take the remaining found addresses in order.
+        """
+        found = [self._normalize_addr(found.address) for found in self.scan_results]
+        if not found:
+            self._rhapi.ui.message_notify("No scan results - press Scan for Devices first")
+            return
+        kept = {device.addr for device in self.devices if device.connected or device.addr in found}
+        unassigned = [addr for addr in found if addr not in kept]
+        changed = []
+        for dev_idx, device in enumerate(self.devices):
+            if device.addr in kept or not unassigned:
+                continue
+            device.addr = unassigned.pop(0)
+            changed.append(f"Device {dev_idx + 1}: {device.addr}")
+        if not changed:
+            self._rhapi.ui.message_notify("Device addresses already match the scan results")
+            return
+        self.save_addresses()
+        message = "Set " + ", ".join(changed)
+        if unassigned:
+            message += f" ({len(unassigned)} more found - raise Device Count to use them)"
+        self._rhapi.ui.message_notify(message + ". Press Connect to use them.")
+
+    def ui_survey(self, args):
+        """Run RF Survey button handler"""
+        if not self.interface:
+            return
+        try:
+            min_mhz, max_mhz, step_mhz = parse_survey_range(self._rhapi.config.get('Chorus32', 'survey_range'))
+        except ValueError as e:
+            self._rhapi.ui.message_alert(str(e))
+            return
+        error = self.interface.start_survey(min_mhz, max_mhz, step_mhz)
+        if error:
+            self._rhapi.ui.message_alert(error)
+            return
+        self._rhapi.ui.message_notify(
+            f"RF survey of {min_mhz}-{max_mhz} MHz started; frequencies are restored when it finishes"
+        )
+
+    def ui_stop_survey(self, args):
+        """Stop RF Survey button handler"""
+        if self.interface and self.interface.survey_running:
+            self.interface.stop_survey()
+
+    def survey_finished(self, results, status):
+        """Show survey results as a table in the survey panel"""
+        lines = [
+            f"Measured {status['measured']} of {status['frequencies']} frequencies with "
+            f"{status['receivers']} receivers in {status['duration_s']:.1f}s.",
+            "",
+        ]
+        if status['skipped']:
+            lines += [f"No reading (receiver did not confirm or stopped): {', '.join(map(str, status['skipped']))} MHz", ""]
+        if results:
+            lines += ["| MHz | Noise Floor | Peak | Samples | |", "|---|---|---|---|---|"]
+            for row in results:
+                flag = "**noisy**" if row['noisy'] else ""
+                lines.append(f"| {row['frequency']} | {row['floor']:.0f} | {row['peak']} | {row['samples']} | {flag} |")
+        self._rhapi.ui.register_markdown('provider_chorus32_survey', 'chorus32-survey-results', "\n".join(lines))
+        self._rhapi.ui.broadcast_ui('settings')
+        noisy = [str(row['frequency']) for row in results if row['noisy']]
+        self._rhapi.ui.message_notify(
+            "RF survey complete" + (f"; noisy: {', '.join(noisy)} MHz" if noisy else "; no noisy frequencies")
+        )
+
+    def ui_profile(self, args):
+        """Start Profiling button handler"""
+        if not self.interface:
+            return
+        window_s = self._rhapi.config.get('Chorus32', 'profile_window', as_int=True) or DEFAULT_PROFILE_WINDOW_S
+        error = self.interface.start_profile(
+            window_s,
+            use_cprofile=bool(self._rhapi.config.get('Chorus32', 'profile_cprofile', as_bool=True)),
+            use_tracemalloc=bool(self._rhapi.config.get('Chorus32', 'profile_tracemalloc', as_bool=True))
+        )
+        if error:
+            self._rhapi.ui.message_alert(error)
+            return
+        self._rhapi.ui.message_notify(f"Chorus32 profiling started for {self.interface.profiler.window_s}s")
+
+    def ui_stop_profile(self, args):
+        """Stop Profiling button handler"""
+        if self.interface and self.interface.profiler is not None:
+            self.interface.stop_profile()
+
+    def profile_finished(self, reports):
+        """Save the report and show a summary in the profiling panel"""
+        name = time.strftime('profile_%Y%m%d_%H%M%S.txt')
+        text = format_report(reports)
+        self.profile_report = (name, text)
+        directory = os.path.join(getattr(self._rhapi.server, 'data_dir', None) or os.getcwd(), 'chorus32_profiles')
+        path = os.path.join(directory, name)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            with open(path, 'w') as report_file:
+                report_file.write(text)
+        except OSError as e:
+            logger.warning(f"Unable to save Chorus32 profile report {path}: {e}")
+            path = None
+
+        lines = [summarize_report(reports)]
+        if self.profile_download:
+            lines.append(f"[Download full report]({PROFILE_REPORT_URL})")
+        if path:
+            lines.append(f"Saved to `{path}`")
+        self._rhapi.ui.register_markdown('provider_chorus32_profile', 'chorus32-profile-results', "\n\n".join(lines))
+        self._rhapi.ui.broadcast_ui('settings')
+        self._rhapi.ui.message_notify("Chorus32 profiling finished")
+
+    def ui_pass_snapshot(self, args):
+        """Show Pass Snapshot button handler"""
+        if not self.interface:
+            return
+        seat = self._rhapi.config.get('Chorus32', 'snapshot_seat', as_int=True) or 1
+        lap = self._rhapi.config.get('Chorus32', 'snapshot_lap', as_int=True) or 0
+        node_index = seat - 1
+        if not 0 <= node_index < len(self.interface.nodes):
+            self._rhapi.ui.message_alert(f"No seat {seat}; there are {len(self.interface.nodes)} Chorus32 nodes")
+            return
+        count = self.interface.lap_snapshot_count(node_index)
+        snapshot = self.interface.get_lap_snapshot(node_index, lap)
+        if snapshot is None:
+            text = f"Seat {seat} has no snapshot for pass {lap} ({count} passes with snapshots in this race)."
+        else:
+            text = format_pass_snapshot(seat, lap, count, snapshot)
+            if self.snapshot_download:
+                text += f"\n\n[Download samples]({PASS_SNAPSHOT_URL}?seat={seat}&lap={lap})"
+        self._rhapi.ui.register_markdown('provider_chorus32_snapshots', 'chorus32-snapshot-results', text)
+        self._rhapi.ui.broadcast_ui('settings')
+
+    def download_pass_snapshot(self):
+        """Serve a pass snapshot as JSON, by seat (from 1) and pass number (from 0)"""
+        if not self.interface:
+            return "Chorus32 interface not running", 404
+        try:
+            node_index = int(request.args.get('seat', '')) - 1
+            lap = int(request.args.get('lap', ''))
+        except ValueError:
+            return "seat and lap must be numbers", 400
+        if not 0 <= node_index < len(self.interface.nodes):
+            return "No such seat", 404
+        snapshot = self.interface.get_lap_snapshot(node_index, lap)
+        if snapshot is None:
+            return "No snapshot for this pass", 404
+        return jsonify({'seat': node_index + 1, 'lap': lap, **snapshot})
+
+    def download_profile_report(self):
+        """Serve the latest profile report as a text file"""
+        if self.profile_report is None:
+            return "No Chorus32 profile report yet", 404
+        name, text = self.profile_report
+        return Response(text, mimetype='text/plain', headers={'Content-Disposition': f'attachment; filename={name}'})
+
     def sync_callback(self):
         """Called when device time sync completes"""
         pass
@@ -823,6 +2612,23 @@ class Chorus32Provider:
         """Called when device disconnects"""
         pass
 
+    def voltage_callback(self, dev_idx):
+        """Build the voltage alert callback for a device"""
+        def voltage_alert(alert):
+            self._rhapi.ui.message_alert(f"Chorus32 device {dev_idx + 1} {alert}")
+        return voltage_alert
+
+    def receivers_callback(self, dev_idx):
+        """Build the receiver count callback for a device"""
+        def receivers_changed():
+            self.register_node_ui(dev_idx)
+            self.save_receiver_counts()
+            logger.info(
+                f"Chorus32 device {dev_idx + 1} now has {len(self.devices[dev_idx].nodes)} nodes, "
+                f"{len(self.interface.nodes)} in total"
+            )
+        return receivers_changed
+
 
 def initialize(rhapi):
     """Plugin entry point"""
@@ -0,0 +1,443 @@
+"""
+Chorus32 RSSI Archive
+
+Compact archive of per-node RSSI traces, for keeping a whole event's
+races where per-race capture files (12 bytes per sample) are too large.
+
+File layout:
+    header (16 bytes)
+    chunk, chunk, ...
+    heat table (JSON)
+    chunk index
+    footer (24 bytes)
+
+Each chunk holds up to chunk_samples samples of one node in one heat and
+decodes on its own:
+    chunk header (44 bytes): sync, heat, device, node, count, payload sizes, CRC, t0, step
+    timestamps: residuals against t0 + k * step, in TIME_RESOLUTION_S units,
+        as (run of unchanged residuals, zigzag varint residual change) pairs
+    rssi: zigzag varint change from the previous sample (the first from 0)
+
+A node's samples come at the push interval, so with step set to the
+chunk's median sample spacing, timestamps are implicit; a dropped cycle
+or a cadence refit costs one pair. Timestamps are rounded to
+TIME_RESOLUTION_S, RSSI is exact.
+
+The heat table and index are written on close, so reading one heat or
+node only seeks to and decodes its own chunks. Chunks carry a sync marker
+and a CRC, so an archive that was never closed is recovered by scanning.
+"""
+
+import json
+import logging
+import os
+import struct
+import zlib
+from itertools import accumulate, islice, repeat
+
+from .chorus32_capture import RaceCapture, CAPTURE_SUFFIX
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_MAGIC = b'C32ARCH1'
+ARCHIVE_VERSION = 1
+ARCHIVE_SUFFIX = '.c32a'
+HEADER_FORMAT = '<8sHxxI'  # magic, version, chunk_samples
+HEADER_SIZE = 16
+CHUNK_SYNC = b'C32K'
+CHUNK_HEADER_FORMAT = '<4sIBBxxIIIIdd'  # sync, heat, device, node, count, time bytes, rssi bytes, crc, t0, step
+CHUNK_HEADER_SIZE = 44
+INDEX_ENTRY_FORMAT = '<QIBBxxIdd'  # offset, heat, device, node, count, t_first, t_last
+INDEX_ENTRY_SIZE = 36
+FOOTER_FORMAT = '<QII8s'  # heat table offset, heat table bytes, index entries, magic
+FOOTER_SIZE = 24
+FOOTER_MAGIC = b'C32AINDX'
+
+DEFAULT_CHUNK_SAMPLES = 4096  # ~41s of one node at 10ms
+TIME_RESOLUTION_S = 1e-5  # Well below the timebase error; finer rounding dithers on every cadence refit
+
+
+def _put_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varints(payload):
+    value = 0
+    shift = 0
+    for byte in payload:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            yield value
+            value = 0
+            shift = 0
+
+
+def _zigzag(value):
+    return value << 1 if value >= 0 else (~value << 1) | 1
+
+
+def _unzigzag(value):
+    return (value >> 1) ^ -(value & 1)
+
+
+_BYTE_CHANGES = [_unzigzag(value) for value in range(0x80)]  # Single-byte varint -> change
+
+
+def _encode_rssi(rssis):
+    previous = 0
+    zigzags = []
+    for rssi in rssis:
+        change = rssi - previous
+        previous = rssi
+        zigzags.append(change << 1 if change >= 0 else (~change << 1) | 1)
+    if max(zigzags) < 0x80:
+        # Every change fits in one byte, the usual case between passes
+        return bytes(zigzags)
+    out = bytearray()
+    for value in zigzags:
+        _put_varint(out, value)
+    return bytes(out)
+
+
+def _decode_rssi(payload, count):
+    if len(payload) == count:
+        return list(accumulate(map(_BYTE_CHANGES.__getitem__, payload)))
+    return list(accumulate(map(_unzigzag, _read_varints(payload))))
+
+
+def _encode_times(timestamps):
+    """Returns (t0, step, payload)"""
+    t0 = timestamps[0]
+    step = 0.0
+    if len(timestamps) > 1:
+        spacings = sorted(later - earlier for earlier, later in zip(timestamps, islice(timestamps, 1, None)))
+        step = spacings[len(spacings) // 2]
+    scale = 1.0 / TIME_RESOLUTION_S
+    out = bytearray()
+    run = 0
+    previous = 0
+    for position, timestamp in enumerate(timestamps):
+        residual = round((timestamp - t0 - position * step) * scale)
+        if residual == previous:
+            run += 1
+            continue
+        _put_varint(out, run)
+        _put_varint(out, _zigzag(residual - previous))
+        previous = residual
+        run = 0
+    return t0, step, bytes(out)
+
+
+def _decode_times(payload, count, t0, step):
+    times = []
+    position = 0
+    residual = 0
+    offset = t0
+    varints = _read_varints(payload)
+    for run in varints:
+        end = position + run
+        times.extend([offset + index * step for index in range(position, end)])
+        residual += _unzigzag(next(varints))
+        offset = t0 + residual * TIME_RESOLUTION_S
+        times.append(offset + end * step)
+        position = end + 1
+    times.extend([offset + index * step for index in range(position, count)])
+    return times
+
+
+class ArchiveWriter:
+    """Streaming archive writer
+
+    Samples are buffered per node and written a chunk at a time, so memory
+    use stays at one chunk per node however long the event runs.
+    """
+    def __init__(self, path, chunk_samples=DEFAULT_CHUNK_SAMPLES):
+        self.path = path
+        self.chunk_samples = chunk_samples
+        self.heats = []
+        self.sample_count = 0
+        self._index = []
+        self._heat = None
+        self._buffers = {}  # (device, node) -> (timestamps, rssis)
+        self._file = open(path, 'wb')
+        self._file.write(struct.pack(HEADER_FORMAT, ARCHIVE_MAGIC, ARCHIVE_VERSION, chunk_samples))
+
+    def begin_heat(self, name, interval_ms=None, epoch_offset=0.0, passes=(), levels=None):
+        """Start a heat; samples appended from here on belong to it
+
+        Args:
+            name: Heat name, used to find it when reading
+            interval_ms: RSSI push interval, if known
+            epoch_offset: Added to timestamps for wall-clock time
+            passes: Passes recorded live, as (timestamp, device, node, peak)
+            levels: (device, node) -> (enter_at_level, exit_at_level)
+
+        Returns:
+            Heat index
+        """
+        self.end_heat()
+        self.heats.append({
+            'name': name,
+            'interval_ms': interval_ms,
+            'epoch_offset': epoch_offset,
+            'passes': [list(record) for record in passes],
+            'levels': [
+                [device_idx, node_idx, enter_at_level, exit_at_level]
+                for (device_idx, node_idx), (enter_at_level, exit_at_level) in (levels or {}).items()
+            ],
+            'samples': 0,
+        })
+        self._heat = len(self.heats) - 1
+        return self._heat
+
+    def append_batch(self, timestamps, device_idx, node_idxs, rssis):
+        """Append samples from one device, as RaceCapture.append_batch"""
+        self.append_columns(timestamps, repeat(device_idx), node_idxs, rssis)
+
+    def append_columns(self, timestamps, devices, nodes, rssis):
+        """Append samples from any devices
+
+        Args:
+            timestamps: Timestamp per sample, non-decreasing per node
+            devices: Device index per sample
+            nodes: Local node index per sample
+            rssis: RSSI value per sample
+        """
+        if self._heat is None:
+            raise ValueError("No heat started")
+        buffers = self._buffers
+        chunk_samples = self.chunk_samples
+        for timestamp, device_idx, node_idx, rssi in zip(timestamps, devices, nodes, rssis):
+            key = (device_idx, node_idx)
+            buffer = buffers.get(key)
+            if buffer is None:
+                buffer = buffers[key] = ([], [])
+            buffer[0].append(timestamp)
+            buffer[1].append(rssi)
+            if len(buffer[0]) == chunk_samples:
+                del buffers[key]
+                self._write_chunk(device_idx, node_idx, *buffer)
+
+    def end_heat(self):
+        """Write the current heat's partial chunks"""
+        if self._heat is None:
+            return
+        for (device_idx, node_idx), buffer in sorted(self._buffers.items()):
+            self._write_chunk(device_idx, node_idx, *buffer)
+        self._buffers = {}
+        self._heat = None
+
+    def _write_chunk(self, device_idx, node_idx, timestamps, rssis):
+        count = len(timestamps)
+        t0, step, time_bytes = _encode_times(timestamps)
+        rssi_bytes = _encode_rssi(rssis)
+        offset = self._file.tell()
+        self._file.write(struct.pack(
+            CHUNK_HEADER_FORMAT, CHUNK_SYNC, self._heat, device_idx, node_idx, count,
+            len(time_bytes), len(rssi_bytes), zlib.crc32(rssi_bytes, zlib.crc32(time_bytes)), t0, step
+        ))
+        self._file.write(time_bytes)
+        self._file.write(rssi_bytes)
+        self._index.append((offset, self._heat, device_idx, node_idx, count, timestamps[0], timestamps[-1]))
+        self.heats[self._heat]['samples'] += count
+        self.sample_count += count
+
+    def close(self):
+        """Write the heat table and index and close the file"""
+        if self._file is None:
+            return
+        self.end_heat()
+        table_offset = self._file.tell()
+        table = json.dumps(self.heats).encode()
+        self._file.write(table)
+        self._file.write(b''.join(struct.pack(INDEX_ENTRY_FORMAT, *entry) for entry in self._index))
+        self._file.write(struct.pack(FOOTER_FORMAT, table_offset, len(table), len(self._index), FOOTER_MAGIC))
+        self._file.close()
+        self._file = None
+
+
+class ArchiveReader:
+    """Random-access archive reader
+
+    Only the heat table and index are read on open; samples are decoded
+    chunk by chunk as they are asked for.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self.heats = []
+        self.recovered = False  # True when the index was rebuilt by scanning
+        self._chunks = {}  # (heat, device, node) -> [(t_first, t_last, offset)]
+        magic, version, self.chunk_samples = struct.unpack(HEADER_FORMAT, self._file.read(HEADER_SIZE))
+        if magic != ARCHIVE_MAGIC or version != ARCHIVE_VERSION:
+            self._file.close()
+            raise ValueError(f"Not a Chorus32 archive: {path}")
+        if not self._read_index():
+            logger.warning(f"Chorus32 archive {path} has no index, scanning chunks")
+            self._scan_chunks()
+            self.recovered = True
+
+    def _read_index(self):
+        size = self._file.seek(0, os.SEEK_END)
+        if size < HEADER_SIZE + FOOTER_SIZE:
+            return False
+        self._file.seek(size - FOOTER_SIZE)
+        table_offset, table_size, entries, magic = struct.unpack(FOOTER_FORMAT, self._file.read(FOOTER_SIZE))
+        if magic != FOOTER_MAGIC or table_offset + table_size + entries * INDEX_ENTRY_SIZE != size - FOOTER_SIZE:
+            return False
+        self._file.seek(table_offset)
+        self.heats = json.loads(self._file.read(table_size))
+        for offset, heat, device_idx, node_idx, _count, t_first, t_last in \
+                struct.iter_unpack(INDEX_ENTRY_FORMAT, self._file.read(entries * INDEX_ENTRY_SIZE)):
+            self._chunks.setdefault((heat, device_idx, node_idx), []).append((t_first, t_last, offset))
+        return True
+
+    def _scan_chunks(self):
+        """Rebuild the index from chunk headers, up to the first damaged chunk"""
+        offset = HEADER_SIZE
+        samples = {}
+        while True:
+            try:
+                header, timestamps, _rssis = self._read_chunk(offset)
+            except (ValueError, struct.error):
+                break
+            _sync, heat, device_idx, node_idx, count, time_bytes, rssi_bytes, _crc, _t0, _step = header
+            self._chunks.setdefault((heat, device_idx, node_idx), []).append((timestamps[0], timestamps[-1], offset))
+            samples[heat] = samples.get(heat, 0) + count
+            offset += CHUNK_HEADER_SIZE + time_bytes + rssi_bytes
+        self.heats = [
+            {'name': f"Heat {heat + 1}", 'interval_ms': None, 'epoch_offset': 0.0,
+             'passes': [], 'levels': [], 'samples': samples.get(heat, 0)}
+            for heat in range(max(samples, default=-1) + 1)
+        ]
+
+    def _read_chunk(self, offset):
+        self._file.seek(offset)
+        header = struct.unpack(CHUNK_HEADER_FORMAT, self._file.read(CHUNK_HEADER_SIZE))
+        sync, _heat, _device_idx, _node_idx, count, time_bytes, rssi_bytes, crc, t0, step = header
+        if sync != CHUNK_SYNC:
+            raise ValueError(f"Bad chunk at {offset} in {self.path}")
+        payload = self._file.read(time_bytes + rssi_bytes)
+        if len(payload) != time_bytes + rssi_bytes or zlib.crc32(payload) != crc:
+            raise ValueError(f"Corrupt chunk at {offset} in {self.path}")
+        return (
+            header,
+            _decode_times(payload[:time_bytes], count, t0, step),
+            _decode_rssi(payload[time_bytes:], count),
+        )
+
+    def find_heat(self, name):
+        """Index of the last heat with this name, or None"""
+        for heat in range(len(self.heats) - 1, -1, -1):
+            if self.heats[heat]['name'] == name:
+                return heat
+        return None
+
+    def nodes(self, heat):
+        """(device, node) pairs with samples in a heat"""
+        return sorted((device_idx, node_idx) for chunk_heat, device_idx, node_idx in self._chunks if chunk_heat == heat)
+
+    def levels(self, heat):
+        """(device, node) -> (enter_at_level, exit_at_level) recorded for a heat"""
+        return {
+            (device_idx, node_idx): (enter_at_level, exit_at_level)
+            for device_idx, node_idx, enter_at_level, exit_at_level in self.heats[heat]['levels']
+        }
+
+    def iter_chunks(self, heat, device_idx, node_idx, t_start=None, t_end=None):
+        """Yield (timestamps, rssis) per chunk of a node overlapping a time range"""
+        for t_first, t_last, offset in self._chunks.get((heat, device_idx, node_idx), ()):
+            if t_end is not None and t_first > t_end + TIME_RESOLUTION_S:
+                break
+            if t_start is not None and t_last < t_start - TIME_RESOLUTION_S:
+                continue
+            _header, timestamps, rssis = self._read_chunk(offset)
+            yield timestamps, rssis
+
+    def read_node(self, heat, device_idx, node_idx, t_start=None, t_end=None):
+        """Read (timestamps, rssis) for a single node of a heat
+
+        Args:
+            heat: Heat index
+            device_idx: Device index
+            node_idx: Local node index
+            t_start: Earliest timestamp (inclusive), or None
+            t_end: Latest timestamp (inclusive), or None
+        """
+        out_times = []
+        out_rssis = []
+        for timestamps, rssis in self.iter_chunks(heat, device_idx, node_idx, t_start, t_end):
+            if (t_start is None or timestamps[0] >= t_start) and (t_end is None or timestamps[-1] <= t_end):
+                out_times.extend(timestamps)
+                out_rssis.extend(rssis)
+                continue
+            for timestamp, rssi in zip(timestamps, rssis):
+                if (t_start is None or timestamp >= t_start) and (t_end is None or timestamp <= t_end):
+                    out_times.append(timestamp)
+                    out_rssis.append(rssi)
+        return out_times, out_rssis
+
+    def close(self):
+        self._file.close()
+
+
+def archive_capture(writer, capture, name=None, interval_ms=None):
+    """Copy a RaceCapture into an archive as one heat
+
+    Args:
+        writer: ArchiveWriter
+        capture: RaceCapture opened for reading
+        name: Heat name (default: capture file name)
+        interval_ms: RSSI push interval, if known
+
+    Returns:
+        Heat index
+    """
+    if name is None:
+        name = os.path.splitext(os.path.basename(capture.path))[0]
+    heat = writer.begin_heat(name, interval_ms, capture.epoch_offset, capture.passes, capture.levels)
+    for columns in capture.iter_blocks():
+        writer.append_columns(*columns)
+    writer.end_heat()
+    return heat
+
+
+def archive_captures(directory, path, exclude=()):
+    """Pack every capture file in a directory into one archive
+
+    Captures stay in place; retention removes them as usual.
+
+    Args:
+        directory: Capture directory
+        path: Archive file to write
+        exclude: Capture paths to leave out (e.g. one still recording)
+
+    Returns:
+        (heats, samples, capture bytes, archive bytes)
+    """
+    names = sorted(name for name in os.listdir(directory) if name.endswith(CAPTURE_SUFFIX))
+    source_bytes = 0
+    writer = ArchiveWriter(path)
+    try:
+        for name in names:
+            capture_path = os.path.join(directory, name)
+            if capture_path in exclude:
+                continue
+            try:
+                capture = RaceCapture.load(capture_path)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping Chorus32 capture {capture_path}: {e}")
+                continue
+            try:
+                archive_capture(writer, capture)
+            finally:
+                capture.close()
+            source_bytes += os.path.getsize(capture_path)
+    finally:
+        writer.close()
+    return len(writer.heats), writer.sample_count, source_bytes, os.path.getsize(path)
@@ -0,0 +1,115 @@
+"""
+Chorus32 Level Calibration
+
+Streaming estimator that suggests enter/exit levels per node from the RSSI
+stream. Fixed-bin histograms track the noise floor and pass peaks; each
+sample is O(1) and memory is constant, so it can run continuously.
+"""
+
+RSSI_BIN_SHIFT = 3  # 8 RSSI units per bin
+RSSI_BINS = 512  # Covers RSSI 0-4095
+NOISE_DECAY_SAMPLES = 60000  # Halve the noise histogram after ~10 min at 10ms
+PEAK_DECAY_COUNT = 64  # Halve the peak histogram after this many passes
+REFRESH_INTERVAL = 256  # Samples between quantile refreshes
+
+MIN_NOISE_SAMPLES = 500
+MIN_PEAKS = 3
+MIN_PEAK_GAP = 40  # RSSI above the noise high quantile that counts as a pass
+NOISE_FLOOR_QUANTILE = 0.5
+NOISE_HIGH_QUANTILE = 0.95
+PEAK_QUANTILE = 0.25  # Weak passes set the level, so strong ones are never missed
+ENTER_FRACTION = 0.5
+EXIT_FRACTION = 0.35
+
+
+def histogram_quantile(bins, total, quantile):
+    """RSSI value at a quantile of a fixed-bin histogram"""
+    target = total * quantile
+    running = 0
+    for index, count in enumerate(bins):
+        running += count
+        if running >= target and count:
+            return (index << RSSI_BIN_SHIFT) + (1 << (RSSI_BIN_SHIFT - 1))
+    return None
+
+
+class LevelEstimator:
+    """Noise floor and pass peak estimator for a single node
+
+    Samples outside a provisional pass feed the noise histogram. A
+    provisional pass starts when RSSI clears the noise high quantile by
+    MIN_PEAK_GAP, and its peak feeds the peak histogram when it ends.
+    Quantiles are refreshed every REFRESH_INTERVAL samples, and both
+    histograms are halved periodically so old conditions fade out.
+    """
+    def __init__(self):
+        self.noise_bins = [0] * RSSI_BINS
+        self.noise_total = 0
+        self.peak_bins = [0] * RSSI_BINS
+        self.peak_total = 0
+
+        self.noise_floor = None
+        self.noise_high = None
+        self.peak_level = None
+
+        self._since_refresh = 0
+        self._pass_threshold = None
+        self._release_threshold = None
+        self._in_pass = False
+        self._pass_peak = 0
+
+    def add(self, rssi):
+        """Add one RSSI sample"""
+        if self._in_pass:
+            if rssi > self._pass_peak:
+                self._pass_peak = rssi
+            elif rssi < self._release_threshold:
+                self._in_pass = False
+                bin_index = self._pass_peak >> RSSI_BIN_SHIFT
+                self.peak_bins[bin_index if bin_index < RSSI_BINS else RSSI_BINS - 1] += 1
+                self.peak_total += 1
+        else:
+            bin_index = rssi >> RSSI_BIN_SHIFT
+            self.noise_bins[bin_index if bin_index < RSSI_BINS else RSSI_BINS - 1] += 1
+            self.noise_total += 1
+            if self._pass_threshold is not None and rssi >= self._pass_threshold:
+                self._in_pass = True
+                self._pass_peak = rssi
+
+        self._since_refresh += 1
+        if self._since_refresh >= REFRESH_INTERVAL:
+            self.refresh()
+
+    def refresh(self):
+        """Decay the histograms and recompute quantiles"""
+        self._since_refresh = 0
+        if self.noise_total >= NOISE_DECAY_SAMPLES:
+            self.noise_bins = [count >> 1 for count in self.noise_bins]
+            self.noise_total = sum(self.noise_bins)
+        if self.peak_total >= PEAK_DECAY_COUNT:
+            self.peak_bins = [count >> 1 for count in self.peak_bins]
+            self.peak_total = sum(self.peak_bins)
+
+        if self.noise_total >= MIN_NOISE_SAMPLES:
+            self.noise_floor = histogram_quantile(self.noise_bins, self.noise_total, NOISE_FLOOR_QUANTILE)
+            self.noise_high = histogram_quantile(self.noise_bins, self.noise_total, NOISE_HIGH_QUANTILE)
+            self._pass_threshold = self.noise_high + MIN_PEAK_GAP
+            self._release_threshold = self.noise_high + MIN_PEAK_GAP // 2
+        if self.peak_total >= MIN_PEAKS:
+            self.peak_level = histogram_quantile(self.peak_bins, self.peak_total, PEAK_QUANTILE)
+
+    def suggestion(self):
+        """Suggested (enter_at_level, exit_at_level), or None until enough data"""
+        if self.noise_high is None or self.peak_level is None:
+            return None
+        gap = self.peak_level - self.noise_high
+        if gap <= 0:
+            return None
+        return (
+            int(self.noise_high + gap * ENTER_FRACTION),
+            int(self.noise_high + gap * EXIT_FRACTION)
+        )
+
+    def reset(self):
+        """Forget all history"""
+        self.__init__()
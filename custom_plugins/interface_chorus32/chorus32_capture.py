@@ -0,0 +1,410 @@
+"""
+Chorus32 Race Capture
+
+Per-race RSSI capture in a memory-mapped, preallocated columnar file.
+
+File layout:
+    header (64 bytes)
+    block 0, block 1, ...
+
+Each block holds up to block_samples samples:
+    block header (32 bytes): t_min, t_max, sample count, node mask
+    timestamps (float64), devices (uint8), nodes (uint8), rssi (uint16)
+
+Samples are appended in receive order. Timestamps are per-device send
+times on the server timebase, so samples from different devices can be
+out of order by up to ORDER_SLACK_S; block t_min values are close enough
+to sorted for the block headers to double as a time index. The node mask has one bit per
+(device, node) pair so per-node reads can skip whole blocks.
+
+Passes recorded live and the enter/exit levels in use at race start are
+kept in a small JSON sidecar next to the capture file.
+"""
+
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+from bisect import bisect_right
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+logger = logging.getLogger(__name__)
+
+CAPTURE_MAGIC = b'C32RSSI1'
+CAPTURE_VERSION = 1
+CAPTURE_SUFFIX = '.c32r'
+PASSES_SUFFIX = '.json'  # Sidecar with recorded passes and race-time levels
+HEADER_FORMAT = '<8sHxxIIQdd'  # magic, version, block_samples, blocks, samples, epoch offset, start
+HEADER_SIZE = 64
+BLOCK_HEADER_FORMAT = '<ddIxxxxQ'  # t_min, t_max, count, node mask
+BLOCK_HEADER_SIZE = 32
+SAMPLE_SIZE = 12  # float64 + uint8 + uint8 + uint16
+
+DEFAULT_BLOCK_SAMPLES = 4096
+DEFAULT_PREALLOC_BLOCKS = 64  # ~256k samples, ~3MB; grows if a race runs longer
+DEFAULT_MAX_CAPTURES = 50
+DEFAULT_MAX_CAPTURE_BYTES = 1024 * 1024 * 1024
+ORDER_SLACK_S = 0.25  # Widest timestamp disorder between devices that reads allow for
+
+
+def node_mask_bit(device_idx, node_idx):
+    """Block node-mask bit for a (device, node) pair"""
+    return 1 << ((device_idx * 8 + node_idx) & 63)
+
+
+class RaceCapture:
+    """Memory-mapped RSSI capture for a single race
+
+    Open with RaceCapture.create() for recording or RaceCapture.load() for
+    reading. Appends only touch the mapped memory; the file is extended
+    (one syscall) only when the preallocated blocks run out.
+    """
+    def __init__(self, path, file, mm, writable):
+        self.path = path
+        self._file = file
+        self._mm = mm
+        self.writable = writable
+
+        (magic, version, self.block_samples, self.block_count,
+         self.sample_count, self.epoch_offset, self.start_time) = \
+            struct.unpack_from(HEADER_FORMAT, mm, 0)
+        if magic != CAPTURE_MAGIC or version != CAPTURE_VERSION:
+            raise ValueError(f"Not a Chorus32 capture file: {path}")
+
+        self.block_size = BLOCK_HEADER_SIZE + self.block_samples * SAMPLE_SIZE
+        self.passes = []  # [timestamp, device, node, peak]
+        self.levels = {}  # (device, node) -> (enter_at_level, exit_at_level)
+        self._columns = []
+        self._block_t_min = []
+        self._map_blocks()
+
+        # Current write block state, kept in Python and flushed to the
+        # block header once per appended batch
+        self._block_index = 0
+        self._block_fill = 0
+        self._block_mask = 0
+        self._block_t_max = 0.0
+        if self.sample_count:
+            self._block_index = (self.sample_count - 1) // self.block_samples
+            self._block_fill = self.sample_count - self._block_index * self.block_samples
+            _t_min, self._block_t_max, _count, self._block_mask = self._read_block_header(self._block_index)
+
+    @classmethod
+    def create(cls, path, block_samples=DEFAULT_BLOCK_SAMPLES, prealloc_blocks=DEFAULT_PREALLOC_BLOCKS):
+        """Create and preallocate a new capture file
+
+        Args:
+            path: File path
+            block_samples: Samples per block
+            prealloc_blocks: Blocks allocated up front
+
+        Returns:
+            Writable RaceCapture
+        """
+        block_size = BLOCK_HEADER_SIZE + block_samples * SAMPLE_SIZE
+        file = open(path, 'w+b')
+        file.truncate(HEADER_SIZE + prealloc_blocks * block_size)
+        mm = mmap.mmap(file.fileno(), 0)
+        struct.pack_into(
+            HEADER_FORMAT, mm, 0,
+            CAPTURE_MAGIC, CAPTURE_VERSION, block_samples, prealloc_blocks, 0,
+            time.time() - time.monotonic(), time.monotonic()
+        )
+        return cls(path, file, mm, True)
+
+    @classmethod
+    def load(cls, path):
+        """Open an existing capture file read-only"""
+        file = open(path, 'rb')
+        mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        capture = cls(path, file, mm, False)
+        try:
+            with open(path + PASSES_SUFFIX) as sidecar:
+                data = json.load(sidecar)
+            capture.passes = [tuple(record) for record in data.get('passes', [])]
+            capture.levels = {
+                (device_idx, node_idx): (enter_at_level, exit_at_level)
+                for device_idx, node_idx, enter_at_level, exit_at_level in data.get('levels', [])
+            }
+        except (OSError, ValueError) as e:
+            logger.debug(f"No pass sidecar for Chorus32 capture {path}: {e}")
+        return capture
+
+    def _map_blocks(self):
+        """Build per-block column views over the mapped file"""
+        view = memoryview(self._mm)
+        self._columns = []
+        for block in range(self.block_count):
+            base = HEADER_SIZE + block * self.block_size + BLOCK_HEADER_SIZE
+            samples = self.block_samples
+            self._columns.append((
+                view[base:base + samples * 8].cast('d'),
+                view[base + samples * 8:base + samples * 9],
+                view[base + samples * 9:base + samples * 10],
+                view[base + samples * 10:base + samples * 12].cast('H'),
+            ))
+        self._block_t_min = [
+            self._read_block_header(block)[0]
+            for block in range(self._used_blocks())
+        ]
+
+    def _release_views(self):
+        for columns in self._columns:
+            for column in columns:
+                column.release()
+        self._columns = []
+
+    def _used_blocks(self):
+        return (self.sample_count + self.block_samples - 1) // self.block_samples
+
+    def _read_block_header(self, block):
+        return struct.unpack_from(BLOCK_HEADER_FORMAT, self._mm, HEADER_SIZE + block * self.block_size)
+
+    def _grow(self):
+        """Double the number of allocated blocks"""
+        new_count = self.block_count * 2
+        self._release_views()
+        self._mm.resize(HEADER_SIZE + new_count * self.block_size)
+        self.block_count = new_count
+        struct.pack_into('<I', self._mm, 16, self.block_count)
+        self._map_blocks()
+        logger.debug(f"Chorus32 capture {self.path} grown to {new_count} blocks")
+
+    def append_batch(self, timestamps, device_idx, node_idxs, rssis):
+        """Append samples from one device
+
+        Block headers and the sample count are written once per batch
+        (and on block switches) rather than per sample.
+
+        Args:
+            timestamps: Timestamp per sample, non-decreasing
+            device_idx: Device index
+            node_idxs: Local node index per sample
+            rssis: RSSI value per sample
+        """
+        if not timestamps:
+            return
+        block = self._block_index
+        fill = self._block_fill
+        mask = self._block_mask
+        block_samples = self.block_samples
+        block_t_min = self._block_t_min
+        t_max = self._block_t_max
+        if fill == 0 and len(block_t_min) == block:
+            block_t_min.append(timestamps[0])
+            t_max = timestamps[0]
+        elif timestamps[0] < block_t_min[block]:
+            block_t_min[block] = timestamps[0]
+        times, devices, nodes, values = self._columns[block]
+        appended = 0
+
+        for timestamp, node_idx, rssi in zip(timestamps, node_idxs, rssis):
+            if fill == block_samples:
+                self._write_block_header(block, t_max, fill, mask)
+                block += 1
+                fill = 0
+                mask = 0
+                if block == self.block_count:
+                    self._grow()
+                block_t_min.append(timestamp)
+                t_max = timestamp
+                times, devices, nodes, values = self._columns[block]
+            if timestamp > t_max:
+                t_max = timestamp
+            times[fill] = timestamp
+            devices[fill] = device_idx
+            nodes[fill] = node_idx
+            values[fill] = rssi if 0 <= rssi <= 0xFFFF else min(max(rssi, 0), 0xFFFF)
+            mask |= 1 << ((device_idx * 8 + node_idx) & 63)
+            fill += 1
+            appended += 1
+
+        self._block_index = block
+        self._block_fill = fill
+        self._block_mask = mask
+        self._block_t_max = t_max
+        self.sample_count += appended
+        self._write_block_header(block, t_max, fill, mask)
+        struct.pack_into('<Q', self._mm, 20, self.sample_count)
+
+    def _write_block_header(self, block, t_max, count, mask):
+        struct.pack_into(
+            BLOCK_HEADER_FORMAT, self._mm, HEADER_SIZE + block * self.block_size,
+            self._block_t_min[block], t_max, count, mask
+        )
+
+    def record_pass(self, timestamp, device_idx, node_idx, peak):
+        """Record a pass detected live during the race"""
+        self.passes.append((timestamp, device_idx, node_idx, peak))
+
+    def set_levels(self, device_idx, node_idx, enter_at_level, exit_at_level):
+        """Record the enter/exit levels a node used during the race"""
+        self.levels[(device_idx, node_idx)] = (enter_at_level, exit_at_level)
+
+    def _select_blocks(self, t_start, t_end, mask):
+        """Yield (block, count) for blocks that may hold matching samples"""
+        first = 0
+        if t_start is not None:
+            first = max(0, bisect_right(self._block_t_min, t_start - ORDER_SLACK_S) - 1)
+        for block in range(first, self._used_blocks()):
+            t_min, t_max, count, block_mask = self._read_block_header(block)
+            if t_end is not None and t_min > t_end + ORDER_SLACK_S:
+                break
+            if t_end is not None and t_min > t_end:
+                continue
+            if t_start is not None and t_max < t_start:
+                continue
+            if mask is not None and not block_mask & mask:
+                continue
+            yield block, count
+
+    def read(self, device_idx=None, node_idx=None, t_start=None, t_end=None):
+        """Read samples, optionally filtered by node and time range
+
+        Args:
+            device_idx: Device index, or None for all
+            node_idx: Local node index, or None for all
+            t_start: Earliest timestamp (inclusive), or None
+            t_end: Latest timestamp (inclusive), or None
+
+        Returns:
+            (timestamps, devices, nodes, rssis) column lists
+        """
+        out_times, out_devices, out_nodes, out_rssis = [], [], [], []
+        mask = None
+        if device_idx is not None and node_idx is not None:
+            mask = node_mask_bit(device_idx, node_idx)
+
+        for block, count in self._select_blocks(t_start, t_end, mask):
+            times, devices, nodes, values = self._columns[block]
+            for position in range(count):
+                timestamp = times[position]
+                if t_start is not None and timestamp < t_start:
+                    continue
+                if t_end is not None and timestamp > t_end:
+                    continue
+                if device_idx is not None and devices[position] != device_idx:
+                    continue
+                if node_idx is not None and nodes[position] != node_idx:
+                    continue
+                out_times.append(timestamp)
+                out_devices.append(devices[position])
+                out_nodes.append(nodes[position])
+                out_rssis.append(values[position])
+
+        return out_times, out_devices, out_nodes, out_rssis
+
+    def read_node(self, device_idx, node_idx, t_start=None, t_end=None):
+        """Read (timestamps, rssis) for a single node
+
+        Returns NumPy arrays when NumPy is installed, lists otherwise.
+        """
+        if numpy is None:
+            times, _devices, _nodes, rssis = self.read(device_idx, node_idx, t_start, t_end)
+            return times, rssis
+
+        time_parts = []
+        rssi_parts = []
+        mask = node_mask_bit(device_idx, node_idx)
+        for block, count in self._select_blocks(t_start, t_end, mask):
+            times, devices, nodes, values = self._columns[block]
+            block_times = numpy.frombuffer(times, dtype=numpy.float64, count=count)
+            selected = (numpy.frombuffer(devices, dtype=numpy.uint8, count=count) == device_idx) & \
+                (numpy.frombuffer(nodes, dtype=numpy.uint8, count=count) == node_idx)
+            if t_start is not None:
+                selected &= block_times >= t_start
+            if t_end is not None:
+                selected &= block_times <= t_end
+            time_parts.append(block_times[selected])
+            rssi_parts.append(numpy.frombuffer(values, dtype=numpy.uint16, count=count)[selected].astype(numpy.int32))
+
+        if not time_parts:
+            return numpy.empty(0, dtype=numpy.float64), numpy.empty(0, dtype=numpy.int32)
+        return numpy.concatenate(time_parts), numpy.concatenate(rssi_parts)
+
+    def iter_blocks(self):
+        """Yield (timestamps, devices, nodes, rssis) column views per used block, in file order"""
+        for block in range(self._used_blocks()):
+            count = self._read_block_header(block)[2]
+            times, devices, nodes, values = self._columns[block]
+            yield times[:count], devices[:count], nodes[:count], values[:count]
+
+    def close(self):
+        """Flush and close the capture, trimming unused blocks"""
+        if self._mm is None:
+            return
+        used_size = HEADER_SIZE + max(1, self._used_blocks()) * self.block_size
+        self._release_views()
+        if self.writable:
+            struct.pack_into('<I', self._mm, 16, max(1, self._used_blocks()))
+            self._mm.flush()
+        self._mm.close()
+        self._mm = None
+        if self.writable:
+            self._file.truncate(used_size)
+            self._write_sidecar()
+        self._file.close()
+
+    def _write_sidecar(self):
+        data = {
+            'passes': [list(record) for record in self.passes],
+            'levels': [
+                [device_idx, node_idx, enter_at_level, exit_at_level]
+                for (device_idx, node_idx), (enter_at_level, exit_at_level) in self.levels.items()
+            ],
+        }
+        try:
+            with open(self.path + PASSES_SUFFIX, 'w') as sidecar:
+                json.dump(data, sidecar)
+        except OSError as e:
+            logger.warning(f"Unable to write Chorus32 pass sidecar for {self.path}: {e}")
+
+
+def apply_retention(directory, max_count=DEFAULT_MAX_CAPTURES, max_bytes=DEFAULT_MAX_CAPTURE_BYTES,
+                    archive_suffixes=()):
+    """Delete the oldest capture files beyond a count or disk size limit
+
+    Archives written to the same directory (chorus32_archive) share the
+    disk size limit: they are counted in the total and removed oldest
+    first along with captures, but do not count as races.
+
+    Args:
+        directory: Capture directory
+        max_count: Maximum number of captures to keep (0 = unlimited)
+        max_bytes: Maximum total size in bytes of captures, their pass
+            sidecars and archives (0 = unlimited)
+        archive_suffixes: File suffixes of archives in the directory
+    """
+    try:
+        entries = [
+            os.path.join(directory, name)
+            for name in os.listdir(directory)
+            if name.endswith(CAPTURE_SUFFIX) or (archive_suffixes and name.endswith(tuple(archive_suffixes)))
+        ]
+    except FileNotFoundError:
+        return
+
+    entries.sort(key=os.path.getmtime, reverse=True)
+    total_bytes = 0
+    captures = 0
+    for path in entries:
+        is_capture = path.endswith(CAPTURE_SUFFIX)
+        total_bytes += os.path.getsize(path)
+        if is_capture:
+            captures += 1
+            if os.path.exists(path + PASSES_SUFFIX):
+                total_bytes += os.path.getsize(path + PASSES_SUFFIX)
+        if (max_count and is_capture and captures > max_count) or (max_bytes and total_bytes > max_bytes):
+            try:
+                os.remove(path)
+                if os.path.exists(path + PASSES_SUFFIX):
+                    os.remove(path + PASSES_SUFFIX)
+                logger.info(f"Removed old Chorus32 {'capture' if is_capture else 'archive'} {path}")
+            except OSError as e:
+                logger.warning(f"Unable to remove Chorus32 capture {path}: {e}")
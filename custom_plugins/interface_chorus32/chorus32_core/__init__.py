@@ -0,0 +1,24 @@
+"""
+Chorus32 Core
+
+Protocol, stream decoding, time sync and crossing detection for Chorus32
+devices, without RotorHazard or gevent. DeviceSession holds one device's
+protocol state with no I/O; the RotorHazard plugin and the asyncio client
+are both frontends that drive sessions. Standalone tools can use the
+client directly:
+
+    import asyncio
+    from chorus32_core import Chorus32Client, run_clients
+
+    asyncio.run(run_clients([Chorus32Client("192.168.4.1")]))
+"""
+
+from . import chorus32_protocol
+from .chorus32_protocol import Chorus32Encoder, Chorus32BytesEncoder, Chorus32Decoder, Chorus32Commands, \
+    Chorus32Message, MAX_RECEIVERS
+from .chorus32_stream import StreamDecoder, SEGMENT_RSSI, SEGMENT_MESSAGE
+from .chorus32_timesync import DeviceTimebase
+from .chorus32_session import DeviceSession
+from .chorus32_crossing import CrossingEngine, CROSSING_ENTER, CROSSING_EXIT, reevaluate_passes, diff_passes
+from .chorus32_filters import create_rssi_filter, FILTER_NONE, FILTER_LABELS
+from .chorus32_client import Chorus32Client, run_clients
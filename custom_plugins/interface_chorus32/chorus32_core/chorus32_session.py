@@ -0,0 +1,153 @@
+"""
+Chorus32 Device Session
+
+Protocol state of one device without any I/O: the receiver count it
+reported, RSSI push set-up, clock sync requests and replies, and turning
+the text stream into timestamped RSSI runs and messages. A frontend owns
+the connection and feeds the session what it reads:
+
+- Chorus32Client drives a session from an asyncio event loop
+- the RotorHazard plugin drives one per device from its gevent loop or
+  the ingest worker, adding its own scheduling, overload shedding and
+  RotorHazard nodes
+
+Commands come back as (node, command, value) tuples, for
+Chorus32BytesEncoder or a command scheduler to send.
+"""
+
+from . import chorus32_protocol as chorus32
+from .chorus32_stream import StreamDecoder, SEGMENT_RSSI
+from .chorus32_timesync import DeviceTimebase
+
+DEFAULT_RSSI_INTERVAL_MS = 10
+
+
+class DeviceSession:
+    """Decoding, clock sync and push state for one device"""
+    def __init__(self, name, rssi_interval_ms=DEFAULT_RSSI_INTERVAL_MS):
+        self.name = name
+        self.decoder = StreamDecoder(DeviceTimebase(name))
+        self.rssi_interval_ms = rssi_interval_ms
+        self.receivers = None  # Receiver count from the last 'N' reply, None until the device answers
+        self.reset()
+
+    @property
+    def timebase(self):
+        return self.decoder.timebase
+
+    @timebase.setter
+    def timebase(self, timebase):
+        # E.g. a copy of one synced in another process
+        self.decoder.timebase = timebase
+
+    def reset(self):
+        """Start over on a new connection: drop any partial line and refit the push cadence"""
+        self.decoder.buffer = ""
+        self.timebase.reset_cadence(self.rssi_interval_ms / 1000.0)
+
+    def set_rssi_interval(self, interval_ms):
+        """Change the push interval the cadence fit expects
+
+        Args:
+            interval_ms: RSSI push interval in milliseconds
+        """
+        self.rssi_interval_ms = interval_ms
+        self.timebase.reset_cadence(interval_ms / 1000.0)
+
+    def set_receivers(self, count):
+        """Record the receiver count from an 'N' reply
+
+        Args:
+            count: Receivers the device reported
+
+        Returns:
+            True if it differs from the last reply (or is the first)
+        """
+        changed = count != self.receivers
+        self.receivers = count
+        return changed
+
+    def push_commands(self, receivers, interval_ms=None):
+        """Commands that start (or with interval 0, stop) the RSSI push
+
+        Args:
+            receivers: Receiver indices
+            interval_ms: Push interval (default: the session's)
+
+        Returns:
+            (node, command, value) tuples
+        """
+        interval_ms = self.rssi_interval_ms if interval_ms is None else interval_ms
+        return [(receiver, chorus32.Chorus32Commands.RSSI_MON_INTERVAL, interval_ms) for receiver in receivers]
+
+    def time_request(self, now):
+        """Time request command, or None while one is outstanding
+
+        Only one request is outstanding at a time, so each reply pairs
+        with the send time of its own request.
+        """
+        if self.timebase.request_pending(now):
+            return None
+        return 0, chorus32.Chorus32Commands.GET_TIME, None
+
+    def time_request_sent(self, now):
+        """Note the send time of the time request just written"""
+        self.timebase.request_sent(now)
+
+    def time_reply(self, device_ms, received):
+        """Feed a time reply into the clock sync
+
+        Returns:
+            True if the reply was used
+        """
+        return self.timebase.sync_reply(device_ms, received)
+
+    def sample_age(self, device_ms, now):
+        """Age of a device timestamp on the server timebase, or None before the first sync"""
+        if not self.timebase.synced:
+            return None
+        return now - self.timebase.to_server(device_ms)
+
+    def split(self, data):
+        """Append data read from the device and return its complete lines"""
+        return self.decoder.split(data)
+
+    def feed(self, lines, received, keep=None, rssi_filter=None):
+        """Decode complete lines into segments, in stream order
+
+        Yields (SEGMENT_RSSI, node_ids, rssis, timestamps) for each run of
+        RSSI samples, with server timestamps from the push cadence, and
+        (SEGMENT_MESSAGE, message) for everything else.
+
+        The filter sees every sample before any are shed, so its output
+        and its fixed time step do not depend on load shedding.
+
+        Args:
+            lines: Lines from split()
+            received: Server time the lines had arrived by
+            keep: Optional load-shedding callable(node_id, receiver, rssi)
+                returning False to drop a sample; it gets filtered values
+            rssi_filter: Optional RSSI filter (see chorus32_filters) applied to each run
+        """
+        decoder = self.decoder
+        timebase = self.timebase
+        for segment in decoder.decode(lines):
+            if segment[0] == SEGMENT_RSSI:
+                _kind, node_ids, rssis, cycles = segment
+                if rssi_filter is not None:
+                    rssis = rssi_filter.process(node_ids, rssis, decoder.offset)
+                if keep is not None:
+                    offset = decoder.offset
+                    kept = [
+                        position for position, (index, rssi) in enumerate(zip(node_ids, rssis))
+                        if keep(index, index - offset, rssi)
+                    ]
+                    if not kept:
+                        continue
+                    if len(kept) < len(node_ids):
+                        node_ids = [node_ids[position] for position in kept]
+                        rssis = [rssis[position] for position in kept]
+                        cycles = [cycles[position] for position in kept]
+                yield SEGMENT_RSSI, node_ids, rssis, timebase.sample_times(cycles, received)
+            else:
+                yield segment
@@ -0,0 +1,98 @@
+"""
+Chorus32 Stream Decoder
+
+Frames a device's text stream into runs of RSSI samples and other
+messages. RSSI lines are almost all of the traffic, so they are decoded
+inline and batched for the crossing engine, and every sample is numbered
+with the device push cycle it belongs to (see DeviceTimebase).
+
+Other messages split the runs, so samples and replies are handed on in
+stream order.
+"""
+
+from . import chorus32_protocol as chorus32
+
+SEGMENT_RSSI = 0
+SEGMENT_MESSAGE = 1
+
+
+class StreamDecoder:
+    """Line framing and RSSI batching for one device
+
+    Push cycle state lives on the device's timebase, which resets it
+    whenever the push interval changes.
+    """
+    def __init__(self, timebase, node_count=0, offset=0):
+        self.buffer = ""  # Incomplete trailing line
+        self.timebase = timebase
+        self.node_count = node_count  # Samples for receivers beyond this are dropped
+        self.offset = offset  # Added to receiver indices to give the node ids in a run
+
+    def split(self, data):
+        """Append data and return the complete lines
+
+        Args:
+            data: Decoded text from the device
+
+        Returns:
+            Lines without their newline
+        """
+        *lines, self.buffer = (self.buffer + data).split('\n')
+        return lines
+
+    def decode(self, lines):
+        """Decode lines into segments, in stream order
+
+        Yields (SEGMENT_RSSI, node_ids, rssis, cycles) for each run of RSSI
+        samples and (SEGMENT_MESSAGE, message) for everything else. The
+        caller may change node_count and offset while handling a message;
+        the rest of the lines use the new values.
+
+        Args:
+            lines: Lines from split()
+        """
+        parse_message = chorus32.Chorus32Decoder.parse_message
+        decode_hex_value = chorus32.Chorus32Decoder.decode_hex_value
+        get_rssi = chorus32.Chorus32Commands.GET_RSSI
+        timebase = self.timebase
+        cycle = timebase.cycle
+        last_node = timebase.last_node
+        node_count = self.node_count
+        offset = self.offset
+        node_ids = []
+        rssis = []
+        cycles = []
+
+        for line in lines:
+            message = parse_message(line)
+            if not message:
+                continue
+            if message.command == get_rssi:
+                rssi = decode_hex_value(message.data, 4)
+                receiver = message.node
+                if rssi is not None and receiver is not None and receiver < node_count:
+                    # A receiver that does not follow the previous one starts a new push cycle
+                    if receiver <= last_node:
+                        cycle += 1
+                    last_node = receiver
+                    node_ids.append(offset + receiver)
+                    rssis.append(rssi)
+                    cycles.append(cycle)
+            else:
+                # Keep ordering: hand on samples received before this message
+                if node_ids:
+                    yield SEGMENT_RSSI, node_ids, rssis, cycles
+                    node_ids = []
+                    rssis = []
+                    cycles = []
+                # Time replies are placed by their position among push cycles
+                timebase.cycle = cycle
+                timebase.last_node = last_node
+                yield SEGMENT_MESSAGE, message
+                node_count = self.node_count
+                offset = self.offset
+
+        if node_ids:
+            yield SEGMENT_RSSI, node_ids, rssis, cycles
+        timebase.cycle = cycle
+        timebase.last_node = last_node
@@ -0,0 +1,285 @@
+"""
+Chorus32 Time Synchronization
+
+Maps each device onto the server's monotonic timebase so passes from
+different devices can be compared directly.
+
+Two estimates are kept per device:
+
+- Push cadence: RSSI lines carry no device time, but the device pushes one
+  cycle of samples every push interval. Each read is an upper bound on
+  when its newest cycle arrived, so a line fitted along the lowest of those
+  bounds gives every cycle's arrival time, independent of when the server
+  happened to poll.
+- Clock sync: periodic time requests ('t') give (send, reply, device time)
+  triples. A reply's arrival is placed by its position in the stream
+  between push cycles rather than by the poll that read it. The
+  lowest-RTT replies are fitted for offset and drift, and half their mean
+  RTT is taken as the one-way link delay, which is subtracted from cycle
+  arrival times to get send times.
+
+The residual error of both fits is reported per device and attached to
+each pass as a timing uncertainty.
+"""
+
+import logging
+import math
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+SYNC_WINDOW = 32  # Time sync samples kept (~30s at one request per second)
+SYNC_BEST_FRACTION = 0.25  # Lowest-RTT share of samples used for the fit
+SYNC_MIN_BEST = 3
+SYNC_TIMEOUT_S = 2.0  # Requests older than this are abandoned
+SYNC_MIN_DRIFT_SPAN_S = 10.0  # Sample span needed before drift is estimated
+SYNC_MAX_DRIFT = 500e-6  # Crystal drift beyond this is treated as noise
+
+CADENCE_BLOCK_S = 0.5  # Receive bounds are reduced to one minimum per block
+CADENCE_BLOCKS = 16  # Blocks in the cadence fit (~8s)
+CADENCE_MIN_BLOCKS = 3
+CADENCE_STEP_BLOCKS = 3  # Consecutive late blocks that restart the fit
+
+
+def fit_line(xs, ys):
+    """Least-squares fit of ys = intercept + slope * xs
+
+    Returns:
+        (intercept, slope, rms residual)
+    """
+    count = len(xs)
+    mean_x = sum(xs) / count
+    mean_y = sum(ys) / count
+    sxx = sum((x - mean_x) ** 2 for x in xs)
+    slope = 0.0
+    if sxx > 0:
+        slope = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / sxx
+    intercept = mean_y - slope * mean_x
+    rms = math.sqrt(sum((y - intercept - slope * x) ** 2 for x, y in zip(xs, ys)) / count)
+    return intercept, slope, rms
+
+
+class DeviceTimebase:
+    """Clock sync and push cadence model for one device
+
+    All times are server monotonic seconds unless noted.
+    """
+    def __init__(self, name):
+        self.name = name
+
+        # Clock sync: device_s = server_s + offset_s + drift * (server_s - ref_s)
+        self._sync_samples = deque(maxlen=SYNC_WINDOW)  # (server mid, offset, rtt)
+        self._request_sent = None
+        self.offset_s = 0.0
+        self.drift = 0.0
+        self.ref_s = 0.0
+        self.rtt_s = None
+        self.sync_rms_s = 0.0
+
+        # Push cadence
+        self.period_s = 0.0
+        self.cadence_rms_s = None
+        self.reset_cadence(0.0)
+
+    @property
+    def synced(self):
+        return bool(self._sync_samples)
+
+    @property
+    def link_delay_s(self):
+        """Estimated one-way delay from device to server"""
+        return self.rtt_s / 2 if self.rtt_s is not None else 0.0
+
+    def request_pending(self, now):
+        """Whether a time request is still waiting for its reply"""
+        return self._request_sent is not None and now - self._request_sent < SYNC_TIMEOUT_S
+
+    def request_sent(self, now):
+        """Note that a time request was just written to the device"""
+        self._request_sent = now
+
+    def sync_reply(self, device_ms, now):
+        """Add a time reply and refit the clock
+
+        Args:
+            device_ms: Device time from the reply, in milliseconds
+            now: Server time the reply was read
+
+        Returns:
+            True if the reply was paired with an outstanding request
+        """
+        sent = self._request_sent
+        self._request_sent = None
+        if sent is None or now - sent >= SYNC_TIMEOUT_S:
+            return False
+
+        rtt = max(self.arrival_time(now) - sent, 0.0)
+        mid = sent + rtt / 2
+        self._sync_samples.append((mid, device_ms / 1000.0 - mid, rtt))
+        self._fit_clock()
+        return True
+
+    def _fit_clock(self):
+        samples = self._sync_samples
+        best = sorted(samples, key=lambda sample: sample[2])
+        best = best[:max(SYNC_MIN_BEST, int(len(best) * SYNC_BEST_FRACTION))]
+        self.rtt_s = sum(sample[2] for sample in best) / len(best)
+
+        mids = [sample[0] for sample in best]
+        offsets = [sample[1] for sample in best]
+        ref = sum(mids) / len(mids)
+        drift = 0.0
+        if len(best) >= SYNC_MIN_BEST and samples[-1][0] - samples[0][0] >= SYNC_MIN_DRIFT_SPAN_S:
+            offset, drift, rms = fit_line([mid - ref for mid in mids], offsets)
+        if not drift or abs(drift) > SYNC_MAX_DRIFT:
+            offset, drift, rms = fit_line([0.0] * len(offsets), offsets)
+        self.ref_s = ref
+        self.offset_s = offset
+        self.drift = drift
+        self.sync_rms_s = rms
+
+    def to_server(self, device_ms):
+        """Convert device time (ms) to server time (s)"""
+        device_s = device_ms / 1000.0
+        return (device_s - self.offset_s + self.drift * self.ref_s) / (1.0 + self.drift)
+
+    def to_device_ms(self, server_s):
+        """Convert server time (s) to device time (ms)"""
+        return (server_s + self.offset_s + self.drift * (server_s - self.ref_s)) * 1000.0
+
+    def reset_cadence(self, period_s):
+        """Start over with a new push interval (0 = not pushing)"""
+        self.period_s = period_s
+        self.cycle = 0  # Push cycle of the newest sample read so far
+        self.last_node = -1
+        self._blocks = deque(maxlen=CADENCE_BLOCKS)  # (cycle, minimum bound)
+        self._block_start = None
+        self._block_cycle = 0
+        self._block_min = 0.0
+        self._late_blocks = 0
+        self._fit = None  # (base cycle, intercept, slope)
+        self._last_read = None
+        self._read_gap_s = 0.0
+        self.cadence_rms_s = None
+
+    def sample_times(self, cycles, now):
+        """Send times for a run of samples
+
+        Args:
+            cycles: Push cycle number per sample, non-decreasing
+            now: Server time the samples were read
+
+        Returns:
+            Server timestamp per sample
+        """
+        period = self.period_s
+        if period <= 0:
+            return [now] * len(cycles)
+
+        if self._last_read is not None:
+            self._read_gap_s = now - self._last_read
+        self._last_read = now
+        last = cycles[-1]
+        self._observe(last, now)
+
+        delay = self.link_delay_s
+        bound = now - delay
+        fit = self._fit
+        if fit is None:
+            return [bound - (last - cycle) * period for cycle in cycles]
+        base, intercept, slope = fit
+        step = period + slope
+        start = intercept - base * slope - delay
+        if start + last * step > bound:
+            # Never place a sample later than the read that delivered it
+            return [min(start + cycle * step, bound) for cycle in cycles]
+        return [start + cycle * step for cycle in cycles]
+
+    def arrival_time(self, now):
+        """Estimated arrival of the stream position just after the newest cycle
+
+        Args:
+            now: Server time the data was read
+        """
+        fit = self._fit
+        if fit is None:
+            return now
+        base, intercept, slope = fit
+        # Halfway to the next cycle
+        arrival = intercept + slope * (self.cycle - base) + (self.cycle + 0.5) * self.period_s
+        return min(arrival, now)
+
+    def _observe(self, cycle, now):
+        value = now - cycle * self.period_s
+        if self._block_start is None:
+            self._block_start = now
+            self._block_cycle = cycle
+            self._block_min = value
+            return
+        if value < self._block_min:
+            self._block_cycle = cycle
+            self._block_min = value
+        if now - self._block_start < CADENCE_BLOCK_S:
+            return
+
+        block = (self._block_cycle, self._block_min)
+        self._block_start = None
+        fit = self._fit
+        if fit is not None:
+            base, intercept, slope = fit
+            error = block[1] - (intercept + slope * (block[0] - base))
+            if error < -self.period_s:
+                # Samples arrived earlier than possible: the cadence changed
+                self._blocks.clear()
+            elif error > self.period_s:
+                # Late blocks happen under load; a run of them means skipped cycles
+                self._late_blocks += 1
+                if self._late_blocks < CADENCE_STEP_BLOCKS:
+                    return
+                self._blocks.clear()
+            self._late_blocks = 0
+        self._blocks.append(block)
+        self._refit()
+
+    def _refit(self):
+        blocks = self._blocks
+        if len(blocks) < CADENCE_MIN_BLOCKS:
+            self._fit = None
+            self.cadence_rms_s = None
+            return
+        base = blocks[0][0]
+        xs = [cycle - base for cycle, _value in blocks]
+        ys = [value for _cycle, value in blocks]
+        intercept, slope, rms = fit_line(xs, ys)
+        # Bounds lie above the true arrival times, so rest the line on the lowest one
+        intercept += min(y - intercept - slope * x for x, y in zip(xs, ys))
+        self._fit = (base, intercept, slope)
+        self.cadence_rms_s = rms
+
+    def error_s(self):
+        """Residual timebase error, or None until both fits are ready
+
+        Half the best RTT bounds an asymmetric link; the cadence fit
+        residual covers scheduling jitter in the bounds.
+        """
+        if self.rtt_s is None or self.cadence_rms_s is None:
+            return None
+        return self.rtt_s / 2 + self.cadence_rms_s
+
+    def pass_uncertainty_s(self):
+        """Timing uncertainty for a pass: timebase error plus half a push interval"""
+        error = self.error_s()
+        if error is None:
+            # Without a cadence fit, samples are only placed within one read
+            error = self._read_gap_s + (self.rtt_s or 0.0) / 2
+        return error + self.period_s / 2
+
+    def status(self):
+        """Summary for logs and the UI"""
+        error = self.error_s()
+        return {
+            'offset_ms': self.offset_s * 1000.0,
+            'drift_ppm': self.drift * 1e6,
+            'rtt_ms': self.rtt_s * 1000.0 if self.rtt_s is not None else None,
+            'error_ms': error * 1000.0 if error is not None else None,
+        }
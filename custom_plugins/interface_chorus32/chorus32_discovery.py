@@ -0,0 +1,281 @@
+"""
+Chorus32 Device Discovery
+
+Finds Chorus32 devices on a subnet and on local serial ports. Serial
+ports are limited to the USB bridges ESP32 boards use, so the scan does
+not write to GPS receivers, modems or other boards. Every
+candidate gets the same handshake the plugin uses on connect ('N0'), plus
+an API version request ('#'), with short timeouts. Probes run
+concurrently in a bounded pool under one overall deadline, so a /24 scan
+takes a few seconds even when most hosts never answer.
+"""
+
+import ipaddress
+import logging
+import os
+import socket
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import gevent
+import gevent.pool
+
+try:
+    import serial
+    from serial.tools import list_ports
+except ImportError:
+    serial = None
+
+from .chorus32_core import chorus32_protocol as chorus32
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SCAN_SUBNET = '192.168.4.0/24'  # Chorus32 access point network
+SCAN_CONCURRENCY = 64  # Probes in flight at once
+SCAN_DEADLINE_S = 8.0  # Whole scan, including serial ports
+MAX_SCAN_HOSTS = 1024  # Largest subnet scanned (a /22)
+PROBE_CONNECT_TIMEOUT_S = 0.5
+PROBE_REPLY_TIMEOUT_S = 1.0  # Wait for the 'N' reply after the handshake
+PROBE_VERSION_WAIT_S = 0.2  # Extra wait for the '#' reply once 'N' arrived
+PROBE_SERIAL_TIMEOUT_S = 2.0  # Serial adapters may need longer to start answering
+PROBE_READ_SIZE = 256
+
+# USB-serial bridges on ESP32 boards, as (vendor id, product id)
+ESP32_BRIDGE_IDS = {
+    (0x10C4, 0xEA60),  # Silicon Labs CP210x
+    (0x1A86, 0x7523),  # WCH CH340
+    (0x1A86, 0x55D3),  # WCH CH343
+    (0x1A86, 0x55D4),  # WCH CH9102
+    (0x0403, 0x6001),  # FTDI FT232R
+    (0x0403, 0x6015),  # FTDI FT231X
+}
+
+CANDIDATE_TCP = 'tcp'
+CANDIDATE_SERIAL = 'serial'
+
+
+@dataclass
+class DiscoveredDevice:
+    """A device that answered the handshake"""
+    address: str  # host:port or serial port, as typed into the address field
+    kind: str
+    receivers: int
+    api_version: Optional[int]
+    latency_ms: float  # Handshake round trip
+
+
+def subnet_candidates(subnets, port):
+    """TCP candidates for every host in one or more subnets
+
+    Args:
+        subnets: Comma-separated networks or addresses (e.g. "192.168.4.0/24")
+        port: TCP port to probe
+
+    Returns:
+        List of (CANDIDATE_TCP, "host:port")
+
+    Raises:
+        ValueError: For an invalid or too large subnet
+    """
+    candidates = []
+    for subnet in subnets.split(','):
+        subnet = subnet.strip()
+        if not subnet:
+            continue
+        network = ipaddress.ip_network(subnet, strict=False)
+        if network.num_addresses > MAX_SCAN_HOSTS + 2:
+            raise ValueError(f"Subnet {subnet} is larger than {MAX_SCAN_HOSTS} hosts")
+        hosts = list(network.hosts()) or [network.network_address]
+        candidates.extend((CANDIDATE_TCP, f"{host}:{port}") for host in hosts)
+    return candidates
+
+
+def is_esp32_bridge(port_info):
+    """Check whether a list_ports entry is a USB-serial bridge used on ESP32 boards"""
+    return (port_info.vid, port_info.pid) in ESP32_BRIDGE_IDS
+
+
+def _port_key(port):
+    """Comparable serial port name, resolving Linux symlinks such as /dev/serial0"""
+    return os.path.realpath(port) if port.startswith('/') else port.upper()
+
+
+def serial_candidates(exclude=(), all_ports=False):
+    """Serial candidates for local serial ports (none without pyserial)
+
+    Args:
+        exclude: Port names never probed, e.g. those RotorHazard's own
+            node interfaces hold open
+        all_ports: Probe every port, not only ESP32 USB bridges
+
+    Returns:
+        List of (CANDIDATE_SERIAL, port)
+    """
+    if serial is None:
+        return []
+    excluded = {_port_key(port) for port in exclude}
+    candidates = []
+    for port_info in list_ports.comports():
+        if _port_key(port_info.device) in excluded:
+            continue
+        if not all_ports and not is_esp32_bridge(port_info):
+            logger.debug(f"Chorus32 scan skips {port_info.device}: not an ESP32 USB bridge ({port_info.hwid})")
+            continue
+        candidates.append((CANDIDATE_SERIAL, port_info.device))
+    return candidates
+
+
+def _probe_stream(read, write, reply_timeout):
+    """Send the handshake and wait for the replies
+
+    Args:
+        read: Callable returning bytes read (b'' on timeout, None once closed)
+        write: Callable sending bytes
+        reply_timeout: Time allowed for the 'N' reply
+
+    Returns:
+        (receivers, api_version, latency_s), or None if there was no 'N' reply
+    """
+    sent = time.monotonic()
+    write((chorus32.Chorus32Encoder.encode_get_num_receivers() +
+           chorus32.Chorus32Encoder.encode_get_api_version(0)).encode('ascii'))
+    deadline = sent + reply_timeout
+    receivers = None
+    api_version = None
+    latency_s = None
+    buffer = ''
+    while time.monotonic() < deadline:
+        data = read()
+        if data is None:
+            break
+        buffer += data.decode('utf-8', errors='ignore')
+        # A device that was left pushing RSSI interleaves samples with the replies
+        *lines, buffer = buffer.split('\n')
+        for line in lines:
+            message = chorus32.Chorus32Decoder.parse_message(line)
+            if not message:
+                continue
+            if message.command == chorus32.Chorus32Commands.NUM_RECEIVERS and receivers is None:
+                try:
+                    receivers = int(message.data)
+                except ValueError:
+                    continue  # Garbled reply, not a receiver count
+                latency_s = time.monotonic() - sent
+                deadline = min(deadline, time.monotonic() + PROBE_VERSION_WAIT_S)
+            elif message.command == chorus32.Chorus32Commands.GET_API_VERSION:
+                api_version = chorus32.Chorus32Decoder.decode_hex_value(message.data, 4)
+        if receivers is not None and api_version is not None:
+            break
+    if receivers is None:
+        return None
+    return receivers, api_version, latency_s
+
+
+def probe_tcp(address, connect_timeout=PROBE_CONNECT_TIMEOUT_S, reply_timeout=PROBE_REPLY_TIMEOUT_S):
+    """Probe a host:port for a Chorus32
+
+    Returns:
+        DiscoveredDevice or None
+    """
+    host, port = address.rsplit(':', 1)
+    try:
+        sock = socket.create_connection((host, int(port)), timeout=connect_timeout)
+    except OSError:
+        return None
+    try:
+        sock.settimeout(0.05)
+
+        def read():
+            try:
+                data = sock.recv(PROBE_READ_SIZE)
+            except socket.timeout:
+                return b''
+            return data or None
+
+        result = _probe_stream(read, sock.sendall, reply_timeout)
+    except OSError:
+        result = None
+    finally:
+        sock.close()
+    if result is None:
+        return None
+    return DiscoveredDevice(address, CANDIDATE_TCP, result[0], result[1], result[2] * 1000.0)
+
+
+def probe_serial(port, reply_timeout=PROBE_SERIAL_TIMEOUT_S):
+    """Probe a serial port for a Chorus32
+
+    DTR/RTS stay low so opening the port does not reset an ESP32.
+
+    Returns:
+        DiscoveredDevice or None
+    """
+    try:
+        io_stream = serial.Serial()
+        io_stream.port = port
+        io_stream.baudrate = 115200
+        io_stream.timeout = 0.05
+        io_stream.dtr = False
+        io_stream.rts = False
+        io_stream.open()
+    except (OSError, ValueError, serial.SerialException):
+        return None
+    try:
+        result = _probe_stream(lambda: io_stream.read(PROBE_READ_SIZE), io_stream.write, reply_timeout)
+    except (OSError, serial.SerialException):
+        result = None
+    finally:
+        io_stream.close()
+    if result is None:
+        return None
+    return DiscoveredDevice(port, CANDIDATE_SERIAL, result[0], result[1], result[2] * 1000.0)
+
+
+def _probe(candidate):
+    kind, address = candidate
+    if kind == CANDIDATE_SERIAL:
+        return probe_serial(address)
+    return probe_tcp(address)
+
+
+def discover_devices(candidates, concurrency=SCAN_CONCURRENCY, deadline_s=SCAN_DEADLINE_S):
+    """Probe candidates concurrently
+
+    Probes still running at the deadline are abandoned.
+
+    Args:
+        candidates: (kind, address) pairs from subnet_candidates/serial_candidates
+        concurrency: Most probes in flight at once
+        deadline_s: Time allowed for the whole scan
+
+    Returns:
+        DiscoveredDevice list, serial ports first, then by address
+    """
+    deadline = time.monotonic() + deadline_s
+    pool = gevent.pool.Pool(concurrency)
+    greenlets = []
+    started = time.monotonic()
+    for candidate in candidates:
+        if not pool.wait_available(timeout=max(deadline - time.monotonic(), 0)):
+            break
+        greenlets.append(pool.spawn(_probe, candidate))
+    pool.join(timeout=max(deadline - time.monotonic(), 0))
+    unfinished = sum(1 for greenlet in greenlets if not greenlet.ready())
+    pool.kill(block=False)
+
+    found = [greenlet.value for greenlet in greenlets if greenlet.ready() and greenlet.value]
+    found.sort(key=_sort_key)
+    logger.info(
+        f"Chorus32 scan probed {len(greenlets)}/{len(candidates)} candidates in "
+        f"{time.monotonic() - started:.1f}s, found {len(found)}"
+        + (f", {unfinished} timed out" if unfinished else "")
+    )
+    return found
+
+
+def _sort_key(device):
+    if device.kind == CANDIDATE_SERIAL:
+        return (0, device.address)
+    host, port = device.address.rsplit(':', 1)
+    return (1, int(ipaddress.ip_address(host)), int(port))
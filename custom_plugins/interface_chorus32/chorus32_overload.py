@@ -0,0 +1,75 @@
+"""
+Chorus32 Overload Monitor
+
+Tracks whether RotorHazard is falling behind a device's RSSI stream and
+records each overload episode (duration, samples shed, worst backlog).
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+OVERLOAD_AGE_S = 0.25  # Sample age that counts as falling behind
+OVERLOAD_BACKLOG_BYTES = 2048  # Unprocessed bytes that count as falling behind
+OVERLOAD_EXIT_HOLD_S = 1.0  # Time without backlog before an episode ends
+
+
+class OverloadMonitor:
+    """Overload state with hysteresis for a single device"""
+    def __init__(self, name, exit_hold_s=OVERLOAD_EXIT_HOLD_S):
+        self.name = name
+        self.exit_hold_s = exit_hold_s
+        self.overloaded = False
+        self.episode_count = 0
+        self.total_shed = 0
+
+        self._episode_start = 0
+        self._last_backlog_time = 0
+        self._episode_shed = 0
+        self._episode_max_backlog_bytes = 0
+        self._episode_max_age_s = 0
+
+    def observe(self, now, backlog_bytes, sample_age_s=None):
+        """Update overload state from the latest backlog measurements
+
+        Args:
+            now: Current monotonic time in seconds
+            backlog_bytes: Bytes read but not yet processed, or still
+                pending after the read drain limit
+            sample_age_s: Age of the newest processed sample, if known
+
+        Returns:
+            True while overloaded
+        """
+        backlogged = backlog_bytes >= OVERLOAD_BACKLOG_BYTES or \
+            (sample_age_s is not None and sample_age_s >= OVERLOAD_AGE_S)
+
+        if backlogged:
+            self._last_backlog_time = now
+            if not self.overloaded:
+                self.overloaded = True
+                self.episode_count += 1
+                self._episode_start = now
+                self._episode_shed = 0
+                self._episode_max_backlog_bytes = 0
+                self._episode_max_age_s = 0
+                logger.warning(f"Chorus32 {self.name} falling behind, shedding load")
+            self._episode_max_backlog_bytes = max(self._episode_max_backlog_bytes, backlog_bytes)
+            if sample_age_s is not None:
+                self._episode_max_age_s = max(self._episode_max_age_s, sample_age_s)
+
+        elif self.overloaded and now - self._last_backlog_time >= self.exit_hold_s:
+            self.overloaded = False
+            logger.warning(
+                f"Chorus32 {self.name} overload ended after {now - self._episode_start:.1f}s: "
+                f"{self._episode_shed} samples shed, "
+                f"max backlog {self._episode_max_backlog_bytes} bytes, "
+                f"max sample age {self._episode_max_age_s * 1000:.0f}ms"
+            )
+
+        return self.overloaded
+
+    def shed(self, count=1):
+        """Count samples dropped while overloaded"""
+        self._episode_shed += count
+        self.total_shed += count
@@ -0,0 +1,277 @@
+"""
+Chorus32 Hot Path Profiler
+
+Times the read, framing, decoding and crossing stages for a fixed window,
+to find where the time goes on a busy timer without restarting under a
+profiler.
+
+Stages are timed by swapping in wrapped functions for the window, the way
+the ingest worker hooks the interface: methods are shadowed by instance
+(or class) attributes and the originals put back afterwards, so nothing
+runs per call while profiling is off. Every call is counted and one in
+sample_every is timed; stage totals are estimated from the sampled mean.
+Stages nest (an update pass includes its reads, decoding and crossings),
+so times are inclusive.
+
+cProfile and tracemalloc can be added for the window. Both cost much more
+than the stage timers, and cProfile sees every greenlet in the process,
+not only the Chorus32 ones.
+"""
+
+import cProfile
+import io
+import logging
+import pstats
+import time
+import tracemalloc
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILE_WINDOW_S = 30
+MAX_PROFILE_WINDOW_S = 600
+PROFILE_SAMPLE_EVERY = 4  # One call in this many is timed
+CPROFILE_TOP = 30  # Functions listed from cProfile
+ALLOCATION_TOP = 20  # Allocation sites listed from tracemalloc
+REPORT_STAGE_TOP = 5  # Stages listed per process in the panel summary
+
+_MISSING = object()
+
+
+class _Stage:
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.sampled = 0
+        self.sampled_s = 0.0
+        self.max_s = 0.0
+
+    def add(self, elapsed):
+        self.sampled += 1
+        self.sampled_s += elapsed
+        if elapsed > self.max_s:
+            self.max_s = elapsed
+
+
+class HotPathProfiler:
+    """Stage timers, and optionally cProfile and tracemalloc, for one window"""
+    def __init__(self, window_s=DEFAULT_PROFILE_WINDOW_S, sample_every=PROFILE_SAMPLE_EVERY,
+                 use_cprofile=False, use_tracemalloc=False):
+        self.window_s = window_s
+        self.sample_every = sample_every
+        self.use_cprofile = use_cprofile
+        self.use_tracemalloc = use_tracemalloc
+        self.stages = {}
+        self.errors = []
+        self.started_at = None
+        self.finished_at = None
+        self._hooks = []  # (owner, attribute, installed, saved)
+        self._cprofile = None
+        self._tracing = False
+
+    def wrap(self, owner, attribute, stage, iterator=False):
+        """Swap a timed wrapper in for owner.attribute until stop()
+
+        Args:
+            owner: Instance or class holding the function
+            attribute: Function name
+            stage: Stage name; owners sharing a name are added up
+            iterator: The function returns an iterator; time its steps
+                rather than the call that creates it
+        """
+        if owner is None:
+            return
+        saved = vars(owner).get(attribute, _MISSING)
+        function = getattr(owner, attribute)
+        timer = self.stages.get(stage)
+        if timer is None:
+            timer = self.stages[stage] = _Stage(stage)
+        installed = self._timed_iterator(function, timer) if iterator else self._timed(function, timer)
+        if isinstance(saved, staticmethod):
+            installed = staticmethod(installed)
+        setattr(owner, attribute, installed)
+        self._hooks.append((owner, attribute, installed, saved))
+
+    def _timed(self, function, stage):
+        sample_every = self.sample_every
+        perf_counter = time.perf_counter
+
+        def wrapped(*args, **kwargs):
+            stage.calls += 1
+            if stage.calls % sample_every:
+                return function(*args, **kwargs)
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                stage.add(perf_counter() - start)
+        return wrapped
+
+    def _timed_iterator(self, function, stage):
+        sample_every = self.sample_every
+        perf_counter = time.perf_counter
+
+        def steps(iterator):
+            elapsed = 0.0
+            try:
+                while True:
+                    start = perf_counter()
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        elapsed += perf_counter() - start
+                        return
+                    elapsed += perf_counter() - start
+                    yield item
+            finally:
+                stage.add(elapsed)
+
+        def wrapped(*args, **kwargs):
+            stage.calls += 1
+            if stage.calls % sample_every:
+                return function(*args, **kwargs)
+            return steps(function(*args, **kwargs))
+        return wrapped
+
+    def start(self, now):
+        """Start cProfile and tracemalloc if asked for; wrap() stages before or after"""
+        self.started_at = now
+        if self.use_tracemalloc:
+            if tracemalloc.is_tracing():
+                self.errors.append("tracemalloc was already running; allocation sites skipped")
+            else:
+                tracemalloc.start()
+                self._tracing = True
+        if self.use_cprofile:
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+                self._cprofile = profile
+            except ValueError as e:
+                # Only one profiler can be active at a time
+                self.errors.append(f"cProfile unavailable: {e}")
+
+    def expired(self, now):
+        return self.started_at is not None and now - self.started_at >= self.window_s
+
+    def stop(self, now, label):
+        """Restore the original functions and build the report
+
+        A function that was replaced again while profiling (e.g. a new
+        RSSI filter) is left as it is.
+
+        Args:
+            now: Monotonic time
+            label: Process name for the report
+
+        Returns:
+            Report dict (picklable, so the ingest worker can send it)
+        """
+        for owner, attribute, installed, saved in reversed(self._hooks):
+            if vars(owner).get(attribute) is not installed:
+                continue
+            if saved is _MISSING:
+                delattr(owner, attribute)
+            else:
+                setattr(owner, attribute, saved)
+        self._hooks = []
+        self.finished_at = now
+
+        if self._cprofile is not None:
+            self._cprofile.disable()
+
+        allocations = None
+        if self._tracing:
+            # Before the report is built, so its own allocations stay out
+            snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, module.__file__) for module in (tracemalloc, cProfile, pstats)
+            ] + [tracemalloc.Filter(False, __file__)])
+            tracemalloc.stop()
+            self._tracing = False
+            allocations = [
+                {
+                    'site': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                    'size_kb': stat.size / 1024,
+                    'count': stat.count,
+                }
+                for stat in snapshot.statistics('lineno')[:ALLOCATION_TOP]
+            ]
+
+        cprofile_text = None
+        if self._cprofile is not None:
+            stream = io.StringIO()
+            pstats.Stats(self._cprofile, stream=stream).sort_stats('cumulative').print_stats(CPROFILE_TOP)
+            cprofile_text = stream.getvalue()
+            self._cprofile = None
+
+        duration = max(now - self.started_at, 1e-9)
+        stages = []
+        for stage in self.stages.values():
+            if not stage.calls:
+                continue
+            mean_s = stage.sampled_s / stage.sampled if stage.sampled else 0.0
+            total_s = mean_s * stage.calls
+            stages.append({
+                'stage': stage.name,
+                'calls': stage.calls,
+                'sampled': stage.sampled,
+                'mean_ms': mean_s * 1000,
+                'max_ms': stage.max_s * 1000,
+                'total_s': total_s,
+                'share': total_s / duration,
+            })
+        stages.sort(key=lambda row: row['total_s'], reverse=True)
+        return {
+            'process': label,
+            'duration_s': duration,
+            'sample_every': self.sample_every,
+            'stages': stages,
+            'cprofile': cprofile_text,
+            'allocations': allocations,
+            'errors': self.errors,
+        }
+
+
+def format_report(reports):
+    """Plain-text report for download"""
+    lines = [f"Chorus32 hot path profile, {time.strftime('%Y-%m-%d %H:%M:%S')}", ""]
+    for report in reports:
+        lines += [
+            f"== {report['process']}: {report['duration_s']:.1f}s, 1 in {report['sample_every']} calls timed",
+            "",
+            f"{'stage':32s} {'calls':>9s} {'calls/s':>9s} {'mean ms':>9s} {'max ms':>9s} {'est. s':>8s} {'% time':>7s}",
+        ]
+        for row in report['stages']:
+            lines.append(
+                f"{row['stage']:32s} {row['calls']:9d} {row['calls'] / report['duration_s']:9.1f} "
+                f"{row['mean_ms']:9.3f} {row['max_ms']:9.3f} {row['total_s']:8.3f} {row['share'] * 100:6.1f}%"
+            )
+        lines.append("")
+        for error in report['errors']:
+            lines.append(f"Note: {error}")
+        if report['allocations'] is not None:
+            lines += ["Allocation sites (memory still held at the end of the window):", ""]
+            for row in report['allocations']:
+                lines.append(f"{row['size_kb']:10.1f} KiB {row['count']:8d} blocks  {row['site']}")
+            lines.append("")
+        if report['cprofile']:
+            lines += ["cProfile (cumulative):", report['cprofile']]
+    return "\n".join(lines)
+
+
+def summarize_report(reports):
+    """Short markdown summary for the UI panel"""
+    lines = []
+    for report in reports:
+        lines.append(f"**{report['process']}** ({report['duration_s']:.0f}s)")
+        lines.append("")
+        if not report['stages']:
+            lines += ["No stages ran.", ""]
+            continue
+        lines += ["| Stage | Calls/s | Mean ms | Max ms | % Time |", "|---|---|---|---|---|"]
+        for row in report['stages'][:REPORT_STAGE_TOP]:
+            lines.append(
+                f"| {row['stage']} | {row['calls'] / report['duration_s']:.0f} | {row['mean_ms']:.3f} "
+                f"| {row['max_ms']:.2f} | {row['share'] * 100:.1f} |"
+            )
+        lines.append("")
+    return "\n".join(lines)
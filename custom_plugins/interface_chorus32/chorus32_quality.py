@@ -0,0 +1,189 @@
+"""
+Chorus32 Gate Quality
+
+Streaming per-node score of how well pass peaks stand out from the idle
+noise floor, to catch a bad antenna, a bad channel or a misplaced gate
+before a heat starts.
+
+Passes are found from the RSSI stream itself, independent of the
+enter/exit levels, so the score is meaningful before calibration: a pass
+starts when RSSI clears the floor by PASS_SIGMAS standard deviations (at
+least MIN_PASS_GAP) and ends when it drops back below RELEASE_SIGMAS.
+Single-sample spikes are dropped rather than counted as passes, so one
+outlier does not skew the peaks the way it does node_peak_rssi.
+Three running statistics are kept with Welford's method, each O(1) per
+sample with no samples stored:
+
+- Idle floor: mean and variance of samples outside passes
+- Pass peaks: mean and variance of each pass's highest sample
+- Crossing duration: mean time and sample count from pass start to end
+
+Once a statistic has seen its window of values, each new value gets a
+weight of 1/window (an exponentially weighted mean and variance), so a
+fixed antenna or a quieter channel shows up within minutes.
+
+The score is the separation between weak passes (one standard deviation
+below the mean peak) and the floor, in floor standard deviations.
+"""
+
+import math
+
+FLOOR_WINDOW = 6000  # Samples (~60s at 10ms)
+PEAK_WINDOW = 32  # Passes
+MIN_FLOOR_SAMPLES = 500  # Before passes are looked for
+MIN_QUALITY_PASSES = 3  # Before a score is given
+PASS_SIGMAS = 6.0
+RELEASE_SIGMAS = 3.0
+MIN_PASS_GAP = 20  # RSSI above the floor mean that a pass must at least clear
+MIN_PASS_SAMPLES = 2  # Shorter excursions are spikes
+MAX_PASS_S = 3.0  # A longer excursion is a floor shift, not a pass
+MIN_NOISE_STD = 2.0  # Floor for the noise estimate, so a very clean floor does not dominate
+REFRESH_INTERVAL = 256  # Samples between threshold refreshes
+
+GOOD_SCORE = 20.0
+LOW_SCORE = 10.0  # Below this the node is flagged as unreliable
+MIN_SEPARATION = 40  # RSSI between weak passes and the floor below which the node is flagged
+MIN_CROSSING_SAMPLES = 3.0  # Fewer samples per crossing make pass timing fragile
+
+RATING_UNKNOWN = 'unknown'
+RATING_GOOD = 'good'
+RATING_MARGINAL = 'marginal'
+RATING_POOR = 'poor'
+
+
+class RunningStats:
+    """Welford mean and variance, exponentially weighted once full"""
+    def __init__(self, window):
+        self.window = window
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def add(self, value):
+        if self.count < self.window:
+            self.count += 1
+        else:
+            self._m2 -= self._m2 / self.window
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+    @property
+    def std(self):
+        return math.sqrt(self._m2 / self.count) if self.count else 0.0
+
+
+class GateQuality:
+    """Idle floor, pass peak and crossing duration statistics for one node"""
+    def __init__(self):
+        self.floor = RunningStats(FLOOR_WINDOW)
+        self.peaks = RunningStats(PEAK_WINDOW)
+        self.durations = RunningStats(PEAK_WINDOW)  # Seconds
+        self.crossing_samples = RunningStats(PEAK_WINDOW)
+        self.passes = 0
+        self.floor_shifts = 0  # Excursions too long to be passes
+        self.spikes = 0  # Excursions too short to be passes
+
+        self._since_refresh = 0
+        self._pass_threshold = None
+        self._release_threshold = None
+        self._in_pass = False
+        self._pass_peak = 0
+        self._pass_start = 0.0
+        self._pass_samples = 0
+
+    def add(self, rssi, timestamp):
+        """Add one RSSI sample"""
+        if self._in_pass:
+            if rssi >= self._release_threshold:
+                if rssi > self._pass_peak:
+                    self._pass_peak = rssi
+                self._pass_samples += 1
+                if timestamp - self._pass_start > MAX_PASS_S:
+                    # The floor moved (e.g. a transmitter nearby powered up); learn it again
+                    self._in_pass = False
+                    self.floor_shifts += 1
+                    self.floor = RunningStats(FLOOR_WINDOW)
+                    self._pass_threshold = None
+            else:
+                self._in_pass = False
+                if self._pass_samples < MIN_PASS_SAMPLES:
+                    self.spikes += 1
+                else:
+                    self.passes += 1
+                    self.peaks.add(self._pass_peak)
+                    self.durations.add(timestamp - self._pass_start)
+                    self.crossing_samples.add(self._pass_samples)
+        elif self._pass_threshold is not None and rssi >= self._pass_threshold:
+            self._in_pass = True
+            self._pass_peak = rssi
+            self._pass_start = timestamp
+            self._pass_samples = 1
+        else:
+            self.floor.add(rssi)
+
+        self._since_refresh += 1
+        if self._since_refresh >= REFRESH_INTERVAL:
+            self.refresh()
+
+    def refresh(self):
+        """Recompute the pass thresholds from the floor statistics"""
+        self._since_refresh = 0
+        if self.floor.count < MIN_FLOOR_SAMPLES:
+            self._pass_threshold = None
+            return
+        std = self.floor.std
+        self._pass_threshold = self.floor.mean + max(PASS_SIGMAS * std, MIN_PASS_GAP)
+        self._release_threshold = self.floor.mean + max(RELEASE_SIGMAS * std, MIN_PASS_GAP / 2)
+
+    def score(self):
+        """Weak pass separation from the floor in floor standard deviations, or None until enough data"""
+        if self.floor.count < MIN_FLOOR_SAMPLES or self.peaks.count < MIN_QUALITY_PASSES:
+            return None
+        return (self.peaks.mean - self.peaks.std - self.floor.mean) / max(self.floor.std, MIN_NOISE_STD)
+
+    def status(self):
+        """Statistics, score and rating for the UI
+
+        Returns:
+            Dict with floor/peak means and deviations, crossing_ms,
+            crossing_samples, passes, floor_shifts, spikes, score, rating
+            (good, marginal, poor or unknown), flagged and reasons
+        """
+        score = self.score()
+        reasons = []
+        rating = RATING_UNKNOWN
+        if score is not None:
+            separation = self.peaks.mean - self.peaks.std - self.floor.mean
+            rating = RATING_GOOD if score >= GOOD_SCORE else RATING_MARGINAL
+            if score < LOW_SCORE:
+                rating = RATING_POOR
+                reasons.append(f"passes only {score:.1f} noise deviations above the floor")
+            if separation < MIN_SEPARATION:
+                rating = RATING_POOR
+                reasons.append(f"weak passes only {separation:.0f} above the floor")
+            if self.crossing_samples.mean < MIN_CROSSING_SAMPLES:
+                if rating == RATING_GOOD:
+                    rating = RATING_MARGINAL
+                reasons.append(f"short crossings ({self.crossing_samples.mean:.1f} samples)")
+        elif self.floor.count >= MIN_FLOOR_SAMPLES:
+            reasons.append(f"{self.passes} of {MIN_QUALITY_PASSES} passes seen")
+        return {
+            'floor_mean': self.floor.mean if self.floor.count else None,
+            'floor_std': self.floor.std if self.floor.count else None,
+            'peak_mean': self.peaks.mean if self.peaks.count else None,
+            'peak_std': self.peaks.std if self.peaks.count else None,
+            'crossing_ms': self.durations.mean * 1000 if self.durations.count else None,
+            'crossing_samples': self.crossing_samples.mean if self.crossing_samples.count else None,
+            'passes': self.passes,
+            'floor_shifts': self.floor_shifts,
+            'spikes': self.spikes,
+            'score': score,
+            'rating': rating,
+            'flagged': rating == RATING_POOR,
+            'reasons': reasons,
+        }
+
+    def reset(self):
+        """Forget all history"""
+        self.__init__()
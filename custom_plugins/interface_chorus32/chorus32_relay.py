@@ -0,0 +1,270 @@
+"""
+Chorus32 Stream Relay
+
+Republishes each device's stream to local subscribers so overlays,
+analytics and the Chorus32 app can follow a race without opening their
+own connections to the device. Device d is served on base_port + d.
+
+- TCP subscribers get the device's byte stream, cut at line boundaries.
+- WebSocket subscribers (a client that opens with an HTTP upgrade
+  request) get one text message per line.
+
+Subscribers are read-only; anything they send is discarded. The relay
+never blocks ingest: sockets are non-blocking and serviced from the
+update loop with a single select() per poll, each subscriber has its own
+bounded queue, and a subscriber whose queue overflows is disconnected.
+"""
+
+import base64
+import hashlib
+import logging
+import select
+import socket
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RELAY_HOST = '127.0.0.1'
+DEFAULT_MAX_QUEUE_BYTES = 64 * 1024  # ~10s of a 6-node device at 10ms push interval
+SNIFF_TIMEOUT_S = 0.25  # Time a new client has to start a WebSocket upgrade
+MAX_HANDSHAKE_BYTES = 8192
+LISTEN_BACKLOG = 8
+WEBSOCKET_GUID = b'258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+MODE_PENDING = 0
+MODE_TCP = 1
+MODE_WEBSOCKET = 2
+
+
+def websocket_accept(key):
+    """Sec-WebSocket-Accept value for a client key"""
+    return base64.b64encode(hashlib.sha1(key.strip() + WEBSOCKET_GUID).digest()).decode('ascii')
+
+
+def websocket_frame(payload):
+    """Unmasked, final text frame for a server-to-client message"""
+    length = len(payload)
+    if length < 126:
+        header = bytes((0x81, length))
+    elif length < 65536:
+        header = bytes((0x81, 126)) + length.to_bytes(2, 'big')
+    else:
+        header = bytes((0x81, 127)) + length.to_bytes(8, 'big')
+    return header + payload
+
+
+class RelaySubscriber:
+    """One connected consumer and its bounded send queue"""
+    def __init__(self, sock, addr, device_idx, now):
+        self.sock = sock
+        self.addr = addr
+        self.device_idx = device_idx
+        self.mode = MODE_PENDING
+        self.connected_at = now
+        self.received = b''
+        self.queue = deque()
+        self.queued_bytes = 0
+        self.sent_bytes = 0
+
+
+class StreamRelay:
+    """Fan-out of device streams to TCP and WebSocket subscribers"""
+    def __init__(self, device_count, base_port, host=DEFAULT_RELAY_HOST,
+                 max_queue_bytes=DEFAULT_MAX_QUEUE_BYTES):
+        self.device_count = device_count
+        self.base_port = base_port
+        self.host = host
+        self.max_queue_bytes = max_queue_bytes
+        self.listeners = {}  # socket -> device index
+        self.subscribers = {}  # socket -> RelaySubscriber
+        self.subscriber_counts = [0] * device_count  # Active (non-pending) subscribers per device
+
+    @property
+    def running(self):
+        return bool(self.listeners)
+
+    def start(self):
+        """Open one listening socket per device
+
+        Returns:
+            True if at least one port is listening
+        """
+        for device_idx in range(self.device_count):
+            port = self.base_port + device_idx
+            try:
+                listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                listener.bind((self.host, port))
+                listener.listen(LISTEN_BACKLOG)
+                listener.setblocking(False)
+            except OSError as e:
+                logger.warning(f"Chorus32 relay unable to listen on {self.host}:{port}: {e}")
+                continue
+            self.listeners[listener] = device_idx
+            logger.info(f"Chorus32 relay for device {device_idx + 1} on {self.host}:{port}")
+        return self.running
+
+    def stop(self):
+        """Close all subscribers and listening sockets"""
+        for subscriber in list(self.subscribers.values()):
+            self._close(subscriber)
+        for listener in self.listeners:
+            listener.close()
+        self.listeners = {}
+
+    def publish(self, device_idx, lines):
+        """Queue complete lines from a device for its subscribers
+
+        Args:
+            device_idx: Device index
+            lines: Lines without their trailing newline
+        """
+        if not self.subscriber_counts[device_idx] or not lines:
+            return
+        stream = None
+        frames = None
+        for subscriber in list(self.subscribers.values()):
+            if subscriber.device_idx != device_idx:
+                continue
+            if subscriber.mode == MODE_TCP:
+                if stream is None:
+                    stream = ('\n'.join(lines) + '\n').encode('utf-8')
+                self._enqueue(subscriber, stream)
+            elif subscriber.mode == MODE_WEBSOCKET:
+                if frames is None:
+                    frames = b''.join(websocket_frame(line.encode('utf-8')) for line in lines)
+                self._enqueue(subscriber, frames)
+
+    def _enqueue(self, subscriber, data):
+        if subscriber.queued_bytes + len(data) > self.max_queue_bytes:
+            logger.info(
+                f"Chorus32 relay dropping slow subscriber {subscriber.addr[0]}:{subscriber.addr[1]} "
+                f"({subscriber.queued_bytes} bytes queued)"
+            )
+            self._close(subscriber)
+            return
+        subscriber.queue.append(data)
+        subscriber.queued_bytes += len(data)
+
+    def poll(self, now=None):
+        """Accept, sniff, flush and reap subscribers without blocking"""
+        if not self.listeners:
+            return
+        if now is None:
+            now = time.monotonic()
+
+        readable = list(self.listeners)
+        readable.extend(self.subscribers)
+        writable = [sock for sock, subscriber in self.subscribers.items() if subscriber.queue]
+        try:
+            readable, writable, _errors = select.select(readable, writable, [], 0)
+        except (OSError, ValueError):
+            # A socket closed underneath us; it is reaped on its next send/recv
+            return
+
+        for sock in readable:
+            if sock in self.listeners:
+                self._accept(sock, now)
+            elif sock in self.subscribers:
+                self._receive(self.subscribers[sock])
+
+        for sock in writable:
+            subscriber = self.subscribers.get(sock)
+            if subscriber is not None:
+                self._flush(subscriber)
+
+        # Clients that never asked for a WebSocket are plain TCP subscribers
+        for subscriber in list(self.subscribers.values()):
+            if subscriber.mode == MODE_PENDING and now - subscriber.connected_at >= SNIFF_TIMEOUT_S:
+                self._activate(subscriber, MODE_TCP)
+
+    def _accept(self, listener, now):
+        for _pending in range(LISTEN_BACKLOG):
+            try:
+                sock, addr = listener.accept()
+            except OSError:
+                return
+            sock.setblocking(False)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.subscribers[sock] = RelaySubscriber(sock, addr, self.listeners[listener], now)
+
+    def _activate(self, subscriber, mode):
+        subscriber.mode = mode
+        subscriber.received = b''
+        self.subscriber_counts[subscriber.device_idx] += 1
+        logger.info(
+            f"Chorus32 relay subscriber {subscriber.addr[0]}:{subscriber.addr[1]} on device "
+            f"{subscriber.device_idx + 1} ({'WebSocket' if mode == MODE_WEBSOCKET else 'TCP'})"
+        )
+
+    def _receive(self, subscriber):
+        try:
+            data = subscriber.sock.recv(4096)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b''
+        if not data:
+            self._close(subscriber)
+            return
+
+        if subscriber.mode == MODE_PENDING:
+            subscriber.received += data
+            if not subscriber.received.startswith(b'GET '[:len(subscriber.received)]):
+                self._activate(subscriber, MODE_TCP)
+            elif b'\r\n\r\n' in subscriber.received:
+                self._upgrade(subscriber)
+            elif len(subscriber.received) > MAX_HANDSHAKE_BYTES:
+                self._close(subscriber)
+        elif subscriber.mode == MODE_WEBSOCKET and data[0] & 0x0F == 0x8:
+            # Close frame; anything else from the client is ignored
+            self._close(subscriber)
+
+    def _upgrade(self, subscriber):
+        key = None
+        for line in subscriber.received.split(b'\r\n')[1:]:
+            name, _sep, value = line.partition(b':')
+            if name.strip().lower() == b'sec-websocket-key':
+                key = value
+        if key is None:
+            self._close(subscriber)
+            return
+        response = (
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {websocket_accept(key)}\r\n\r\n"
+        ).encode('ascii')
+        self._activate(subscriber, MODE_WEBSOCKET)
+        subscriber.queue.append(response)
+        subscriber.queued_bytes += len(response)
+        self._flush(subscriber)
+
+    def _flush(self, subscriber):
+        queue = subscriber.queue
+        while queue:
+            data = queue[0]
+            try:
+                sent = subscriber.sock.send(data)
+            except BlockingIOError:
+                return
+            except OSError:
+                self._close(subscriber)
+                return
+            subscriber.queued_bytes -= sent
+            subscriber.sent_bytes += sent
+            if sent < len(data):
+                queue[0] = data[sent:]
+                return
+            queue.popleft()
+
+    def _close(self, subscriber):
+        if self.subscribers.pop(subscriber.sock, None) is None:
+            return
+        if subscriber.mode != MODE_PENDING:
+            self.subscriber_counts[subscriber.device_idx] -= 1
+        try:
+            subscriber.sock.close()
+        except OSError:
+            pass
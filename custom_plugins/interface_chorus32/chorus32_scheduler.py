@@ -0,0 +1,221 @@
+"""
+Chorus32 Command Scheduler
+
+Per-device queue for everything the plugin writes once a device is
+running: setpoint changes (frequency, push interval, node active) and
+periodic maintenance polls (time sync, configuration checks, voltage).
+
+- Commands are sent in priority order; setpoint changes always go first.
+- A token bucket caps the command rate so a burst of setpoint changes or
+  polls cannot flood the device while it is pushing RSSI.
+- Deferrable commands (time sync and polls) are held while any node on the
+  device is mid-crossing, so replies never compete with the samples that
+  decide a lap. A command is never held longer than MAX_DEFER_S.
+- Periodic jobs are registered with a period and jitter; the command is
+  built when it is sent, so it reflects the state at that moment.
+- During races, poll jobs run at a multiple of their period (poll backoff).
+
+Commands are (node, command, value) tuples and each service call writes
+its batch as one bytes buffer (Chorus32BytesEncoder), with matching
+setpoints for every receiver collapsed into one '*' line.
+
+Lag (time from ready to sent) and deferrals are tracked per priority for
+diagnostics.
+"""
+
+import logging
+import random
+from collections import deque
+
+from .chorus32_core.chorus32_protocol import Chorus32BytesEncoder
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_SETPOINT = 0  # Setting changes from RotorHazard or the operator
+PRIORITY_SYNC = 1  # Time sync requests
+PRIORITY_POLL = 2  # Background polls (configuration checks, voltage)
+PRIORITY_NAMES = ('setpoint', 'sync', 'poll')
+DEFERRABLE_PRIORITY = PRIORITY_SYNC  # This and lower priorities are held during crossings
+
+DEFAULT_RATE = 50.0  # Commands per second
+DEFAULT_BURST = 16  # Enough for band + channel on 8 nodes at once
+MAX_DEFER_S = 3.0  # A stuck crossing cannot starve polls longer than this
+LAG_EMA_ALPHA = 0.1
+
+
+class ScheduledJob:
+    """A periodic command"""
+    def __init__(self, name, period_s, command_fn, priority, jitter_s, on_sent, now):
+        self.name = name
+        self.period_s = period_s
+        self.command_fn = command_fn  # Returns the command, or None to skip this run
+        self.priority = priority
+        self.jitter_s = jitter_s
+        self.on_sent = on_sent
+        self.next_due = now
+        self.queued = False
+        self.runs = 0
+        self.skipped = 0
+
+    def reschedule(self, now, backoff=1):
+        self.next_due = now + self.period_s * backoff + random.uniform(0, self.jitter_s)
+
+
+class CommandScheduler:
+    """Priority queues and token bucket for one device's commands"""
+    def __init__(self, name, rate=DEFAULT_RATE, burst=DEFAULT_BURST):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self._last_refill = None
+        self.jobs = {}
+        self.poll_backoff = 1  # Period multiplier for poll jobs
+        self.node_count = 0  # Receivers on the device, for '*' collapsing (0 = never collapse)
+        # Entries: (ready time, command or job)
+        self.queues = [deque() for _ in PRIORITY_NAMES]
+
+        # Diagnostics
+        self.sent = [0] * len(PRIORITY_NAMES)
+        self.lag_ema_s = [0.0] * len(PRIORITY_NAMES)
+        self.lag_max_s = [0.0] * len(PRIORITY_NAMES)
+        self.deferrals = 0  # Service calls that held deferrable commands for a crossing
+        self.throttled = 0  # Service calls that ran out of tokens with commands waiting
+        self._deferring_since = None
+
+    def submit(self, command, now, priority=PRIORITY_SETPOINT):
+        """Queue a one-off command
+
+        Args:
+            command: (node, command, value) tuple, or a command line (str)
+            now: Current server time
+            priority: PRIORITY_* level
+        """
+        self.queues[priority].append((now, command))
+
+    def add_job(self, name, period_s, command_fn, now, priority=PRIORITY_POLL, jitter_s=0.0, on_sent=None):
+        """Register a periodic command, first due now
+
+        Args:
+            name: Job name (replaces a job of the same name)
+            period_s: Seconds between runs
+            command_fn: Called when the job is sent; returns the command or None to skip
+            now: Current server time
+            priority: PRIORITY_* level
+            jitter_s: Random extra delay per run, so jobs on several devices drift apart
+            on_sent: Called once the command is written
+        """
+        self.jobs[name] = ScheduledJob(name, period_s, command_fn, priority, jitter_s, on_sent, now)
+
+    def remove_job(self, name):
+        """Unregister a periodic command (a queued run is still sent)"""
+        self.jobs.pop(name, None)
+
+    def set_poll_backoff(self, factor, now):
+        """Stretch poll job periods, e.g. while a race is running
+
+        Args:
+            factor: Period multiplier (1 = normal)
+            now: Current server time
+        """
+        self.poll_backoff = factor
+        for job in self.jobs.values():
+            if job.priority >= PRIORITY_POLL and not job.queued:
+                # Going back to normal must not wait out a stretched period
+                job.next_due = min(job.next_due, now + job.period_s * factor)
+
+    def pending(self):
+        """Number of queued commands"""
+        return sum(len(queue) for queue in self.queues)
+
+    def clear(self):
+        """Drop queued commands (jobs stay registered)"""
+        for queue in self.queues:
+            queue.clear()
+        for job in self.jobs.values():
+            job.queued = False
+
+    def service(self, now, crossing, write):
+        """Queue due jobs and send what the budget allows
+
+        Args:
+            now: Current server time
+            crossing: True while any node on the device is mid-crossing
+            write: Callable taking the encoded batch as one bytes buffer
+
+        Returns:
+            Number of commands sent
+        """
+        for job in self.jobs.values():
+            if not job.queued and now >= job.next_due:
+                job.queued = True
+                self.queues[job.priority].append((job.next_due, job))
+
+        if self._last_refill is not None:
+            self.tokens = min(self.burst, self.tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+        # Deferrable commands wait out crossings, up to MAX_DEFER_S
+        deferring = False
+        if crossing:
+            if self._deferring_since is None:
+                self._deferring_since = now
+            deferring = now - self._deferring_since < MAX_DEFER_S
+        else:
+            self._deferring_since = None
+
+        batch = []
+        sent_jobs = []
+        for priority, queue in enumerate(self.queues):
+            if queue and deferring and priority >= DEFERRABLE_PRIORITY:
+                self.deferrals += 1
+                break
+            while queue and self.tokens >= 1:
+                ready, entry = queue.popleft()
+                if isinstance(entry, ScheduledJob):
+                    entry.queued = False
+                    entry.reschedule(now, self.poll_backoff if priority >= PRIORITY_POLL else 1)
+                    command = entry.command_fn()
+                    if command is None:
+                        entry.skipped += 1
+                        continue
+                    entry.runs += 1
+                    if entry.on_sent is not None:
+                        sent_jobs.append(entry)
+                else:
+                    command = entry
+                self.tokens -= 1
+                batch.append(command)
+                self._record_lag(priority, now - ready)
+            if queue:
+                if self.tokens < 1:
+                    self.throttled += 1
+                break
+
+        if batch:
+            write(Chorus32BytesEncoder.encode_batch(batch, self.node_count))
+            for job in sent_jobs:
+                job.on_sent()
+        return len(batch)
+
+    def _record_lag(self, priority, lag_s):
+        self.sent[priority] += 1
+        self.lag_ema_s[priority] += LAG_EMA_ALPHA * (lag_s - self.lag_ema_s[priority])
+        if lag_s > self.lag_max_s[priority]:
+            self.lag_max_s[priority] = lag_s
+
+    def status(self):
+        """Summary for logs and the UI"""
+        return {
+            'pending': self.pending(),
+            'sent': dict(zip(PRIORITY_NAMES, self.sent)),
+            'lag_ms': {
+                name: self.lag_ema_s[priority] * 1000.0 for priority, name in enumerate(PRIORITY_NAMES)
+            },
+            'max_lag_ms': {
+                name: self.lag_max_s[priority] * 1000.0 for priority, name in enumerate(PRIORITY_NAMES)
+            },
+            'deferrals': self.deferrals,
+            'throttled': self.throttled,
+            'jobs': {name: {'runs': job.runs, 'skipped': job.skipped} for name, job in self.jobs.items()},
+        }
@@ -0,0 +1,294 @@
+"""
+Chorus32 Pass Snapshots
+
+Compact fixed-size RSSI window captured around each pass: pre-roll before
+the crossing started, the crossing itself, and post-roll after the exit.
+Snapshots live in a preallocated pool of slots, reused oldest first, and
+are looked up by (node index, pass timestamp) in O(1).
+"""
+
+import math
+
+DEFAULT_POOL_SIZE = 256  # Passes kept
+DEFAULT_WINDOW_SAMPLES = 128  # Samples per snapshot
+DEFAULT_PRE_ROLL_SAMPLES = 20
+DEFAULT_POST_ROLL_SAMPLES = 20
+PLOT_WIDTH = 64  # Columns in a formatted snapshot's RSSI plot
+PLOT_LEVELS = " ▁▂▃▄▅▆▇█"
+
+
+class PassSnapshotPool:
+    """Per-node sample history plus a bounded pool of pass snapshots
+
+    History and pool storage are allocated up front; feeding samples and
+    finalizing snapshots only overwrite list slots.
+    """
+    def __init__(self, node_count=0, pool_size=DEFAULT_POOL_SIZE,
+                 window_samples=DEFAULT_WINDOW_SAMPLES,
+                 pre_roll_samples=DEFAULT_PRE_ROLL_SAMPLES,
+                 post_roll_samples=DEFAULT_POST_ROLL_SAMPLES):
+        self.pool_size = pool_size
+        self.window_samples = window_samples
+        self.pre_roll_samples = pre_roll_samples
+        self.post_roll_samples = min(post_roll_samples, window_samples)
+        self.track_completed = False  # Collect finished keys for the ingest worker
+        self.completed = []
+
+        # Pool storage, one window per slot
+        self._slot_rssi = [0] * (pool_size * window_samples)
+        self._slot_times = [0.0] * (pool_size * window_samples)
+        self._slot_length = [0] * pool_size
+        self._slot_info = [None] * pool_size  # (key, enter_at_level, exit_at_level, peak, uncertainty)
+        self._slot_by_key = {}
+        self._next_slot = 0
+
+        self.node_count = 0
+        self._history_rssi = []
+        self._history_times = []
+        self._history_count = []
+        self._enter_count = []
+        self._pending = {}  # node index -> [(end count, key, levels, peak, uncertainty), ...]
+        self.resize(node_count)
+
+    def resize(self, node_count):
+        """Grow or shrink per-node history, keeping existing nodes"""
+        window = self.window_samples
+        while self.node_count < node_count:
+            self._history_rssi.append([0] * window)
+            self._history_times.append([0.0] * window)
+            self._history_count.append(0)
+            self._enter_count.append(0)
+            self.node_count += 1
+        if node_count < self.node_count:
+            del self._history_rssi[node_count:]
+            del self._history_times[node_count:]
+            del self._history_count[node_count:]
+            del self._enter_count[node_count:]
+            for index in [index for index in self._pending if index >= node_count]:
+                del self._pending[index]
+            self.node_count = node_count
+
+    def remap(self, sources):
+        """Move per-node history and snapshots to new indices
+
+        Used when the global node index changes. Nodes without a source
+        start with empty history; their snapshots and pending passes are
+        dropped.
+
+        Args:
+            sources: Old node index for each new index, or None for a node
+                that starts empty
+        """
+        window = self.window_samples
+        moved = {old_index: new_index for new_index, old_index in enumerate(sources) if old_index is not None}
+
+        def rekey(key):
+            return (moved[key[0]], key[1]) if key[0] in moved else None
+
+        self._history_rssi = [
+            [0] * window if old_index is None else self._history_rssi[old_index] for old_index in sources
+        ]
+        self._history_times = [
+            [0.0] * window if old_index is None else self._history_times[old_index] for old_index in sources
+        ]
+        self._history_count = [0 if old_index is None else self._history_count[old_index] for old_index in sources]
+        self._enter_count = [0 if old_index is None else self._enter_count[old_index] for old_index in sources]
+        self.node_count = len(sources)
+
+        self._pending = {
+            moved[index]: [(entry[0], rekey(entry[1])) + entry[2:] for entry in waiting]
+            for index, waiting in self._pending.items() if index in moved
+        }
+
+        self._slot_by_key = {}
+        for slot, info in enumerate(self._slot_info):
+            if info is None:
+                continue
+            key = rekey(info[0])
+            if key is None:
+                self._slot_info[slot] = None
+                self._slot_length[slot] = 0
+            else:
+                self._slot_info[slot] = (key,) + info[1:]
+                self._slot_by_key[key] = slot
+        self.completed = [key for key in map(rekey, self.completed) if key is not None]
+
+    def add_batch(self, node_ids, rssis, timestamps, events, levels, uncertainty_s=None):
+        """Feed a batch of samples and the crossing events found in it
+
+        Args:
+            node_ids: Global node index per sample
+            rssis: RSSI value per sample
+            timestamps: Timestamp per sample
+            events: Crossing events for the batch, in sample order
+            levels: Callable returning (enter_at_level, exit_at_level) for a node
+            uncertainty_s: Timing uncertainty of passes in this batch
+        """
+        window = self.window_samples
+        history_rssi = self._history_rssi
+        history_times = self._history_times
+        history_count = self._history_count
+        pending = self._pending
+
+        event_pos = 0
+        next_event = events[0][0] if events else -1
+        position = -1
+        for index, rssi, timestamp in zip(node_ids, rssis, timestamps):
+            position += 1
+            count = history_count[index]
+            slot = count % window
+            history_rssi[index][slot] = rssi
+            history_times[index][slot] = timestamp
+            count += 1
+            history_count[index] = count
+
+            while position == next_event:
+                _position, kind, event_index, event_time, peak = events[event_pos]
+                if kind:
+                    self._enter_count[event_index] = count
+                else:
+                    pending.setdefault(event_index, []).append(
+                        (count + self.post_roll_samples, (event_index, event_time), levels(event_index), peak,
+                         uncertainty_s)
+                    )
+                event_pos += 1
+                next_event = events[event_pos][0] if event_pos < len(events) else -1
+
+            if pending and index in pending:
+                waiting = pending[index]
+                while waiting and waiting[0][0] <= count:
+                    self._finalize(index, *waiting.pop(0))
+                if not waiting:
+                    del pending[index]
+
+    def _finalize(self, index, end_count, key, levels, peak, uncertainty_s):
+        """Copy a pass window from node history into the next pool slot"""
+        window = self.window_samples
+        start_count = max(
+            self._enter_count[index] - 1 - self.pre_roll_samples,
+            end_count - window,
+            self._history_count[index] - window,
+            0
+        )
+        slot = self._next_slot
+        self._next_slot = (slot + 1) % self.pool_size
+
+        old_info = self._slot_info[slot]
+        if old_info is not None:
+            self._slot_by_key.pop(old_info[0], None)
+
+        history_rssi = self._history_rssi[index]
+        history_times = self._history_times[index]
+        base = slot * window
+        length = end_count - start_count
+        for offset in range(length):
+            source = (start_count + offset) % window
+            self._slot_rssi[base + offset] = history_rssi[source]
+            self._slot_times[base + offset] = history_times[source]
+        self._slot_length[slot] = length
+        self._slot_info[slot] = (key, levels[0], levels[1], peak, uncertainty_s)
+        self._slot_by_key[key] = slot
+        if self.track_completed:
+            self.completed.append(key)
+
+    def store(self, key, snapshot):
+        """Store a snapshot built elsewhere (e.g. by the ingest worker)"""
+        window = self.window_samples
+        slot = self._next_slot
+        self._next_slot = (slot + 1) % self.pool_size
+
+        old_info = self._slot_info[slot]
+        if old_info is not None:
+            self._slot_by_key.pop(old_info[0], None)
+
+        length = min(len(snapshot['rssi']), window)
+        base = slot * window
+        self._slot_rssi[base:base + length] = snapshot['rssi'][:length]
+        self._slot_times[base:base + length] = snapshot['timestamps'][:length]
+        self._slot_length[slot] = length
+        self._slot_info[slot] = (
+            key, snapshot['enter_at_level'], snapshot['exit_at_level'], snapshot['peak'], snapshot.get('uncertainty')
+        )
+        self._slot_by_key[key] = slot
+
+    def get(self, node_index, timestamp):
+        """Get the snapshot for a pass
+
+        Args:
+            node_index: Global node index
+            timestamp: Pass timestamp as given to the pass record callback
+
+        Returns:
+            Dict with timestamps, rssi, enter_at_level, exit_at_level, peak
+            and uncertainty (seconds), or None if the pass is unknown,
+            evicted, or its post-roll has not arrived yet
+        """
+        slot = self._slot_by_key.get((node_index, timestamp))
+        if slot is None:
+            return None
+        _key, enter_at_level, exit_at_level, peak, uncertainty_s = self._slot_info[slot]
+        base = slot * self.window_samples
+        length = self._slot_length[slot]
+        return {
+            'timestamps': self._slot_times[base:base + length],
+            'rssi': self._slot_rssi[base:base + length],
+            'enter_at_level': enter_at_level,
+            'exit_at_level': exit_at_level,
+            'peak': peak,
+            'uncertainty': uncertainty_s,
+        }
+
+    def keys(self, node_index=None):
+        """List (node index, timestamp) keys of stored snapshots"""
+        return [key for key in self._slot_by_key if node_index is None or key[0] == node_index]
+
+    def clear(self):
+        """Drop all snapshots and pending passes"""
+        self._slot_by_key.clear()
+        self._slot_info = [None] * self.pool_size
+        self._slot_length = [0] * self.pool_size
+        self._pending.clear()
+        self.completed = []
+
+
+def format_pass_snapshot(seat, lap, count, snapshot, width=PLOT_WIDTH):
+    """Markdown summary of a pass snapshot with a one-line RSSI plot
+
+    Each plot column shows the highest RSSI of the samples it covers,
+    scaled between the lowest sample and the peak. The line below marks
+    columns at or above the enter level with '^'.
+
+    Args:
+        seat: Seat number shown (from 1)
+        lap: Pass number shown (from 0)
+        count: Passes with snapshots on this seat in the race
+        snapshot: Dict from PassSnapshotPool.get
+        width: Plot columns
+
+    Returns:
+        Markdown text
+    """
+    rssi = snapshot['rssi']
+    timestamps = snapshot['timestamps']
+    uncertainty = snapshot['uncertainty']
+    lines = [
+        f"Seat {seat}, pass {lap} ({count} in this race): peak {snapshot['peak']}, "
+        f"enter {snapshot['enter_at_level']} / exit {snapshot['exit_at_level']}"
+        + (f", timing uncertainty {uncertainty * 1000:.1f} ms" if uncertainty is not None else ""),
+    ]
+    if not rssi:
+        return lines[0]
+    lines[0] += f", {len(rssi)} samples over {(timestamps[-1] - timestamps[0]) * 1000:.0f} ms"
+
+    samples = len(rssi)
+    columns = min(width, samples)
+    buckets = [
+        max(rssi[column * samples // columns:(column + 1) * samples // columns]) for column in range(columns)
+    ]
+    low = min(rssi)
+    span = max(max(rssi) - low, 1)
+    top = len(PLOT_LEVELS) - 1
+    plot = ''.join(PLOT_LEVELS[math.ceil((value - low) * top / span)] for value in buckets)
+    marks = ''.join('^' if value >= snapshot['enter_at_level'] else ' ' for value in buckets)
+    lines += ["", "```", plot, marks.rstrip(), "```"]
+    return "\n".join(lines)
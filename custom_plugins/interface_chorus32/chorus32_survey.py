@@ -0,0 +1,218 @@
+"""
+Chorus32 RF Spectrum Survey
+
+Measures the noise floor across a frequency range with every active
+receiver at once, to find noisy channels at a venue before an event.
+
+Frequencies are dealt out round-robin, so each receiver covers the whole
+range rather than a sub-band, and differences between receivers average
+out instead of showing up as steps. Each receiver steps through its
+frequencies on its own:
+
+1. Tune: send 'F' and wait for the device to echo it
+2. Settle: drop samples until the receiver has settled on the new frequency
+3. Dwell: collect samples_per_step samples, then move on
+
+A receiver that does not echo is retried, then the frequency is skipped.
+"""
+
+import logging
+import statistics
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SURVEY_MIN_MHZ = 5645
+DEFAULT_SURVEY_MAX_MHZ = 5945
+DEFAULT_SURVEY_STEP_MHZ = 5
+SURVEY_SAMPLES_PER_STEP = 8
+SETTLE_S = 0.05  # RX5808 tuning and RSSI settling after the echo
+ECHO_TIMEOUT_S = 0.5
+ECHO_RETRIES = 1
+DWELL_TIMEOUT_S = 1.0  # Give up on a frequency when samples stop arriving
+NOISY_MARGIN = 20  # Noise floor this far above the survey median is flagged
+
+_STATE_TUNING = 0
+_STATE_SAMPLING = 1
+_STATE_DONE = 2
+
+
+def parse_survey_range(text):
+    """Parse "min-max" or "min-max:step" in MHz
+
+    Returns:
+        (min_mhz, max_mhz, step_mhz)
+
+    Raises:
+        ValueError: For malformed or out of range values
+    """
+    text = (text or '').strip()
+    if not text:
+        return DEFAULT_SURVEY_MIN_MHZ, DEFAULT_SURVEY_MAX_MHZ, DEFAULT_SURVEY_STEP_MHZ
+    span, _sep, step = text.partition(':')
+    low, _sep, high = span.partition('-')
+    min_mhz, max_mhz = int(low), int(high or low)
+    step_mhz = int(step) if step else DEFAULT_SURVEY_STEP_MHZ
+    if step_mhz <= 0 or not 0 < min_mhz <= max_mhz <= 0xFFFF:
+        raise ValueError(f"Invalid survey range {text}")
+    return min_mhz, max_mhz, step_mhz
+
+
+class _SurveyReceiver:
+    def __init__(self, node_index, frequencies):
+        self.node_index = node_index
+        self.queue = deque(frequencies)
+        self.state = _STATE_DONE
+        self.frequency = None
+        self.sent_at = None
+        self.retries = 0
+        self.sample_from = None  # Samples at or after this server time count
+        self.sampling_since = None
+        self.samples = []
+
+
+class SpectrumSurvey:
+    """Survey state for one run across many receivers
+
+    Node indices are the interface's global node indices. The caller sends
+    the (node_index, frequency) commands returned by start() and service()
+    and reports frequency echoes and RSSI samples back.
+    """
+    def __init__(self, node_indices, frequencies, samples_per_step=SURVEY_SAMPLES_PER_STEP):
+        self.frequencies = list(frequencies)
+        self.samples_per_step = samples_per_step
+        self.receivers = {}
+        for position, node_index in enumerate(node_indices):
+            assigned = self.frequencies[position::len(node_indices)]
+            self.receivers[node_index] = _SurveyReceiver(node_index, assigned)
+        self.measurements = {}  # frequency -> [(node_index, samples)]
+        self.skipped = []
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def done(self):
+        return all(receiver.state == _STATE_DONE for receiver in self.receivers.values())
+
+    def start(self, now):
+        """Begin the survey
+
+        Returns:
+            (node_index, frequency) commands to send
+        """
+        self.started_at = now
+        commands = []
+        for receiver in self.receivers.values():
+            command = self._next(receiver, now)
+            if command:
+                commands.append(command)
+        return commands
+
+    def frequency_echo(self, node_index, frequency, now):
+        """Note a device's 'F' echo"""
+        receiver = self.receivers.get(node_index)
+        if receiver is None or receiver.state != _STATE_TUNING or frequency != receiver.frequency:
+            return
+        receiver.state = _STATE_SAMPLING
+        receiver.sample_from = now + SETTLE_S
+        receiver.sampling_since = now
+
+    def add_batch(self, node_ids, rssis, timestamps):
+        """Add interleaved samples from one device"""
+        receivers = self.receivers
+        for node_index, rssi, timestamp in zip(node_ids, rssis, timestamps):
+            receiver = receivers.get(node_index)
+            if receiver is not None and receiver.state == _STATE_SAMPLING and timestamp >= receiver.sample_from:
+                receiver.samples.append(rssi)
+
+    def service(self, now):
+        """Advance receivers whose step finished or timed out
+
+        Returns:
+            (node_index, frequency) commands to send
+        """
+        commands = []
+        for receiver in self.receivers.values():
+            if receiver.state == _STATE_TUNING:
+                if now - receiver.sent_at < ECHO_TIMEOUT_S:
+                    continue
+                if receiver.retries < ECHO_RETRIES:
+                    receiver.retries += 1
+                    receiver.sent_at = now
+                    commands.append((receiver.node_index, receiver.frequency))
+                    continue
+                logger.info(f"Chorus32 survey: node {receiver.node_index} did not confirm {receiver.frequency} MHz")
+                self.skipped.append(receiver.frequency)
+            elif receiver.state == _STATE_SAMPLING:
+                if len(receiver.samples) >= self.samples_per_step:
+                    self.measurements.setdefault(receiver.frequency, []).append(
+                        (receiver.node_index, receiver.samples)
+                    )
+                elif now - receiver.sampling_since < DWELL_TIMEOUT_S:
+                    continue
+                else:
+                    self.skipped.append(receiver.frequency)
+            else:
+                continue
+            command = self._next(receiver, now)
+            if command:
+                commands.append(command)
+        if self.finished_at is None and self.done:
+            self.finished_at = now
+        return commands
+
+    def abort(self, now):
+        """Stop stepping; measured frequencies are kept"""
+        for receiver in self.receivers.values():
+            receiver.queue.clear()
+            receiver.state = _STATE_DONE
+        if self.finished_at is None:
+            self.finished_at = now
+
+    def _next(self, receiver, now):
+        receiver.samples = []
+        if not receiver.queue:
+            receiver.state = _STATE_DONE
+            return None
+        receiver.frequency = receiver.queue.popleft()
+        receiver.state = _STATE_TUNING
+        receiver.sent_at = now
+        receiver.retries = 0
+        return receiver.node_index, receiver.frequency
+
+    def results(self):
+        """Noise floor profile, by frequency
+
+        Returns:
+            List of dicts: frequency, floor (median RSSI), peak (max RSSI),
+            samples, receivers and noisy (floor NOISY_MARGIN above the
+            survey median)
+        """
+        rows = []
+        for frequency in sorted(self.measurements):
+            values = [value for _node, samples in self.measurements[frequency] for value in samples]
+            rows.append({
+                'frequency': frequency,
+                'floor': statistics.median(values),
+                'peak': max(values),
+                'samples': len(values),
+                'receivers': sorted({node for node, _samples in self.measurements[frequency]}),
+            })
+        if rows:
+            baseline = statistics.median(row['floor'] for row in rows)
+            for row in rows:
+                row['noisy'] = row['floor'] >= baseline + NOISY_MARGIN
+        return rows
+
+    def status(self):
+        """Summary for logs and the UI"""
+        duration = None
+        if self.started_at is not None and self.finished_at is not None:
+            duration = self.finished_at - self.started_at
+        return {
+            'frequencies': len(self.frequencies),
+            'measured': len(self.measurements),
+            'skipped': sorted(self.skipped),
+            'receivers': len(self.receivers),
+            'duration_s': duration,
+        }
@@ -0,0 +1,143 @@
+"""
+Chorus32 Socket Transport
+
+TCP stream for Chorus32 devices on WiFi, with a selectable tuning profile:
+
+- TCP_NODELAY: command batches go out at once instead of waiting behind
+  Nagle's algorithm for the ACK of the previous write.
+- SO_RCVBUF: room for the burst of samples a device delivers after a WiFi
+  stall, so the device is not throttled while the link catches up.
+- TCP keepalive and TCP_USER_TIMEOUT: a dead link fails reads and writes
+  within seconds instead of hanging on retransmissions.
+- Larger reads: a backlog drains in a few large reads instead of many
+  small ones; the cost of a read is mostly per call, not per byte.
+
+Options the platform lacks are skipped.
+"""
+
+import logging
+import socket
+from dataclasses import dataclass
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DEFAULT = 'default'
+PROFILE_LOW_LATENCY = 'low_latency'
+
+
+@dataclass(frozen=True)
+class TransportProfile:
+    """Socket options applied when a device connects"""
+    label: str
+    read_timeout_s: float  # No data for this long is a timeout
+    nodelay: bool = False
+    rcvbuf_bytes: int = 0  # 0 = system default (autotuned on Linux)
+    keepalive_idle_s: int = 0  # 0 = no keepalive
+    keepalive_interval_s: int = 1
+    keepalive_count: int = 3
+    user_timeout_ms: int = 0  # Unacknowledged writes fail after this long (0 = system default)
+    read_size: int = 0  # Bytes per read (0 = the plugin's READ_CHUNK_SIZE)
+
+
+TRANSPORT_PROFILES = {
+    PROFILE_DEFAULT: TransportProfile(label="Default", read_timeout_s=5.0),
+    PROFILE_LOW_LATENCY: TransportProfile(
+        label="Low Latency",
+        # Time sync replies arrive every second even with the RSSI push off
+        read_timeout_s=2.5,
+        nodelay=True,
+        rcvbuf_bytes=256 * 1024,
+        keepalive_idle_s=2,
+        keepalive_interval_s=1,
+        keepalive_count=3,
+        user_timeout_ms=5000,
+        read_size=8192,
+    ),
+}
+
+
+def _set_option(sock, level, name, value):
+    option = getattr(socket, name, None)
+    if option is None:
+        return False
+    try:
+        sock.setsockopt(level, option, value)
+        return True
+    except OSError as e:
+        logger.debug(f"Chorus32 transport could not set {name}: {e}")
+        return False
+
+
+def apply_profile(sock, profile):
+    """Apply a profile's options to a TCP socket before it connects
+
+    The receive buffer size decides the TCP window scale, which is fixed
+    in the handshake, so SO_RCVBUF only takes full effect when it is set
+    before connect(). The read timeout is left to the caller, which
+    still needs the connect timeout.
+
+    Returns:
+        Names of the options that were set
+    """
+    applied = []
+    if profile.nodelay and _set_option(sock, socket.IPPROTO_TCP, 'TCP_NODELAY', 1):
+        applied.append('TCP_NODELAY')
+    if profile.rcvbuf_bytes and _set_option(sock, socket.SOL_SOCKET, 'SO_RCVBUF', profile.rcvbuf_bytes):
+        applied.append('SO_RCVBUF')
+    if profile.keepalive_idle_s and _set_option(sock, socket.SOL_SOCKET, 'SO_KEEPALIVE', 1):
+        applied.append('SO_KEEPALIVE')
+        # Linux names the idle time TCP_KEEPIDLE, macOS TCP_KEEPALIVE
+        for name in ('TCP_KEEPIDLE', 'TCP_KEEPALIVE'):
+            if _set_option(sock, socket.IPPROTO_TCP, name, profile.keepalive_idle_s):
+                applied.append(name)
+                break
+        if _set_option(sock, socket.IPPROTO_TCP, 'TCP_KEEPINTVL', profile.keepalive_interval_s):
+            applied.append('TCP_KEEPINTVL')
+        if _set_option(sock, socket.IPPROTO_TCP, 'TCP_KEEPCNT', profile.keepalive_count):
+            applied.append('TCP_KEEPCNT')
+    if profile.user_timeout_ms and _set_option(sock, socket.IPPROTO_TCP, 'TCP_USER_TIMEOUT', profile.user_timeout_ms):
+        applied.append('TCP_USER_TIMEOUT')
+    return applied
+
+
+class SocketStream:
+    """Socket stream wrapper for network connections"""
+    def __init__(self, sock, profile: Optional[TransportProfile] = None, options=()):
+        self.socket = sock
+        self.profile = profile or TRANSPORT_PROFILES[PROFILE_DEFAULT]
+        self.options = list(options)  # Profile options that were set
+
+    @classmethod
+    def connect(cls, host_port, connect_timeout_s, profile=None):
+        """Open a TCP connection with a profile applied
+
+        Like socket.create_connection, each address of the host is tried
+        in turn; the profile's options are set on each socket before it
+        connects.
+        """
+        host, port = host_port
+        error = None
+        for family, sock_type, proto, _name, address in socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM):
+            sock = socket.socket(family, sock_type, proto)
+            try:
+                options = apply_profile(sock, profile) if profile is not None else []
+                sock.settimeout(connect_timeout_s)
+                sock.connect(address)
+            except OSError as e:
+                sock.close()
+                error = e
+                continue
+            if profile is not None:
+                sock.settimeout(profile.read_timeout_s)
+            return cls(sock, profile, options)
+        raise error if error is not None else OSError(f"No address found for {host}")
+
+    def write(self, data):
+        self.socket.sendall(data)
+
+    def read(self, max_size):
+        return self.socket.recv(max_size)
+
+    def close(self):
+        self.socket.close()
@@ -0,0 +1,114 @@
+"""
+Chorus32 Voltage Monitor
+
+Keeps a short history of a device's supply voltage from periodic 'v'
+polls and raises alerts when it is low or sagging. A timer running down
+on a field battery shows up first as flaky RSSI, so the alert points at
+the cause before laps go missing.
+"""
+
+import logging
+import math
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+VOLTS_PER_UNIT = 5.0 * 11.0 / 1024.0  # Chorus 'v' replies use the Chorus RF 10-bit ADC scale behind an 11:1 divider
+VOLTAGE_HISTORY = 240  # Readings kept (2 hours at the default 30s interval)
+SMOOTHING_READINGS = 3  # Median of this many readings rejects single glitches
+CELL_MAX_V = 4.35  # Highest charge per cell (LiHV), so a full pack never reads as one cell more
+MIN_BATTERY_V = 6.0  # Below this the device runs from USB or a regulated supply: no cell guess
+MAX_CELLS = 6
+CELL_LOW_V = 3.5  # Default low alert per cell
+LOW_CLEAR_MARGIN_V = 0.2  # Recovery needed before a low alert clears
+SAG_WINDOW_S = 300.0  # Drop measured against the highest smoothed reading in this window
+SAG_DROP_V = 0.5  # Drop within the window that counts as sagging
+
+ALERT_LOW = 'low'
+ALERT_SAG = 'sag'
+
+
+class VoltageMonitor:
+    """Voltage history and low/sag alerts for one device"""
+    def __init__(self, name, low_v=0.0, capacity=VOLTAGE_HISTORY):
+        self.name = name
+        self.low_v = low_v  # 0 = CELL_LOW_V per cell, cell count from the first battery reading
+        self.cells = None
+        self.history = deque(maxlen=capacity)  # (server time, volts)
+        self.smoothed = deque(maxlen=capacity)  # (server time, median of the last SMOOTHING_READINGS volts)
+        self.alerts = set()
+
+    @property
+    def latest(self):
+        """Most recent reading in volts, or None"""
+        return self.history[-1][1] if self.history else None
+
+    @property
+    def low_threshold_v(self):
+        if self.low_v > 0:
+            return self.low_v
+        if self.cells is None:
+            return None
+        return self.cells * CELL_LOW_V
+
+    def add(self, now, raw):
+        """Add a 'v' reply
+
+        Args:
+            now: Server time the reply was read
+            raw: Raw value from the reply
+
+        Returns:
+            List of newly raised alert messages
+        """
+        volts = raw * VOLTS_PER_UNIT
+        history = self.history
+        history.append((now, volts))
+        if self.cells is None and volts >= MIN_BATTERY_V:
+            self.cells = min(math.ceil(volts / CELL_MAX_V), MAX_CELLS)
+
+        recent = sorted(value for _time, value in list(history)[-SMOOTHING_READINGS:])
+        smoothed = recent[len(recent) // 2]
+        self.smoothed.append((now, smoothed))
+        raised = []
+
+        low = self.low_threshold_v
+        if low is not None:
+            if smoothed < low and ALERT_LOW not in self.alerts:
+                self.alerts.add(ALERT_LOW)
+                raised.append(f"voltage low: {smoothed:.1f}V (alert below {low:.1f}V)")
+            elif smoothed >= low + LOW_CLEAR_MARGIN_V:
+                self.alerts.discard(ALERT_LOW)
+
+        # Compare against the highest smoothed value in the window, excluding the newest,
+        # so one high glitch cannot raise a sag alert on its own
+        window_max = None
+        for timestamp, value in self.smoothed:
+            if now - timestamp <= SAG_WINDOW_S and timestamp != now:
+                window_max = value if window_max is None else max(window_max, value)
+        if window_max is not None:
+            drop = window_max - smoothed
+            if drop >= SAG_DROP_V and ALERT_SAG not in self.alerts:
+                self.alerts.add(ALERT_SAG)
+                raised.append(
+                    f"voltage sagging: {window_max:.1f}V to {smoothed:.1f}V in {SAG_WINDOW_S / 60:.0f} minutes"
+                )
+            elif drop < SAG_DROP_V / 2:
+                self.alerts.discard(ALERT_SAG)
+
+        for message in raised:
+            logger.warning(f"Chorus32 {self.name} {message}")
+        return raised
+
+    def status(self):
+        """Summary for logs and the UI"""
+        values = [value for _time, value in self.history]
+        return {
+            'volts': self.latest,
+            'min_volts': min(values) if values else None,
+            'max_volts': max(values) if values else None,
+            'low_threshold_v': self.low_threshold_v,
+            'cells': self.cells,
+            'alerts': sorted(self.alerts),
+            'readings': len(values),
+        }
@@ -0,0 +1,473 @@
+"""
+Chorus32 Ingest Worker
+
+Optional worker process that owns the Chorus32 device connections, parses
+the RSSI stream and runs crossing detection outside the RotorHazard process.
+All per-sample work (crossings, level estimators, gate quality, peak/nadir,
+RF surveys and RSSI captures) happens in the worker. The newest RSSI
+value of each node is published in shared memory; everything else
+(passes, crossing state, non-RSSI messages, clock sync, periodic node
+statistics) goes through a pipe.
+"""
+
+import logging
+import multiprocessing
+import time
+from multiprocessing import shared_memory
+
+import gevent
+
+from .chorus32_core import chorus32_protocol as chorus32
+from .chorus32_core.chorus32_crossing import CROSSING_ENTER
+
+logger = logging.getLogger(__name__)
+
+WORKER_STOP_TIMEOUT_S = 2
+SCHEDULER_STATUS_INTERVAL_S = 1.0  # How often the worker reports command scheduler diagnostics
+NODE_STATS_INTERVAL_S = 1.0  # How often the worker sends peak/nadir, level estimators and gate quality
+
+
+class LatestRssiBuffer:
+    """Newest RSSI value of each receiver, in shared memory
+
+    Layout: one uint64 write counter per row, followed by one int32 RSSI
+    value per row. Rows are fixed receiver slots (device index *
+    MAX_RECEIVERS + local index), so they stay valid when a device's
+    receiver count arrives after the worker has started. The writer stores
+    the value before bumping the counter, so a reader that sees a new
+    count also sees the value written with it.
+    """
+    def __init__(self, node_count):
+        self.node_count = node_count
+        heads_size = node_count * 8
+        values_size = node_count * 4
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, heads_size + values_size))
+        buf = self.shm.buf
+        self.heads = buf[:heads_size].cast('Q')
+        self.values = buf[heads_size:heads_size + values_size].cast('i')
+        for index in range(node_count):
+            self.heads[index] = 0
+
+    def write(self, node_index, rssi):
+        """Publish a node's newest RSSI value (worker side)"""
+        self.values[node_index] = rssi
+        self.heads[node_index] += 1
+
+    def latest(self, node_index):
+        """Write counter and newest RSSI value of a row (reader side)
+
+        Returns:
+            (head, rssi); rssi is None while the row is empty
+        """
+        head = self.heads[node_index]
+        if not head:
+            return head, None
+        return head, self.values[node_index]
+
+    def close(self):
+        """Release the views and free the shared memory block"""
+        self.heads.release()
+        self.values.release()
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class WorkerStreamProxy:
+    """Stands in for a device io_stream in the main process
+
+    Writes are forwarded to the worker, which owns the real connection.
+    """
+    def __init__(self, worker, device_idx):
+        self.worker = worker
+        self.device_idx = device_idx
+
+    def write(self, data):
+        self.worker.send(('write', self.device_idx, data))
+
+    def read(self, max_size):
+        return b""
+
+    def close(self):
+        pass
+
+
+class Chorus32IngestWorker:
+    """Runs device I/O, parsing and crossing detection in a child process
+
+    The child is forked from the RotorHazard process so it inherits the
+    interface and devices as they are at start time. Non-RSSI messages,
+    including receiver counts, are forwarded so both processes build the
+    same nodes. Afterwards the main process only mirrors current RSSI,
+    crossing state and the worker's node statistics onto its nodes and
+    records laps, keeping the plugin API identical in both modes. RF surveys
+    and RSSI captures are started from the main process but run in the
+    worker, next to the samples they need.
+    """
+    def __init__(self, interface, poll_rate):
+        self.interface = interface
+        self.poll_rate = poll_rate
+        self.latest_rssi = None
+        self.process = None
+        self._conn = None
+        self._rssi_heads = []
+        self._levels = []
+        self._running = False
+        self.scheduler_status = {}  # Device index -> latest scheduler status from the worker
+
+    # Main process side
+
+    def start(self, connect_timeout):
+        """Fork the worker and wait for it to report device connections
+
+        Args:
+            connect_timeout: Per-device connect timeout in seconds
+
+        Returns:
+            True if at least one device connected
+        """
+        rows = len(self.interface.devices) * chorus32.MAX_RECEIVERS
+        self.latest_rssi = LatestRssiBuffer(rows)
+        self._rssi_heads = [0] * rows
+        self._levels = [None] * rows
+
+        ctx = multiprocessing.get_context('fork')
+        parent_conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=self._child_main,
+            args=(child_conn, parent_conn),
+            name='chorus32-ingest',
+            daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self._conn = parent_conn
+
+        devices = self.interface.devices
+        pending = len(devices)
+        any_connected = False
+        deadline_s = connect_timeout * max(1, pending) + 1
+        while pending and self._conn.poll(deadline_s):
+            event = self._conn.recv()
+            if event[0] != 'connected':
+                continue
+            device = devices[event[1]]
+            device.connected = event[2]
+            if event[2]:
+                device.io_stream = WorkerStreamProxy(self, event[1])
+                any_connected = True
+            pending -= 1
+
+        logger.info(f"Chorus32 ingest worker started (pid {self.process.pid})")
+        return any_connected
+
+    def stop(self):
+        """Stop the worker process and free the shared memory"""
+        if self.process is not None:
+            self.send(('stop',))
+            self.process.join(WORKER_STOP_TIMEOUT_S)
+            if self.process.is_alive():
+                self.process.terminate()
+                self.process.join(WORKER_STOP_TIMEOUT_S)
+            self.process = None
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        if self.latest_rssi is not None:
+            self.latest_rssi.close()
+            self.latest_rssi = None
+        for device in self.interface.devices:
+            device.io_stream = None
+            device.connected = False
+
+    def send(self, command):
+        """Send a command to the worker"""
+        if self._conn is not None:
+            try:
+                self._conn.send(command)
+            except (BrokenPipeError, OSError) as e:
+                logger.warning(f"Chorus32 ingest worker unreachable: {e}")
+
+    def poll(self):
+        """Mirror worker state onto the main-process nodes
+
+        Called from the interface update loop in place of reading the
+        devices directly.
+        """
+        if self._conn is None:
+            return
+
+        try:
+            while self._conn.poll():
+                self._handle_event(self._conn.recv())
+        except EOFError:
+            pass
+
+        if not self.process.is_alive():
+            logger.warning("Chorus32 ingest worker exited unexpectedly")
+            self.interface._worker_survey = False
+            for device in self.interface.devices:
+                if device.connected:
+                    device.connected = False
+                    device.close_callback()
+            self._conn.close()
+            self._conn = None
+            return
+
+        devices = self.interface.devices
+        latest_rssi = self.latest_rssi
+        rssi_heads = self._rssi_heads
+        for dev_idx, local_idx in self.interface._node_locations:
+            node = devices[dev_idx].nodes[local_idx]
+            row = dev_idx * chorus32.MAX_RECEIVERS + local_idx
+            head, rssi = latest_rssi.latest(row)
+            if head != rssi_heads[row]:
+                rssi_heads[row] = head
+                node.current_rssi = rssi
+
+            # RotorHazard changes levels on the node objects directly
+            levels = (node.enter_at_level, node.exit_at_level)
+            if levels != self._levels[row]:
+                self._levels[row] = levels
+                self.send(('levels', row, levels[0], levels[1]))
+
+    def _row_node(self, row):
+        """Node in a receiver row, or None if the device has no such receiver"""
+        nodes = self.interface.devices[row // chorus32.MAX_RECEIVERS].nodes
+        local_idx = row % chorus32.MAX_RECEIVERS
+        return nodes[local_idx] if local_idx < len(nodes) else None
+
+    def _handle_event(self, event):
+        kind = event[0]
+        if kind == 'pass':
+            _kind, row, timestamp, source, peak, uncertainty_s = event
+            node = self._row_node(row)
+            if node is None:
+                return
+            node.crossing_flag = False
+            node.exit_at_timestamp = timestamp
+            node.pass_uncertainty_s = uncertainty_s
+            if callable(self.interface.pass_record_callback):
+                self.interface.pass_record_callback(node, timestamp, source, peak=peak)
+        elif kind == 'crossing':
+            _kind, row, flag, timestamp = event
+            node = self._row_node(row)
+            if node is None:
+                return
+            node.crossing_flag = flag
+            if flag:
+                node.enter_at_timestamp = timestamp
+        elif kind == 'snapshot':
+            _kind, key, snapshot = event
+            self.interface.snapshots.store(key, snapshot)
+        elif kind == 'message':
+            _kind, dev_idx, message = event
+            self.interface._process_message(self.interface.devices[dev_idx], message)
+        elif kind == 'stats':
+            for row, peak, nadir, level_estimator, gate_quality in event[1]:
+                node = self._row_node(row)
+                if node is None:
+                    continue
+                node.node_peak_rssi = peak
+                node.node_nadir_rssi = nadir
+                # The worker owns the estimators; keep copies for suggestions and the UI
+                node.level_estimator = level_estimator
+                node.gate_quality = gate_quality
+            self.interface._bind_node_stats()
+        elif kind == 'survey':
+            self.interface._worker_survey_finished(event[1], event[2])
+        elif kind == 'survey_failed':
+            self.interface._worker_survey_finished(None, None, error=event[1])
+        elif kind == 'scheduler':
+            self.scheduler_status[event[1]] = event[2]
+        elif kind == 'timebase':
+            # The worker owns clock sync; keep a copy for status and sample ages
+            device = self.interface.devices[event[1]]
+            device.timebase = event[2]
+        elif kind == 'profile':
+            self.interface.add_profile_report(event[1])
+        elif kind == 'closed':
+            device = self.interface.devices[event[1]]
+            device.connected = False
+            device.io_stream = None
+            device.close_callback()
+
+    # Worker process side
+
+    def _child_main(self, conn, parent_conn):
+        parent_conn.close()
+        self._conn = conn
+        interface = self.interface
+        # This process owns the connections
+        interface.worker = None
+        interface.pass_record_callback = self._child_pass_record
+        interface.profile_label = "Ingest worker"
+        interface.profile_callback = lambda reports: conn.send(('profile', reports[0]))
+        interface.survey_callback = lambda results, status: conn.send(('survey', results, status))
+        interface.snapshots.track_completed = True
+        interface._process_message = self._child_wrap_process_message(interface._process_message)
+        interface._process_rssi_batch = self._child_wrap_process_rssi_batch(interface._process_rssi_batch)
+
+        devices = interface.devices
+        for dev_idx, device in enumerate(devices):
+            device.close_callback = self._child_close_callback(dev_idx)
+            # The main process builds its own nodes and UI from the forwarded reply
+            device.receivers_callback = lambda: None
+            device.voltage_callback = lambda alert: None
+            device.connect()
+            conn.send(('connected', dev_idx, bool(device.connected)))
+        for device in devices:
+            if device.connected:
+                interface._setup_device(device)
+        relay = interface.relay
+        if relay:
+            relay.start()
+
+        self._running = True
+        last_status = 0
+        last_stats = 0
+        try:
+            while self._running:
+                while self._running and conn.poll():
+                    self._child_handle_command(conn.recv())
+                interface._update()
+                if relay:
+                    relay.poll()
+                if interface.survey is not None:
+                    interface._service_survey()
+                if interface.profiler is not None:
+                    interface._service_profile()
+                now = time.monotonic()
+                if now - last_status >= SCHEDULER_STATUS_INTERVAL_S:
+                    last_status = now
+                    for dev_idx, device in enumerate(devices):
+                        conn.send(('scheduler', dev_idx, device.scheduler.status()))
+                if now - last_stats >= NODE_STATS_INTERVAL_S:
+                    last_stats = now
+                    conn.send(('stats', self._child_node_stats()))
+                gevent.sleep(self.poll_rate)
+        except EOFError:
+            logger.info("Chorus32 ingest worker lost its parent, exiting")
+        finally:
+            interface.stop_capture()
+            for device in devices:
+                device.close_callback = lambda: None
+                device.close()
+            if relay:
+                relay.stop()
+            self.latest_rssi.heads.release()
+            self.latest_rssi.values.release()
+            self.latest_rssi.shm.close()
+            conn.close()
+
+    def _child_handle_command(self, command):
+        kind = command[0]
+        if kind == 'write':
+            device = self.interface.devices[command[1]]
+            device.write(command[2])
+        elif kind == 'submit':
+            _kind, dev_idx, line, priority = command
+            self.interface.devices[dev_idx].scheduler.submit(line, time.monotonic(), priority)
+        elif kind == 'levels':
+            node = self._row_node(command[1])
+            if node is not None:
+                node.enter_at_level = command[2]
+                node.exit_at_level = command[3]
+        elif kind == 'filter':
+            self.interface.devices[command[1]].set_rssi_filter(command[2])
+        elif kind == 'race':
+            self.interface.set_state(command[1])
+        elif kind == 'interval':
+            device = self.interface.devices[command[1]]
+            device.rssi_interval_ms = command[2]
+            device.set_rssi_filter(device.rssi_filter_name)
+        elif kind == 'reset_node':
+            node = self._row_node(command[1])
+            if node is not None:
+                node.gate_quality.reset()
+                interface = self.interface
+                interface.crossing_engine.reset_node(interface._device_offsets[id(node.device)] + node.local_index)
+        elif kind == 'capture':
+            if command[1] is None:
+                self.interface.stop_capture()
+            else:
+                self.interface.start_capture(command[1])
+        elif kind == 'survey':
+            error = self.interface.start_survey(*command[1:])
+            if error:
+                self._conn.send(('survey_failed', error))
+        elif kind == 'survey_stop':
+            self.interface.stop_survey()
+        elif kind == 'profile':
+            self.interface.start_profile(*command[1:])
+        elif kind == 'profile_stop':
+            self.interface.stop_profile()
+        elif kind == 'clear_snapshots':
+            self.interface.snapshots.clear()
+        elif kind == 'stop':
+            self._running = False
+
+    def _child_node_stats(self):
+        """Peak/nadir, level estimator and gate quality of every node"""
+        stats = []
+        for dev_idx, device in enumerate(self.interface.devices):
+            for node in device.nodes:
+                stats.append((
+                    dev_idx * chorus32.MAX_RECEIVERS + node.local_index,
+                    node.node_peak_rssi,
+                    node.node_nadir_rssi,
+                    node.level_estimator,
+                    node.gate_quality,
+                ))
+        return stats
+
+    def _child_close_callback(self, dev_idx):
+        def close_callback():
+            self._conn.send(('closed', dev_idx))
+        return close_callback
+
+    def _child_pass_record(self, node, timestamp, source, peak=None):
+        row = self.interface._device_indices[id(node.device)] * chorus32.MAX_RECEIVERS + node.local_index
+        self._conn.send(('pass', row, timestamp, source, peak, node.pass_uncertainty_s))
+
+    def _child_wrap_process_message(self, process_message):
+        device_index = {id(device): dev_idx for dev_idx, device in enumerate(self.interface.devices)}
+        conn = self._conn
+
+        def wrapped(device, message):
+            process_message(device, message)
+            # Time replies only matter to the clock sync, which runs here
+            if message.command == chorus32.Chorus32Commands.GET_TIME:
+                conn.send(('timebase', device_index[id(device)], device.timebase))
+            elif message.command != chorus32.Chorus32Commands.GET_RSSI:
+                conn.send(('message', device_index[id(device)], message))
+        return wrapped
+
+    def _child_wrap_process_rssi_batch(self, process_rssi_batch):
+        latest_rssi = self.latest_rssi
+        conn = self._conn
+        interface = self.interface
+        snapshots = interface.snapshots
+
+        def wrapped(device, node_ids, rssis, timestamps=None, update_ui=True):
+            if timestamps is None:
+                timestamps = [time.monotonic()] * len(node_ids)
+            events = process_rssi_batch(device, node_ids, rssis, timestamps, update_ui)
+            # All samples in a batch come from one device
+            offset = interface._device_offsets[id(device)]
+            row_offset = interface._device_indices[id(device)] * chorus32.MAX_RECEIVERS - offset
+            # Only the newest value per node is published
+            for index, rssi in dict(zip(node_ids, rssis)).items():
+                latest_rssi.write(row_offset + index, rssi)
+            # Exits reach the main process through the pass record callback
+            for _position, kind, index, event_time, _peak in events:
+                if kind == CROSSING_ENTER:
+                    conn.send(('crossing', row_offset + index, True, event_time))
+            if snapshots.completed:
+                for key in snapshots.completed:
+                    conn.send(('snapshot', key, snapshots.get(*key)))
+                snapshots.completed = []
+            return events
+        return wrapped
@@ -0,0 +1,18 @@
+"""
+Test setup
+
+The plugin package's __init__ imports RotorHazard and gevent. Modules that
+do not need them are tested by registering a bare interface_chorus32
+package for them to import from, so the plugin __init__ never runs.
+"""
+
+import os
+import sys
+import types
+
+PLUGIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'custom_plugins', 'interface_chorus32')
+
+if 'interface_chorus32' not in sys.modules:
+    package = types.ModuleType('interface_chorus32')
+    package.__path__ = [os.path.abspath(PLUGIN_DIR)]
+    sys.modules['interface_chorus32'] = package
@@ -0,0 +1,183 @@
+"""Tests for the compact RSSI archive (chorus32_archive)"""
+
+import random
+
+import pytest
+
+from interface_chorus32.chorus32_archive import (
+    ArchiveReader, ArchiveWriter, TIME_RESOLUTION_S,
+    _decode_rssi, _decode_times, _encode_rssi, _encode_times,
+)
+
+INTERVAL_S = 0.01
+MAX_TIME_ERROR_S = TIME_RESOLUTION_S / 2 + 1e-9  # Rounding, plus float error
+
+
+def round_trip_times(timestamps):
+    t0, step, payload = _encode_times(timestamps)
+    return _decode_times(payload, len(timestamps), t0, step), payload
+
+
+def assert_times_close(decoded, timestamps):
+    assert len(decoded) == len(timestamps)
+    assert max(abs(a - b) for a, b in zip(decoded, timestamps)) <= MAX_TIME_ERROR_S
+
+
+def test_times_steady_cadence_needs_no_payload():
+    timestamps = [1000.0 + index * INTERVAL_S for index in range(500)]
+    decoded, payload = round_trip_times(timestamps)
+    assert_times_close(decoded, timestamps)
+    assert len(payload) <= 2
+
+
+def test_times_single_sample():
+    decoded, _payload = round_trip_times([1234.5678])
+    assert_times_close(decoded, [1234.5678])
+
+
+def test_times_dropped_cycles():
+    cycles = [cycle for cycle in range(600) if cycle not in (50, 51, 52, 300, 451)]
+    timestamps = [1000.0 + cycle * INTERVAL_S for cycle in cycles]
+    decoded, payload = round_trip_times(timestamps)
+    assert_times_close(decoded, timestamps)
+    # Each gap costs a few bytes, not one per sample
+    assert len(payload) < 40
+
+
+def test_times_cadence_steps():
+    # A cadence refit changes the step and shifts the phase mid-chunk
+    timestamps = []
+    now = 1000.0
+    for index in range(900):
+        if index == 300:
+            now += 0.0031
+        now += INTERVAL_S if index < 600 else INTERVAL_S * (1 + 40e-6)
+        timestamps.append(now)
+    decoded, _payload = round_trip_times(timestamps)
+    assert_times_close(decoded, timestamps)
+
+
+def test_times_jitter():
+    rng = random.Random(1)
+    timestamps = [1000.0 + index * INTERVAL_S + rng.uniform(-2e-4, 2e-4) for index in range(400)]
+    decoded, _payload = round_trip_times(timestamps)
+    assert_times_close(decoded, timestamps)
+
+
+def test_rssi_single_byte_path():
+    rng = random.Random(2)
+    rssis = [40]  # The first change is from 0
+    for _ in range(999):
+        rssis.append(rssis[-1] + rng.randint(-20, 20))
+    payload = _encode_rssi(rssis)
+    assert len(payload) == len(rssis)
+    assert _decode_rssi(payload, len(rssis)) == rssis
+
+
+@pytest.mark.parametrize('rssis', [
+    [60, 61, 300, 298, 62, 60],  # A pass: large changes both ways
+    [0, 5000, 0, 65535, 1],  # Beyond two varint bytes
+    [400] * 10,  # Only the first change is large
+])
+def test_rssi_multi_byte_path(rssis):
+    payload = _encode_rssi(rssis)
+    assert len(payload) > len(rssis)
+    assert _decode_rssi(payload, len(rssis)) == rssis
+
+
+def write_archive(path, chunk_samples, cycles, nodes=2):
+    """Write one heat of `cycles` samples per node; returns the expected traces"""
+    writer = ArchiveWriter(str(path), chunk_samples=chunk_samples)
+    writer.begin_heat('heat a', interval_ms=10)
+    expected = {node: ([], []) for node in range(nodes)}
+    for cycle in range(cycles):
+        timestamp = 1000.0 + cycle * INTERVAL_S
+        rssis = [80 + (cycle * (node + 3)) % 250 for node in range(nodes)]
+        writer.append_batch([timestamp] * nodes, 0, list(range(nodes)), rssis)
+        for node, rssi in enumerate(rssis):
+            expected[node][0].append(timestamp)
+            expected[node][1].append(rssi)
+    return writer, expected
+
+
+def select(expected, t_start, t_end):
+    timestamps, rssis = expected
+    pairs = [(timestamp, rssi) for timestamp, rssi in zip(timestamps, rssis) if t_start <= timestamp <= t_end]
+    return [timestamp for timestamp, _rssi in pairs], [rssi for _timestamp, rssi in pairs]
+
+
+def test_read_node_window_across_chunk_boundaries(tmp_path):
+    path = tmp_path / 'event.c32a'
+    writer, expected = write_archive(path, chunk_samples=100, cycles=350)
+    writer.close()
+
+    reader = ArchiveReader(str(path))
+    try:
+        assert not reader.recovered
+        assert len(reader._chunks[0, 0, 1]) == 4
+
+        # Starts inside the first chunk, spans the second, ends inside the third. Bounds
+        # fall between samples, as stored timestamps are rounded to TIME_RESOLUTION_S
+        t_start = 1000.0 + 89.5 * INTERVAL_S
+        t_end = 1000.0 + 260.5 * INTERVAL_S
+        timestamps, rssis = reader.read_node(0, 0, 1, t_start, t_end)
+        want_times, want_rssis = select(expected[1], t_start, t_end)
+        assert rssis == want_rssis
+        assert_times_close(timestamps, want_times)
+        assert len(rssis) == 171
+
+        # Exactly one chunk's samples
+        t_start = 1000.0 + 99.5 * INTERVAL_S
+        t_end = 1000.0 + 199.5 * INTERVAL_S
+        timestamps, rssis = reader.read_node(0, 0, 0, t_start, t_end)
+        assert rssis == expected[0][1][100:200]
+
+        # Whole trace, including the partial last chunk
+        timestamps, rssis = reader.read_node(0, 0, 0)
+        assert rssis == expected[0][1]
+        assert_times_close(timestamps, expected[0][0])
+    finally:
+        reader.close()
+
+
+def test_scan_chunks_recovers_unclosed_archive(tmp_path):
+    path = tmp_path / 'unclosed.c32a'
+    writer, expected = write_archive(path, chunk_samples=64, cycles=200)
+    writer.begin_heat('heat b')
+    writer.append_batch([2000.0, 2000.01], 0, [0, 0], [70, 71])
+    writer.end_heat()
+    # Interrupted before close: chunks are on disk, the heat table and index are not
+    writer._file.flush()
+    try:
+        reader = ArchiveReader(str(path))
+        try:
+            assert reader.recovered
+            assert [heat['samples'] for heat in reader.heats] == [400, 2]
+            assert reader.nodes(0) == [(0, 0), (0, 1)]
+            for node in (0, 1):
+                timestamps, rssis = reader.read_node(0, 0, node)
+                assert rssis == expected[node][1]
+                assert_times_close(timestamps, expected[node][0])
+            assert reader.read_node(1, 0, 0)[1] == [70, 71]
+        finally:
+            reader.close()
+    finally:
+        writer._file.close()
+
+
+def test_scan_chunks_stops_at_truncated_chunk(tmp_path):
+    path = tmp_path / 'event.c32a'
+    writer, expected = write_archive(path, chunk_samples=64, cycles=200, nodes=1)
+    writer.close()
+    data = path.read_bytes()
+    truncated = tmp_path / 'truncated.c32a'
+    # Cut inside the third chunk
+    chunk_offsets = sorted(offset for _t_first, _t_last, offset in ArchiveReader(str(path))._chunks[0, 0, 0])
+    truncated.write_bytes(data[:chunk_offsets[2] + 50])
+
+    reader = ArchiveReader(str(truncated))
+    try:
+        assert reader.recovered
+        assert reader.read_node(0, 0, 0)[1] == expected[0][1][:128]
+    finally:
+        reader.close()
@@ -0,0 +1,52 @@
+"""Tests for RSSI capture retention (chorus32_capture.apply_retention)"""
+
+import os
+
+from interface_chorus32.chorus32_capture import apply_retention, CAPTURE_SUFFIX, PASSES_SUFFIX
+
+ARCHIVE_SUFFIX = '.c32a'
+
+
+def make_file(directory, name, size, mtime):
+    path = os.path.join(directory, name)
+    with open(path, 'wb') as f:
+        f.write(b'\0' * size)
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_count_limit_keeps_newest_captures_and_sidecars(tmp_path):
+    for age in range(4):
+        path = make_file(tmp_path, f"race{age}{CAPTURE_SUFFIX}", 10, 1000 - age)
+        make_file(tmp_path, os.path.basename(path) + PASSES_SUFFIX, 1, 1000 - age)
+    apply_retention(tmp_path, max_count=2, max_bytes=0)
+    assert sorted(os.listdir(tmp_path)) == [
+        f"race0{CAPTURE_SUFFIX}", f"race0{CAPTURE_SUFFIX}{PASSES_SUFFIX}",
+        f"race1{CAPTURE_SUFFIX}", f"race1{CAPTURE_SUFFIX}{PASSES_SUFFIX}",
+    ]
+
+
+def test_archives_count_against_disk_limit_but_not_race_count(tmp_path):
+    make_file(tmp_path, f"race0{CAPTURE_SUFFIX}", 100, 1000)
+    make_file(tmp_path, f"archive1{ARCHIVE_SUFFIX}", 100, 999)
+    make_file(tmp_path, f"race2{CAPTURE_SUFFIX}", 100, 998)
+    make_file(tmp_path, f"archive3{ARCHIVE_SUFFIX}", 100, 997)
+
+    # Archives are not races: two captures fit a count of two
+    apply_retention(tmp_path, max_count=2, max_bytes=0, archive_suffixes=(ARCHIVE_SUFFIX,))
+    assert len(os.listdir(tmp_path)) == 4
+
+    # The oldest files go first, whatever their kind
+    apply_retention(tmp_path, max_count=0, max_bytes=250, archive_suffixes=(ARCHIVE_SUFFIX,))
+    assert sorted(os.listdir(tmp_path)) == [f"archive1{ARCHIVE_SUFFIX}", f"race0{CAPTURE_SUFFIX}"]
+
+
+def test_archives_untouched_without_suffixes(tmp_path):
+    make_file(tmp_path, f"race0{CAPTURE_SUFFIX}", 100, 1000)
+    make_file(tmp_path, f"archive1{ARCHIVE_SUFFIX}", 500, 900)
+    apply_retention(tmp_path, max_count=0, max_bytes=150)
+    assert sorted(os.listdir(tmp_path)) == [f"archive1{ARCHIVE_SUFFIX}", f"race0{CAPTURE_SUFFIX}"]
+
+
+def test_missing_directory(tmp_path):
+    apply_retention(tmp_path / 'missing', archive_suffixes=(ARCHIVE_SUFFIX,))
@@ -0,0 +1,174 @@
+"""Tests for the crossing engine (chorus32_core.chorus32_crossing)
+
+The engine must give the same crossings as the per-sample logic it
+replaced, which updated attributes on each node one sample at a time.
+That logic is kept here as ReferenceNode.
+"""
+
+import random
+
+import pytest
+
+from interface_chorus32.chorus32_core import chorus32_crossing
+from interface_chorus32.chorus32_core.chorus32_crossing import CrossingEngine, CROSSING_ENTER, CROSSING_EXIT
+
+
+class ReferenceNode:
+    """Per-sample crossing detection as in the original _process_message"""
+    def __init__(self, enter_at_level, exit_at_level):
+        self.enter_at_level = enter_at_level
+        self.exit_at_level = exit_at_level
+        self.current_rssi = 0
+        self.node_peak_rssi = 0
+        self.node_nadir_rssi = 9999
+        self.crossing_flag = False
+        self.pass_peak_rssi = 0
+        self.pass_nadir_rssi = 9999
+
+    def add(self, rssi, timestamp, index, events):
+        self.current_rssi = rssi
+        if rssi > self.node_peak_rssi:
+            self.node_peak_rssi = rssi
+        if rssi < self.node_nadir_rssi:
+            self.node_nadir_rssi = rssi
+
+        was_crossing = self.crossing_flag
+        if not was_crossing:
+            is_crossing = rssi >= self.enter_at_level
+        else:
+            is_crossing = rssi >= self.exit_at_level
+
+        if is_crossing != was_crossing:
+            if is_crossing:
+                self.crossing_flag = True
+                self.pass_peak_rssi = rssi
+                self.pass_nadir_rssi = rssi
+                events.append((CROSSING_ENTER, index, timestamp, rssi))
+            else:
+                self.crossing_flag = False
+                events.append((CROSSING_EXIT, index, timestamp, self.pass_peak_rssi))
+                self.pass_peak_rssi = 0
+                self.pass_nadir_rssi = 9999
+        elif is_crossing:
+            if rssi > self.pass_peak_rssi:
+                self.pass_peak_rssi = rssi
+            if rssi < self.pass_nadir_rssi:
+                self.pass_nadir_rssi = rssi
+
+    def state(self):
+        return (
+            int(self.crossing_flag), self.current_rssi, self.pass_peak_rssi, self.pass_nadir_rssi,
+            self.node_peak_rssi, self.node_nadir_rssi,
+        )
+
+
+def engine_state(engine, index):
+    return (
+        engine.crossing_flag[index], engine.current_rssi[index], engine.pass_peak_rssi[index],
+        engine.pass_nadir_rssi[index], engine.node_peak_rssi[index], engine.node_nadir_rssi[index],
+    )
+
+
+def random_trace(rng, count):
+    """Noisy floor with passes of random height and width, some right at the levels"""
+    rssis = []
+    while len(rssis) < count:
+        rssis += [rng.randint(40, 120) for _ in range(rng.randint(0, 60))]
+        height = rng.choice((rng.randint(120, 420), 250, 200))
+        width = rng.randint(1, 25)
+        rssis += [max(0, height + rng.randint(-60, 20)) for _ in range(width)]
+    return rssis[:count]
+
+
+def random_levels(rng):
+    enter_at_level = rng.randint(150, 300)
+    return enter_at_level, enter_at_level - rng.randint(0, 60)
+
+
+def split_points(rng, count):
+    """Random batch boundaries, so crossings are split across batches"""
+    points = sorted(rng.sample(range(1, count), rng.randint(0, min(40, count - 1))))
+    return list(zip([0] + points, points + [count]))
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_process_batch_matches_per_sample_logic(seed):
+    rng = random.Random(seed)
+    node_count = rng.randint(1, 8)
+    count = 3000
+    levels = [random_levels(rng) for _ in range(node_count)]
+    traces = [random_trace(rng, count // node_count) for _ in range(node_count)]
+    # Interleave the nodes the way a device pushes them, one cycle after another
+    samples = [
+        (index, traces[index][cycle], cycle * 0.01)
+        for cycle in range(count // node_count) for index in range(node_count)
+    ]
+
+    reference = [ReferenceNode(*node_levels) for node_levels in levels]
+    expected = []
+    for index, rssi, timestamp in samples:
+        reference[index].add(rssi, timestamp, index, expected)
+
+    engine = CrossingEngine(node_count)
+    for index, node_levels in enumerate(levels):
+        engine.set_levels(index, *node_levels)
+    events = []
+    for start, end in split_points(rng, len(samples)):
+        batch = samples[start:end]
+        node_ids = [sample[0] for sample in batch]
+        for position, kind, index, timestamp, peak in engine.process_batch(
+                node_ids, [sample[1] for sample in batch], [sample[2] for sample in batch]):
+            assert node_ids[position] == index
+            events.append((kind, index, timestamp, peak))
+
+    assert events == expected
+    for index in range(node_count):
+        assert engine_state(engine, index) == reference[index].state()
+
+
+@pytest.mark.parametrize('use_numpy', [False, True])
+@pytest.mark.parametrize('seed', range(20))
+def test_process_node_run_matches_per_sample_logic(seed, use_numpy, monkeypatch):
+    if use_numpy:
+        if chorus32_crossing.numpy is None:
+            pytest.skip("NumPy not installed")
+        # Every run takes the vectorized path, however short
+        monkeypatch.setattr(chorus32_crossing, 'NUMPY_MIN_RUN', 1)
+    else:
+        monkeypatch.setattr(chorus32_crossing, 'numpy', None)
+
+    rng = random.Random(seed)
+    rssis = random_trace(rng, 4000)
+    timestamps = [count * 0.01 for count in range(len(rssis))]
+    levels = random_levels(rng)
+
+    reference = ReferenceNode(*levels)
+    expected = []
+    for rssi, timestamp in zip(rssis, timestamps):
+        reference.add(rssi, timestamp, 2, expected)
+
+    engine = CrossingEngine(3)
+    engine.set_levels(2, *levels)
+    events = []
+    for start, end in split_points(rng, len(rssis)):
+        for position, kind, index, timestamp, peak in engine.process_node_run(
+                2, rssis[start:end], timestamps[start:end]):
+            assert timestamps[start + position] == timestamp
+            events.append((kind, index, timestamp, peak))
+
+    assert events == expected
+    assert engine_state(engine, 2) == reference.state()
+    # Other nodes are untouched
+    assert engine_state(engine, 0) == ReferenceNode(999, 999).state()
+
+
+def test_reset_node_drops_crossing_in_progress():
+    engine = CrossingEngine(2)
+    engine.set_levels(0, 200, 150)
+    engine.process_batch([0, 0], [100, 250], [0.0, 0.01])
+    assert engine.crossing_flag[0] == 1
+
+    engine.reset_node(0)
+    assert engine_state(engine, 0) == (0, 250, 0, 9999, 0, 9999)
+    # The old crossing never completes as a pass
+    assert engine.process_batch([0], [100], [0.02]) == []
@@ -0,0 +1,75 @@
+"""Tests for the bytes encoder (chorus32_core.chorus32_protocol.Chorus32BytesEncoder)"""
+
+from interface_chorus32.chorus32_core.chorus32_protocol import (
+    COMMAND_DIGITS, Chorus32BytesEncoder, Chorus32Commands, Chorus32Encoder
+)
+
+C = Chorus32Commands
+STR_ENCODERS = {
+    C.BAND: Chorus32Encoder.encode_set_band,
+    C.CHANNEL: Chorus32Encoder.encode_set_channel,
+    C.FREQUENCY: Chorus32Encoder.encode_set_frequency,
+    C.THRESHOLD: Chorus32Encoder.encode_set_threshold,
+    C.MIN_LAP_TIME: Chorus32Encoder.encode_set_min_lap_time,
+    C.RACE_MODE: Chorus32Encoder.encode_set_race_mode,
+    C.PILOT_ACTIVE: Chorus32Encoder.encode_set_pilot_active,
+    C.RSSI_MON_INTERVAL: Chorus32Encoder.encode_set_rssi_interval,
+}
+
+
+def batch(commands, node_count=0):
+    return Chorus32BytesEncoder.encode_batch(commands, node_count).decode('ascii').splitlines()
+
+
+def test_encode_matches_str_encoder():
+    values = (0, 1, 5, 15, 100, 255, 5800, 0xFFFF)
+    for node in list(range(16)) + [C.WILDCARD]:
+        for command, encoder in STR_ENCODERS.items():
+            for value in values:
+                if value >= 16 ** COMMAND_DIGITS[command] or (command == C.PILOT_ACTIVE and value > 1):
+                    continue  # Out of range; pilot active is a flag
+                expected = encoder(node, value).encode('ascii')
+                assert Chorus32BytesEncoder.encode(node, command, value) == expected, (node, command, value)
+    assert Chorus32BytesEncoder.encode(3, C.GET_TIME) == Chorus32Encoder.encode_get_time(3).encode('ascii')
+
+
+def test_later_value_replaces_earlier_one():
+    assert batch([(0, C.FREQUENCY, 5800), (1, C.FREQUENCY, 5740), (0, C.FREQUENCY, 5880)]) == [
+        'R1F166C', 'R0F16F8'
+    ]
+
+
+def test_matching_setpoints_collapse_to_wildcard():
+    commands = [(node, C.BAND, 2) for node in range(4)] + [(node, C.CHANNEL, node) for node in range(4)]
+    assert batch(commands, node_count=4) == ['R*B2', 'R0C0', 'R1C1', 'R2C2', 'R3C3']
+    # Only when every receiver is covered
+    assert batch(commands[:3], node_count=4) == ['R0B2', 'R1B2', 'R2B2']
+
+
+def test_interleaved_tuning_commands_keep_their_order():
+    # Band, channel and frequency all tune the receiver: the last one sent must win
+    assert batch([(0, C.FREQUENCY, 5800), (0, C.BAND, 2), (0, C.FREQUENCY, 5740)]) == [
+        'R0F16A8', 'R0B2', 'R0F166C'
+    ]
+    # Other receivers still join their groups
+    commands = [
+        (0, C.FREQUENCY, 5800), (1, C.FREQUENCY, 5800),
+        (0, C.BAND, 2),
+        (1, C.FREQUENCY, 5740), (0, C.FREQUENCY, 5740),
+    ]
+    assert batch(commands) == ['R0F16A8', 'R1F166C', 'R0B2', 'R0F166C']
+
+
+def test_wildcard_orders_against_single_receivers():
+    assert batch([(C.WILDCARD, C.BAND, 1), (2, C.CHANNEL, 3), (C.WILDCARD, C.BAND, 4)]) == [
+        'R*B1', 'R2C3', 'R*B4'
+    ]
+    # A receiver set again after a '*' line in the same group still ends on its own value
+    assert batch([(2, C.THRESHOLD, 1), (C.WILDCARD, C.THRESHOLD, 5), (2, C.THRESHOLD, 9)]) == [
+        'R*T0005', 'R2T0009'
+    ]
+
+
+def test_str_lines_are_barriers():
+    commands = [(0, C.FREQUENCY, 5800), "R0t\n", (0, C.FREQUENCY, 5740), (1, C.FREQUENCY, 5740)]
+    assert batch(commands, node_count=2) == ['R0F16A8', 'R0t', 'R*F166C']
@@ -0,0 +1,147 @@
+"""Tests for the RSSI filters (chorus32_core.chorus32_filters)"""
+
+import random
+import statistics
+
+from interface_chorus32.chorus32_core.chorus32_filters import (
+    EmaFilter, MedianFilter, OneEuroFilter, PassthroughFilter, create_rssi_filter,
+    FILTER_EMA, FILTER_MEDIAN, FILTER_NONE, FILTER_ONE_EURO,
+)
+from interface_chorus32.chorus32_core.chorus32_session import DeviceSession
+from interface_chorus32.chorus32_core.chorus32_stream import SEGMENT_RSSI
+
+
+def interleave(traces, offset=0):
+    node_ids = []
+    rssis = []
+    for cycle in range(len(traces[0])):
+        for local, trace in enumerate(traces):
+            node_ids.append(offset + local)
+            rssis.append(trace[cycle])
+    return node_ids, rssis
+
+
+def per_node(node_ids, values, offset=0):
+    nodes = {}
+    for index, value in zip(node_ids, values):
+        nodes.setdefault(index - offset, []).append(value)
+    return [nodes[local] for local in sorted(nodes)]
+
+
+def test_ema_matches_recurrence():
+    rssi_filter = EmaFilter(1, alpha=0.25)
+    trace = [100, 200, 200, 50, 300]
+    expected = []
+    value = None
+    for rssi in trace:
+        value = rssi if value is None else value + 0.25 * (rssi - value)
+        expected.append(int(value + 0.5))
+    assert rssi_filter.process([0] * len(trace), trace) == expected
+
+
+def test_median_matches_sliding_window():
+    rng = random.Random(3)
+    for window in (1, 3, 5, 8):
+        trace = [rng.randint(0, 400) for _ in range(200)]
+        rssi_filter = MedianFilter(1, window=window)
+        out = []
+        # Split into batches: state carries over
+        for start in range(0, len(trace), 7):
+            out += rssi_filter.process([0] * len(trace[start:start + 7]), trace[start:start + 7])
+        expected = []
+        for count in range(len(trace)):
+            values = sorted(trace[max(0, count + 1 - window):count + 1])
+            expected.append(values[len(values) >> 1])
+        assert out == expected, window
+
+
+def test_median_rejects_single_spike():
+    rssi_filter = MedianFilter(1, window=5)
+    out = rssi_filter.process([0] * 9, [100, 100, 100, 100, 400, 100, 100, 100, 100])
+    assert max(out) == 100
+
+
+def test_one_euro_smooths_noise_and_follows_steps():
+    rng = random.Random(5)
+    rssi_filter = OneEuroFilter(1, 0.01)
+    noisy = [150 + rng.randint(-20, 20) for _ in range(300)]
+    out = rssi_filter.process([0] * len(noisy), noisy)
+    assert statistics.pstdev(out[100:]) < statistics.pstdev(noisy[100:]) / 2
+
+    out = rssi_filter.process([0] * 100, [350] * 100)
+    assert out[-1] >= 340
+
+
+def test_filters_keep_nodes_apart_with_offset():
+    rng = random.Random(7)
+    traces = [[rng.randint(50, 300) for _ in range(50)] for _ in range(3)]
+    node_ids, rssis = interleave(traces, offset=4)
+    for make in (lambda count: EmaFilter(count), lambda count: MedianFilter(count),
+                 lambda count: OneEuroFilter(count, 0.01)):
+        together = per_node(node_ids, make(3).process(node_ids, rssis, offset=4), offset=4)
+        alone = [make(1).process([0] * len(trace), trace) for trace in traces]
+        assert together == alone
+
+
+def test_reset_forgets_state():
+    rssi_filter = EmaFilter(1, alpha=0.1)
+    rssi_filter.process([0, 0], [400, 400])
+    rssi_filter.reset()
+    assert rssi_filter.process([0], [50]) == [50]
+
+
+def test_create_rssi_filter():
+    assert isinstance(create_rssi_filter(FILTER_NONE, 2, 0.01), PassthroughFilter)
+    assert isinstance(create_rssi_filter(FILTER_EMA, 2, 0.01), EmaFilter)
+    assert isinstance(create_rssi_filter(FILTER_MEDIAN, 2, 0.01), MedianFilter)
+    assert isinstance(create_rssi_filter(FILTER_ONE_EURO, 2, 0.01), OneEuroFilter)
+    # One-euro needs a sample period
+    assert type(create_rssi_filter(FILTER_ONE_EURO, 2, 0)) is PassthroughFilter
+
+
+def feed_stream(rssi_filter, traces, keep=None):
+    """Push traces through a session as a device would; returns the node ids and filtered values it yields"""
+    session = DeviceSession('test', rssi_interval_ms=10)
+    session.set_receivers(len(traces))
+    session.decoder.node_count = len(traces)
+    session.decoder.offset = 2
+    node_ids = []
+    rssis = []
+    for cycle in range(len(traces[0])):
+        data = ''.join(f"S{receiver:X}r{trace[cycle]:04X}\n" for receiver, trace in enumerate(traces))
+        for segment in session.feed(session.split(data), 100.0 + cycle * 0.01, keep, rssi_filter):
+            assert segment[0] == SEGMENT_RSSI
+            node_ids += segment[1]
+            rssis += segment[2]
+    return node_ids, rssis
+
+
+def test_filter_output_does_not_change_under_decimation():
+    rng = random.Random(11)
+    traces = [[rng.randint(50, 350) for _ in range(200)] for _ in range(2)]
+    for make in (lambda: EmaFilter(2), lambda: MedianFilter(2), lambda: OneEuroFilter(2, 0.01)):
+        full_ids, full = feed_stream(make(), traces)
+        shed = 0
+
+        def keep(index, receiver, rssi):
+            nonlocal shed
+            assert index == receiver + 2
+            shed += 1
+            return shed % 4 == 0
+
+        kept_ids, kept = feed_stream(make(), traces, keep)
+        assert 0 < len(kept) < len(full)
+        # Every kept sample has the value it would have had with nothing shed
+        assert kept == [value for position, value in enumerate(full) if (position + 1) % 4 == 0]
+        assert kept_ids == [index for position, index in enumerate(full_ids) if (position + 1) % 4 == 0]
+
+
+def test_keep_sees_filtered_values():
+    seen = []
+
+    def keep(index, receiver, rssi):
+        seen.append(rssi)
+        return True
+
+    _node_ids, rssis = feed_stream(MedianFilter(1, window=3), [[100, 100, 400, 100, 100]], keep)
+    assert seen == rssis == [100, 100, 100, 100, 100]
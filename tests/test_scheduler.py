@@ -0,0 +1,19 @@
+"""Tests for the device command scheduler (chorus32_scheduler)"""
+
+from interface_chorus32.chorus32_scheduler import CommandScheduler, PRIORITY_POLL, PRIORITY_SETPOINT
+
+
+def test_clear_drops_queued_commands_but_keeps_jobs():
+    scheduler = CommandScheduler('test', burst=1)
+    scheduler.add_job('voltage', 5.0, lambda: '*v\n', 0.0, priority=PRIORITY_POLL)
+    scheduler.submit('R0F1658\n', 0.0, PRIORITY_SETPOINT)
+    written = []
+    # One token: the setpoint goes out, the due job stays queued
+    assert scheduler.service(0.0, False, written.append) == 1
+    assert scheduler.pending() == 1
+
+    scheduler.clear()
+    assert scheduler.pending() == 0
+    # The job is queued again the next time it is due
+    assert scheduler.service(10.0, False, written.append) == 1
+    assert written == [b'R0F1658\n', b'*v\n']
@@ -0,0 +1,68 @@
+"""Tests for the I/O-free device session (chorus32_core.chorus32_session)"""
+
+from interface_chorus32.chorus32_core.chorus32_filters import EmaFilter
+from interface_chorus32.chorus32_core.chorus32_protocol import Chorus32Commands
+from interface_chorus32.chorus32_core.chorus32_session import DeviceSession
+from interface_chorus32.chorus32_core.chorus32_stream import SEGMENT_MESSAGE, SEGMENT_RSSI
+
+
+def make_session(receivers=2, offset=0):
+    session = DeviceSession('test', rssi_interval_ms=10)
+    session.set_receivers(receivers)
+    session.decoder.node_count = receivers
+    session.decoder.offset = offset
+    return session
+
+
+def test_feed_yields_timestamped_runs_and_messages_in_order():
+    session = make_session(offset=4)
+    lines = session.split("S0r0064\nS1r0065\nS0v02A0\nS0r0066\nS1r00")
+    segments = list(session.feed(lines, received=100.0))
+
+    assert [segment[0] for segment in segments] == [SEGMENT_RSSI, SEGMENT_MESSAGE, SEGMENT_RSSI]
+    _kind, node_ids, rssis, timestamps = segments[0]
+    assert node_ids == [4, 5]
+    assert rssis == [0x64, 0x65]
+    assert len(timestamps) == 2
+    assert segments[1][1].command == Chorus32Commands.GET_VOLTAGE
+    assert segments[2][2] == [0x66]
+    # The partial line waits for the rest of its bytes
+    assert session.decoder.buffer == "S1r00"
+
+
+def test_feed_applies_rssi_filter_with_decoder_offset():
+    session = make_session(offset=2)
+    rssi_filter = EmaFilter(2, alpha=0.5)
+    lines = session.split("S0r0064\nS0r00C8\n")
+    (_kind, node_ids, rssis, _timestamps), = session.feed(lines, 100.0, rssi_filter=rssi_filter)
+    assert node_ids == [2, 2]
+    assert rssis == [100, 150]
+
+
+def test_reset_drops_partial_line():
+    session = make_session()
+    session.split("S0r00")
+    session.reset()
+    assert session.decoder.buffer == ""
+
+
+def test_time_request_waits_for_reply():
+    session = make_session()
+    assert session.time_request(10.0) == (0, Chorus32Commands.GET_TIME, None)
+    session.time_request_sent(10.0)
+    assert session.time_request(10.01) is None
+    assert session.sample_age(5000, 10.02) is None  # Not synced yet
+    session.time_reply(5000, 10.02)
+    assert session.time_request(10.03) is not None
+
+
+def test_set_receivers_reports_changes():
+    session = DeviceSession('test')
+    assert session.receivers is None
+    assert session.set_receivers(6)
+    assert not session.set_receivers(6)
+    assert session.set_receivers(4)
+    assert session.push_commands([0, 1]) == [
+        (0, Chorus32Commands.RSSI_MON_INTERVAL, 10), (1, Chorus32Commands.RSSI_MON_INTERVAL, 10)
+    ]
+    assert session.push_commands([3], 0) == [(3, Chorus32Commands.RSSI_MON_INTERVAL, 0)]
@@ -0,0 +1,64 @@
+"""Tests for pass snapshots (chorus32_snapshot)"""
+
+from interface_chorus32.chorus32_core.chorus32_crossing import CrossingEngine
+from interface_chorus32.chorus32_snapshot import PassSnapshotPool, format_pass_snapshot
+
+
+def run_passes(pool, engine, node_index, passes, start=0.0):
+    """Feed a node a flat floor with a bump per pass; returns the next timestamp"""
+    rssis = []
+    for _ in range(passes):
+        rssis += [60] * 30 + [200, 260, 300, 260, 200] + [60] * 30
+    timestamps = [start + count * 0.01 for count in range(len(rssis))]
+    node_ids = [node_index] * len(rssis)
+    events = engine.process_batch(node_ids, rssis, timestamps)
+    pool.add_batch(node_ids, rssis, timestamps, events, lambda index: (180, 150))
+    return timestamps[-1] + 0.01
+
+
+def make(node_count=2):
+    engine = CrossingEngine(node_count)
+    for index in range(node_count):
+        engine.set_levels(index, 180, 150)
+    return PassSnapshotPool(node_count, pool_size=8), engine
+
+
+def test_keys_list_passes_per_node():
+    pool, engine = make()
+    now = run_passes(pool, engine, 0, 3)
+    run_passes(pool, engine, 1, 1, now)
+    keys = sorted(pool.keys(0), key=lambda key: key[1])
+    assert len(keys) == 3 and len(pool.keys(1)) == 1 and len(pool.keys()) == 4
+    snapshot = pool.get(*keys[1])
+    assert snapshot['peak'] == 300
+    assert snapshot['enter_at_level'] == 180
+    # Pre-roll, the crossing (plus the exit sample) and post-roll
+    assert snapshot['rssi'][20:26] == [200, 260, 300, 260, 200, 60]
+    assert len(snapshot['rssi']) == 20 + 6 + 20
+
+
+def test_clear_drops_snapshots_and_pending_passes():
+    pool, engine = make()
+    # The post-roll of the last pass has not arrived yet
+    rssis = [60] * 30 + [200, 300, 200, 60]
+    timestamps = [count * 0.01 for count in range(len(rssis))]
+    events = engine.process_batch([0] * len(rssis), rssis, timestamps)
+    pool.add_batch([0] * len(rssis), rssis, timestamps, events, lambda index: (180, 150))
+    assert pool.keys() == [] and pool._pending
+
+    pool.clear()
+    assert pool.keys() == [] and not pool._pending
+    run_passes(pool, engine, 0, 1, 1.0)
+    assert len(pool.keys(0)) == 1
+
+
+def test_format_pass_snapshot():
+    pool, engine = make(1)
+    run_passes(pool, engine, 0, 1)
+    snapshot = pool.get(*pool.keys(0)[0])
+    text = format_pass_snapshot(1, 0, 1, snapshot, width=16)
+    assert text.startswith("Seat 1, pass 0 (1 in this race): peak 300, enter 180 / exit 150")
+    plot, marks = text.split("```")[1].strip("\n").split("\n")
+    assert len(plot) == 16
+    assert '^' in marks
+    assert format_pass_snapshot(1, 0, 1, dict(snapshot, rssi=[], timestamps=[])).count("\n") == 0
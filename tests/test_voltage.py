@@ -0,0 +1,46 @@
+"""Tests for supply voltage alerts (chorus32_voltage)"""
+
+from interface_chorus32.chorus32_voltage import ALERT_LOW, ALERT_SAG, VOLTS_PER_UNIT, VoltageMonitor
+
+
+def feed(monitor, volts_list, start=0.0, step=30.0):
+    raised = []
+    for count, volts in enumerate(volts_list):
+        raised += monitor.add(start + count * step, volts / VOLTS_PER_UNIT)
+    return raised
+
+
+def test_usb_supply_gets_no_automatic_low_alert():
+    monitor = VoltageMonitor('usb')
+    assert feed(monitor, [5.0, 5.05, 4.95, 5.0]) == []
+    assert monitor.cells is None
+    assert monitor.low_threshold_v is None
+    assert ALERT_LOW not in monitor.alerts
+
+
+def test_usb_supply_alerts_below_explicit_threshold():
+    monitor = VoltageMonitor('usb', low_v=4.6)
+    assert feed(monitor, [5.0, 4.4, 4.4])
+    assert ALERT_LOW in monitor.alerts
+
+
+def test_charged_3s_pack_is_three_cells():
+    monitor = VoltageMonitor('3s')
+    assert feed(monitor, [12.8, 12.7, 12.7]) == []
+    assert monitor.cells == 3
+    assert abs(monitor.low_threshold_v - 10.5) < 1e-9
+
+
+def test_cell_count_across_charge_range():
+    for volts, cells in ((8.4, 2), (7.4, 2), (12.6, 3), (11.1, 3), (16.8, 4), (14.8, 4), (25.2, 6), (22.2, 6)):
+        monitor = VoltageMonitor('pack')
+        feed(monitor, [volts])
+        assert monitor.cells == cells, volts
+
+
+def test_low_alert_on_discharged_pack():
+    monitor = VoltageMonitor('3s')
+    raised = feed(monitor, [12.0, 11.0, 10.2, 10.2])
+    assert any('low' in message for message in raised)
+    assert ALERT_LOW in monitor.alerts
+    assert ALERT_SAG in monitor.alerts